@@ -1,22 +1,41 @@
 from app.state.state import AgentState
-from app.tools.sql import execute_read_query
+from app.tools.cost import estimate_query_cost
+from app.tools.results import execute_query_result
+from app.tools.digest import build_result_digest, profile_result
+from app.tools.sql import QueryBudgetExceeded
 
-def sql_executor_node(state: AgentState):
+async def sql_executor_node(state: AgentState):
     """
     Executes the validated SQL query against the database.
+    The plan is priced first (EXPLAIN QUERY PLAN + cached row counts) and
+    queries that would visit too many rows are sent back to the generator
+    without running. The query runs on the SQL worker pool under a time and
+    VM-step budget, and only the first SQL_MAX_RESULT_ROWS rows are kept in the state.
     """
     sql_query = state.get("generated_sql")
+    failed = {
+        "query_result": None,
+        "result_profile": None,
+        "result_digest": None,
+        "validation_error": None  # Clear validation errors when attempting execution
+    }
+    
+    cost = await estimate_query_cost(sql_query)
+    if cost is not None and cost.too_expensive:
+        return {**failed, "query_error": cost.feedback(), "query_error_kind": "too_expensive"}
     
     try:
-        results = execute_read_query(sql_query)
+        results = await execute_query_result(sql_query)
+        profile = profile_result(results)
         return {
             "query_result": results,
+            "result_profile": profile,
+            "result_digest": build_result_digest(results, profile),
             "query_error": None,
+            "query_error_kind": None,
             "validation_error": None  # Clear validation errors on successful execution
         }
+    except QueryBudgetExceeded as e:
+        return {**failed, "query_error": f"{e}. {cost.feedback() if cost else ''}".strip(), "query_error_kind": "too_expensive"}
     except Exception as e:
-        return {
-            "query_result": [],
-            "query_error": str(e),
-            "validation_error": None  # Clear validation errors when attempting execution
-        }
+        return {**failed, "query_error": str(e), "query_error_kind": "failed"}
@@ -0,0 +1,89 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from app.state.state import AgentState
+from app.services.llm import get_openai_client
+from app.observability.metrics import counter
+from app.observability.logger import logger
+from app.tools.catalog import get_schema_catalog_async
+from app.tools.table_index import candidate_tables_async
+
+_outcomes = counter(
+    "fused_frontend_outcomes_total",
+    "Fused front-end calls: parsed, or fell back to the split router/rewriter/table selector.",
+    ("outcome",),
+)
+
+class FrontendOutput(BaseModel):
+    """Output schema for the fused front-end: routing, rewrite and table selection in one call."""
+    relevance: Literal["relevant", "irrelevant"] = Field(
+        description="Whether the user query is relevant to a music store database (Chinook) or distribution analytics."
+    )
+    refined_query: Optional[str] = Field(
+        default=None,
+        description="The query rewritten to be clear, unambiguous and easy to translate into SQL. Null if irrelevant.",
+    )
+    selected_tables: List[str] = Field(
+        default=[],
+        description="Table names strictly necessary to answer the refined query. Empty if irrelevant.",
+    )
+
+async def fused_frontend_node(state: AgentState):
+    """
+    Routes, rewrites and selects tables with a single structured LLM call
+    instead of three. Table names are checked against the schema catalog.
+    If the output can't be parsed, relevance is left unset so the graph
+    falls back to the split router -> rewriter -> table selector.
+    """
+    client = get_openai_client()
+    catalog = await get_schema_catalog_async()
+    offered = await candidate_tables_async(state["user_query"])
+
+    system_prompt = f"""You are the front-end of an analytics assistant over a music store database (Chinook).
+    The database contains information about artists, albums, tracks, invoices, customers, and employees.
+    The available tables are: {", ".join(offered)}.
+
+    In one step:
+    1. relevance: mark greetings, chitchat or questions unrelated to the data as 'irrelevant', otherwise 'relevant'.
+    2. refined_query: rewrite a relevant query to be clearer and easier to translate into SQL. Resolve vague
+       terms ("best" -> "top by sales/count"), keep the user's intent, imply the needed aggregations
+       ("by year", "by country"), add no conversational filler, and return it as is if it is already clear.
+    3. selected_tables: list ONLY the tables strictly necessary to answer the refined query. Do not invent table names.
+    """
+
+    response = await client.chat.completions.create(
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": state["user_query"]}
+        ],
+        functions=[
+            {
+                "name": "analyze_query",
+                "description": "Route the query, rewrite it and select the tables it needs.",
+                "parameters": FrontendOutput.model_json_schema()
+            }
+        ],
+        function_call={"name": "analyze_query"},
+        temperature=0
+    )
+
+    tool_call = response.choices[0].message.function_call
+    try:
+        output = FrontendOutput.model_validate_json(tool_call.arguments if tool_call else "")
+    except ValidationError as e:
+        _outcomes.inc(outcome="fallback")
+        logger.warning(f"[Fused Frontend] Unparseable output, falling back to split nodes: {e}")
+        return {"relevance": None, "refined_query": None, "selected_tables": []}
+
+    _outcomes.inc(outcome="parsed")
+    if output.relevance == "irrelevant":
+        return {"relevance": "irrelevant", "refined_query": None, "selected_tables": []}
+
+    # Keep only tables the catalog knows, under their canonical names
+    tables = [catalog.get_table(name) for name in output.selected_tables]
+    return {
+        "relevance": "relevant",
+        "refined_query": output.refined_query or state["user_query"],
+        "selected_tables": list(dict.fromkeys(t.name for t in tables if t is not None)),
+    }
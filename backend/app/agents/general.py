@@ -1,5 +1,8 @@
+import asyncio
+
 from app.state.state import AgentState
 from app.services.llm import get_openai_client
+from app.observability.cancellation import cancelled_work
 
 async def general_agent_node(state: AgentState):
     """
@@ -32,20 +35,24 @@ async def general_agent_node(state: AgentState):
     writer: StreamWriter = get_stream_writer()
 
     stream = await client.chat.completions.create(
-        model="gpt-4o",
         messages=messages,
         temperature=0.7,
         stream=True
     )
 
     full_response = ""
-    async for chunk in stream:
-        if chunk.choices[0].delta.content:
-            content = chunk.choices[0].delta.content
-            full_response += content
-            # Write token to the custom stream
-            writer(content)
-
+    # Closing the stream on cancellation aborts the HTTP response instead of
+    # letting the model keep generating for a client that has gone away
+    async with stream:
+        try:
+            async for chunk in stream:
+                if chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    full_response += content
+                    # Write token to the custom stream
+                    writer(content)
+        except asyncio.CancelledError:
+            cancelled_work.inc(kind="llm_stream")
+            raise
+            
     return {"natural_response": full_response}
-    
-    return {"natural_response": response.choices[0].message.content}
@@ -28,7 +28,6 @@ async def query_rewriter_node(state: AgentState):
     """
     
     response = await client.chat.completions.create(
-        model="gpt-4o",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_query}
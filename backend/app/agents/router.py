@@ -27,7 +27,6 @@ async def query_router_node(state: AgentState):
     """
     
     response = await client.chat.completions.create(
-        model="gpt-4o",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": state["user_query"]}
@@ -39,7 +38,8 @@ async def query_router_node(state: AgentState):
                 "parameters": RouterOutput.model_json_schema()
             }
         ],
-        function_call={"name": "route_query"}
+        function_call={"name": "route_query"},
+        temperature=0
     )
     
     # Check if function call exists
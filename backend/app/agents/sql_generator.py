@@ -1,19 +1,60 @@
+import asyncio
+
 from app.state.state import AgentState
 from app.services.llm import get_openai_client
-from app.tools.schema import get_database_schema_string
+from app.tools.candidates import SQL_CANDIDATES, candidate_events, candidate_temperatures, pick_candidate
+from app.tools.schema import SCHEMA_PROMPT_FORMAT, get_database_schema_string_async
+from app.observability.logger import logger
+
+COMPACT_SCHEMA_HINT = """
+    It has one `Table(column:type, ...)` line per table, with example values after "e.g." and
+    the remaining columns listed by name after "+", followed by the foreign-key joins."""
+
+async def _generate(client, messages, temperature: float) -> str:
+    response = await client.chat.completions.create(
+        messages=messages,
+        temperature=temperature
+    )
+    generated_sql = response.choices[0].message.content or ""
+    # Clean up any potential markdown backticks if the model ignores the instruction
+    return generated_sql.replace("```sql", "").replace("```", "").strip()
+
+async def _generate_candidates(client, messages, count: int) -> str:
+    """Generates `count` queries at once and returns the one `pick_candidate` keeps."""
+    results = await asyncio.gather(
+        *(_generate(client, messages, t) for t in candidate_temperatures(count)), return_exceptions=True
+    )
+    sqls = [r for r in results if isinstance(r, str)]
+    if not sqls:
+        raise results[0]
+    candidate_events.inc(len(sqls), event="generated")
+    chosen = await pick_candidate(sqls)
+    if chosen.sql != sqls[0]:
+        logger.info(f"[SQL Generator] Kept a later candidate of {len(sqls)} (cost {chosen.cost.estimated_rows if chosen.cost else '?'})")
+    return chosen.sql
 
 async def sql_generator_node(state: AgentState):
     """
     Generates a SQL query based on the user query and selected table schemas.
+    With SQL_CANDIDATES > 1, the first attempt generates that many queries
+    in parallel and keeps the cheapest one that passes the local checks.
     """
     client = get_openai_client()
     
     selected_tables = state["selected_tables"]
-    schema_context = get_database_schema_string(selected_tables)
+    query_to_use = state.get("refined_query", state["user_query"])
+    validation_error = state.get("validation_error")
+    query_error = state.get("query_error")
+    retry_count = state.get("retry_count", 0)
+
+    # Columns are pruned to the question on the first attempt; a retry sees every column in full
+    schema_context = await get_database_schema_string_async(
+        selected_tables, question=query_to_use, prune=not (validation_error or query_error)
+    )
     
     system_prompt = f"""You are an expert SQLite developer.
     Your task is to generate a valid SQLite query to answer the user's question.
-    Use the provided schema.
+    Use the provided schema.{COMPACT_SCHEMA_HINT if SCHEMA_PROMPT_FORMAT == "compact" else ""}
     
     Schema:
     {schema_context}
@@ -25,20 +66,11 @@ async def sql_generator_node(state: AgentState):
     4. If the user asks for aggregation, use appropriate GROUP BY clauses.
     5. Do not end with a semicolon (optional but cleaner).
     6. IMPORTANT: When using UNION or UNION ALL, ORDER BY must come AFTER all SELECT statements, not between them.
-       CORRECT: (SELECT ...) UNION ALL (SELECT ...) ORDER BY column
-       INCORRECT: (SELECT ... ORDER BY column) UNION ALL (SELECT ... ORDER BY column)
+       Do not wrap the SELECT statements of a UNION in parentheses; SQLite rejects that.
+       CORRECT: SELECT ... UNION ALL SELECT ... ORDER BY column
+       INCORRECT: SELECT ... ORDER BY column UNION ALL SELECT ... ORDER BY column
     """
     
-    query_to_use = state.get("refined_query", state["user_query"])
-    validation_error = state.get("validation_error")
-    query_error = state.get("query_error")
-    retry_count = state.get("retry_count", 0)
-    
-    # Debug logging
-    print(f"[SQL Generator] Retry count: {retry_count}")
-    print(f"[SQL Generator] Validation error: {validation_error}")
-    print(f"[SQL Generator] Query error: {query_error}")
-    
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": query_to_use}
@@ -47,39 +79,40 @@ async def sql_generator_node(state: AgentState):
     # Add error feedback for retry
     if validation_error:
         error_msg = f"The previous query failed validation. Error: {validation_error}. Please fix the SQL."
-        print(f"[SQL Generator] Adding validation error to prompt: {error_msg}")
+        logger.info(f"[SQL Generator] Retry {retry_count} after validation error: {validation_error}")
         messages.append({
             "role": "user", 
             "content": error_msg
         })
+    elif query_error and state.get("query_error_kind") == "too_expensive":
+        error_msg = f"The previous query was rejected before completing because it is too expensive.\n{query_error}\nWrite a cheaper query that still answers the question."
+        logger.info(f"[SQL Generator] Retry {retry_count} after cost rejection")
+        messages.append({
+            "role": "user",
+            "content": error_msg
+        })
     elif query_error:
         error_msg = f"The previous query failed during execution. Error: {query_error}. Please fix the SQL syntax. Remember: ORDER BY must come AFTER UNION ALL, not before."
-        print(f"[SQL Generator] Adding query error to prompt: {error_msg}")
+        logger.info(f"[SQL Generator] Retry {retry_count} after query error: {query_error}")
         messages.append({
             "role": "user",
             "content": error_msg
         })
     
-    # Use higher temperature on retries to get different solutions
-    temperature = 0.3 if (validation_error or query_error) else 0
-    
-    response = await client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-        temperature=temperature
-    )
-    
-    generated_sql = response.choices[0].message.content
-    
-    # Clean up any potential markdown backticks if the model ignores the instruction
-    clean_sql = generated_sql.replace("```sql", "").replace("```", "").strip()
+    if SQL_CANDIDATES > 1 and not (validation_error or query_error):
+        clean_sql = await _generate_candidates(client, messages, SQL_CANDIDATES)
+    else:
+        # Use higher temperature on retries to get different solutions
+        temperature = 0.3 if (validation_error or query_error) else 0
+        clean_sql = await _generate(client, messages, temperature)
     
-    print(f"[SQL Generator] Generated SQL: {clean_sql[:100]}...")
+    logger.debug(f"[SQL Generator] Generated SQL: {clean_sql[:100]}...")
     
     # Increment retry count if there was an error
     should_increment = bool(validation_error or query_error)
     
     return {
         "generated_sql": clean_sql,
-        "retry_count": state.get("retry_count", 0) + 1 if should_increment else 0
+        "retry_count": state.get("retry_count", 0) + 1 if should_increment else 0,
+        "sql_attempts": []  # A new generation starts a new repair history
     }
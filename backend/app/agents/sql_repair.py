@@ -0,0 +1,57 @@
+from app.state.state import AgentState
+from app.services.llm import get_openai_client
+from app.tools.repair import repair_events
+from app.tools.schema import get_database_schema_string_async
+from app.observability.logger import logger
+
+async def sql_repair_node(state: AgentState):
+    """
+    Fixes the query that failed instead of generating a new one: the model
+    sees the failed SQL, its error and the earlier failed attempts, and is
+    asked for the smallest edit that fixes it.
+    """
+    client = get_openai_client()
+
+    failed_sql = state.get("generated_sql", "")
+    error = state.get("validation_error") or state.get("query_error") or "unknown error"
+    earlier = state.get("sql_attempts") or []
+    attempts = [*earlier, {"sql": failed_sql, "error": error}]
+    retry_count = state.get("retry_count", 0) + 1
+
+    # Every column in full: a pruned one may be exactly what the fix needs
+    schema_context = await get_database_schema_string_async(state["selected_tables"])
+
+    system_prompt = f"""You fix SQLite queries. You get a question, the query written for it, and the error it failed with.
+    Return ONLY the corrected query: no markdown, no backticks, no explanation.
+    Change only what the error requires and keep the rest of the query as it is.
+    The query must stay a single read-only SELECT. ORDER BY comes after all UNION ALL branches.
+
+    Schema:
+    {schema_context}
+    """
+
+    request = f"Question: {state.get('refined_query') or state['user_query']}\n\nQuery:\n{failed_sql}\n\nError: {error}"
+    if earlier:
+        history = "\n".join(f"- {a['sql']}\n  Error: {a['error']}" for a in earlier)
+        request += f"\n\nThese earlier versions failed too; do not repeat them:\n{history}"
+
+    logger.info(f"[SQL Repair] Retry {retry_count} after: {error}")
+    repair_events.inc(event="llm_repair")
+
+    response = await client.chat.completions.create(
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": request}
+        ],
+        temperature=0
+    )
+
+    repaired_sql = response.choices[0].message.content or ""
+    clean_sql = repaired_sql.replace("```sql", "").replace("```", "").strip()
+    logger.debug(f"[SQL Repair] Repaired SQL: {clean_sql[:100]}...")
+
+    return {
+        "generated_sql": clean_sql,
+        "retry_count": retry_count,
+        "sql_attempts": attempts
+    }
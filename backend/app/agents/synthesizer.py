@@ -1,5 +1,8 @@
+import asyncio
+
 from app.state.state import AgentState
 from app.services.llm import get_openai_client
+from app.observability.cancellation import cancelled_work
 
 async def response_synthesizer_node(state: AgentState):
     """
@@ -9,7 +12,7 @@ async def response_synthesizer_node(state: AgentState):
     
     user_query = state["user_query"]
     sql_query = state.get("generated_sql", "No SQL generated")
-    results = state.get("query_result", [])
+    digest = state.get("result_digest") or "The query returned no rows."
     error = state.get("query_error")
     
     if error:
@@ -20,7 +23,8 @@ async def response_synthesizer_node(state: AgentState):
     
     User Question: {user_query}
     SQL Query Used: {sql_query}
-    Data Results: {results}
+    Data Results:
+    {digest}
     
     Response Guidelines:
     1. Be concise and direct.
@@ -30,11 +34,6 @@ async def response_synthesizer_node(state: AgentState):
     5. Do not mention "SQL" or "query" unless necessary for clarity.
     """
     
-    # Truncate results if too large to fit in context (naive approach)
-    str_results = str(results)
-    if len(str_results) > 10000:
-        str_results = str_results[:10000] + "... (truncated)"
-        
     messages = [{"role": "system", "content": system_prompt}]
     
     # Use LangGraph's native stream writer
@@ -45,20 +44,24 @@ async def response_synthesizer_node(state: AgentState):
     
     # We can stream tokens directly via writer
     stream = await client.chat.completions.create(
-        model="gpt-4o",
         messages=messages,
         temperature=0,
         stream=True
     )
     
     full_response = ""
-    async for chunk in stream:
-        if chunk.choices[0].delta.content:
-            content = chunk.choices[0].delta.content
-            full_response += content
-            # Write token to the custom stream
-            writer(content)
+    # Closing the stream on cancellation aborts the HTTP response instead of
+    # letting the model keep generating for a client that has gone away
+    async with stream:
+        try:
+            async for chunk in stream:
+                if chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    full_response += content
+                    # Write token to the custom stream
+                    writer(content)
+        except asyncio.CancelledError:
+            cancelled_work.inc(kind="llm_stream")
+            raise
             
     return {"natural_response": full_response}
-    
-    return {"natural_response": response.choices[0].message.content}
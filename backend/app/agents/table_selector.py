@@ -4,7 +4,7 @@ from pydantic import BaseModel, Field
 
 from app.state.state import AgentState
 from app.services.llm import get_openai_client
-from app.tools.sql import get_table_names
+from app.tools.table_index import candidate_tables_async
 
 class TableSelectorOutput(BaseModel):
     """Output schema for the table selector agent."""
@@ -12,18 +12,17 @@ class TableSelectorOutput(BaseModel):
         description="List of table names that are relevant to the user query."
     )
 
-async def table_selector_node(state: AgentState):
+async def select_tables(query: str) -> List[str]:
     """
-    Selects the relevant tables for the user query from the database schema.
+    Asks the LLM which tables are needed to answer the query.
+    Large schemas are narrowed to retrieved candidates first; only offered
+    names are returned.
     """
     client = get_openai_client()
     
-    all_tables = get_table_names()
+    all_tables = await candidate_tables_async(query)
     formatted_tables = ", ".join(all_tables)
     
-    # Use refined query if available, closely matching the user intent
-    query_to_use = state.get("refined_query", state["user_query"])
-    
     system_prompt = f"""You are an expert database architect.
     Your task is to select the most relevant tables from the database to answer the user's query.
     The available tables are: {formatted_tables}.
@@ -32,10 +31,9 @@ async def table_selector_node(state: AgentState):
     """
     
     response = await client.chat.completions.create(
-        model="gpt-4o",
         messages=[
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": query_to_use}
+            {"role": "user", "content": query}
         ],
         functions=[
             {
@@ -44,7 +42,8 @@ async def table_selector_node(state: AgentState):
                 "parameters": TableSelectorOutput.model_json_schema()
             }
         ],
-        function_call={"name": "select_tables"}
+        function_call={"name": "select_tables"},
+        temperature=0
     )
     
     tool_call = response.choices[0].message.function_call
@@ -58,6 +57,20 @@ async def table_selector_node(state: AgentState):
             selected = []
             
     # Filter out any hallucinates tables basically
-    valid_tables = [t for t in selected if t in all_tables]
+    return [t for t in selected if t in all_tables]
+
+async def table_selector_node(state: AgentState):
+    """
+    Selects the relevant tables for the user query from the database schema.
+    """
+    # Use refined query if available, closely matching the user intent
+    query_to_use = state.get("refined_query", state["user_query"])
     
-    return {"selected_tables": valid_tables}
+    return {"selected_tables": await select_tables(query_to_use)}
+
+async def speculative_table_selector_node(state: AgentState):
+    """
+    Selects tables from the raw user query so it can run in parallel with the
+    router and rewriter (the refined query isn't available yet).
+    """
+    return {"selected_tables": await select_tables(state["user_query"])}
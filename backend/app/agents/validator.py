@@ -1,14 +1,28 @@
 from app.state.state import AgentState
 from app.tools.validator import validate_sql_safety
+from app.tools.repair import precheck_query
+from app.observability.logger import logger
 
-def sql_validator_node(state: AgentState):
+async def sql_validator_node(state: AgentState):
     """
-    Validates the generated SQL for safety.
+    Validates the generated SQL for safety, then compiles it without running
+    it: unknown table/column names are fixed against the catalog here, and
+    other compile errors go back for repair without a trip to the executor.
     """
     sql_query = state.get("generated_sql", "")
     is_safe, error_message = validate_sql_safety(sql_query)
-    
+    update = {}
+
+    if is_safe:
+        check = await precheck_query(sql_query)
+        if check.fixes:
+            logger.info(f"[SQL Validator] Fixed locally: {', '.join(check.fixes)}")
+            update["generated_sql"] = check.sql
+        if check.error is not None:
+            is_safe, error_message = False, f"SQLite rejected the query: {check.error}"
+
     return {
+        **update,
         "is_valid_sql": is_safe,
         "validation_error": error_message if not is_safe else None,
         "query_error": None  # Clear execution errors when re-validating
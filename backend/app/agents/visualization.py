@@ -1,38 +1,57 @@
 import json
-from typing import Literal, Dict, Any, Optional
-from pydantic import BaseModel, Field
+import os
+from typing import List, Optional
 
-from app.state.state import AgentState
+from app.state.state import AgentState, ColumnProfile
 from app.services.llm import get_openai_client
+from app.observability.metrics import counter
+from app.observability.logger import logger
+from app.tools.charts import ChartEncoding, VizPlannerOutput, build_vega_lite_spec, choose_encoding, plan_chart
+from app.tools.digest import format_column_profile, profile_result
+from app.tools.results import result_data_url, result_rows_as_dicts
 
-class VizPlannerOutput(BaseModel):
-    """Output schema for the visualization planner."""
-    needs_visualization: bool = Field(
-        description="Whether the user asked for a visualization or the data is best represented visually."
-    )
-    visualization_type: Optional[Literal["bar", "line", "pie", "scatter"]] = Field(
-        description="Type of chart to generate if needed."
-    )
-    reasoning: str = Field(description="Why visualization is needed or not.")
+# Results up to this size are embedded in the chart spec; larger ones are loaded via /api/results
+VISUALIZATION_INLINE_MAX_ROWS = int(os.getenv("VISUALIZATION_INLINE_MAX_ROWS", "200"))
+
+_planner_decisions = counter(
+    "visualization_planner_decisions_total",
+    "Chart decisions by source: local rules or the LLM fallback for ambiguous results.",
+    ("source",),
+)
+_encoding_decisions = counter(
+    "visualization_encoding_decisions_total",
+    "Chart encodings by source: local rules or the LLM fallback.",
+    ("source",),
+)
 
 async def visualization_planner_node(state: AgentState):
     """
     Decides if a visualization is needed.
+    Clear-cut results are decided locally from the column profile; only
+    ambiguous ones cost an LLM call.
     """
-    client = get_openai_client()
-    
-    query_to_use = state.get("refined_query", state["user_query"])
-    results = state.get("query_result", [])
+    query_to_use = state.get("refined_query") or state["user_query"]
+    results = state.get("query_result")
     
     # If no results or error, no viz
-    if not results or state.get("query_error"):
-        return {"needs_visualization": False}
+    if not results or not results["rows"] or state.get("query_error"):
+        return {"needs_visualization": False, "visualization_type": None}
         
+    profile = state.get("result_profile") or profile_result(results)
+    plan = plan_chart(query_to_use, profile, results["row_count"])
+    if plan is not None:
+        _planner_decisions.inc(source="rules")
+        return {"needs_visualization": plan.needs_visualization, "visualization_type": plan.visualization_type}
+
+    _planner_decisions.inc(source="llm")
+    client = get_openai_client()
+    
     system_prompt = f"""You are a data visualization expert.
     Analyze the user request and data to decide if a chart is necessary.
     
     User Query: {query_to_use}
-    Data Sample (first few rows): {str(results[:5])}
+    Data Summary:
+    {state.get("result_digest")}
     
     Rules:
     1. If user explicitly asks for "plot", "chart", "graph", "visualize", return true.
@@ -41,7 +60,6 @@ async def visualization_planner_node(state: AgentState):
     """
     
     response = await client.chat.completions.create(
-        model="gpt-4o",
         messages=[
             {"role": "system", "content": system_prompt}
         ],
@@ -59,48 +77,85 @@ async def visualization_planner_node(state: AgentState):
     tool_call = response.choices[0].message.function_call
     if tool_call:
         arguments = json.loads(tool_call.arguments)
-        return {"needs_visualization": arguments.get("needs_visualization", False)}
+        return {
+            "needs_visualization": arguments.get("needs_visualization", False),
+            "visualization_type": arguments.get("visualization_type"),
+        }
     
-    return {"needs_visualization": False}
+    return {"needs_visualization": False, "visualization_type": None}
 
 
 async def visualization_generator_node(state: AgentState):
     """
     Generates a Vega-Lite specification for the data.
+    Only the encoding is chosen here (locally, or by the LLM from column
+    metadata); the spec is filled from a template and the rows are attached
+    server-side, so the cost doesn't grow with the result size.
     """
-    client = get_openai_client()
-    
-    query_to_use = state.get("refined_query", state["user_query"])
+    query_to_use = state.get("refined_query") or state["user_query"]
     results = state["query_result"]
-    
+    profile = state.get("result_profile") or profile_result(results)
+
+    encoding = choose_encoding(state.get("visualization_type"), profile, results["row_count"], title=query_to_use)
+    if encoding is not None:
+        _encoding_decisions.inc(source="rules")
+    else:
+        _encoding_decisions.inc(source="llm")
+        encoding = await _llm_encoding(query_to_use, state.get("visualization_type"), profile)
+        if encoding is None:
+            return {"visualization_spec": None}
+
+    if results["row_count"] <= VISUALIZATION_INLINE_MAX_ROWS and not results["truncated"]:
+        data = {"values": result_rows_as_dicts(results)}
+    else:
+        data = result_data_url(results["result_id"])
+    return {"visualization_spec": build_vega_lite_spec(encoding, profile, data)}
+
+
+async def _llm_encoding(query: str, chart_type: Optional[str], profile: List[ColumnProfile]) -> Optional[ChartEncoding]:
+    """Asks the LLM for an encoding given only column names and stats, never the rows."""
+    client = get_openai_client()
+    columns = "\n".join(format_column_profile(p) for p in profile)
+
     system_prompt = f"""You are a Vega-Lite expert.
-    Generate a valid Vega-Lite JSON specification to visualize the provided data.
+    Choose how to chart a query result. You only see its columns; the data is attached afterwards.
     
-    User Query: {query_to_use}
-    Data: {json.dumps(results)}
+    User Query: {query}
+    Suggested chart type: {chart_type or "any"}
+    Columns:
+    {columns}
     
     Rules:
-    1. Return ONLY the JSON object.
-    2. Use the 'data' property with 'values' set to the provided data.
-    3. Choose appropriate encodings based on the data types.
-    4. Add a title and tooltips.
-    5. Set "width": "container" to ensure it takes the full available width.
-    6. Set "height": 300 for a good aspect ratio.
-    7. Enable "autosize": {{ "type": "fit", "contains": "padding" }}.
+    1. x, y and color must be column names from the list above.
+    2. y must be a numeric column.
+    3. Use mark "arc" for pie charts (x is the slice label, y the slice size).
+    4. Only set aggregate if x values repeat and need combining.
     """
-    
+
     response = await client.chat.completions.create(
-        model="gpt-4o",
         messages=[
             {"role": "system", "content": system_prompt}
         ],
-        response_format={"type": "json_object"},
+        functions=[
+            {
+                "name": "choose_encoding",
+                "description": "Choose the chart encoding.",
+                "parameters": ChartEncoding.model_json_schema()
+            }
+        ],
+        function_call={"name": "choose_encoding"},
         temperature=0
     )
-    
+
+    tool_call = response.choices[0].message.function_call
     try:
-        spec = json.loads(response.choices[0].message.content)
-        return {"visualization_spec": spec}
+        encoding = ChartEncoding.model_validate_json(tool_call.arguments)
     except Exception as e:
-        print(f"Error generating viz: {e}")
-        return {"visualization_spec": None}
+        logger.warning(f"Error generating viz: {e}")
+        return None
+
+    names = {p["name"] for p in profile}
+    if encoding.x not in names or encoding.y not in names or (encoding.color and encoding.color not in names):
+        logger.warning(f"Error generating viz: encoding references unknown columns: {encoding}")
+        return None
+    return encoding
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, TypeVar
+
+from fastapi import Request
+
+from app.observability.cancellation import cancelled_run_seconds, cancelled_work
+
+# How often an idle stream checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
+T = TypeVar("T")
+_DONE = object()
+
+
+class Failed:
+    """Queued by a pump task in place of an item when its source raised; the reader re-raises `error`."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def until_disconnected(request: Request, source: AsyncIterator[T]) -> AsyncIterator[T]:
+    """
+    Re-yields `source`, which runs in its own task, and cancels that task as
+    soon as the client disconnects (or the response is torn down), so the
+    graph stops making LLM calls and its running SQL is interrupted.
+    """
+    queue: "asyncio.Queue" = asyncio.Queue(maxsize=64)
+
+    async def pump():
+        try:
+            async for item in source:
+                await queue.put(item)
+            await queue.put(_DONE)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            await queue.put(Failed(e))
+
+    started = time.monotonic()
+    task = asyncio.create_task(pump())
+    getter = None
+    finished = False
+    last_check = started
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=DISCONNECT_POLL_SECONDS)
+
+            # Checked while idle and, for busy streams, at most once per poll interval
+            now = time.monotonic()
+            if now - last_check >= DISCONNECT_POLL_SECONDS:
+                last_check = now
+                if await request.is_disconnected():
+                    return
+            if not done:
+                continue
+
+            item, getter = getter.result(), None
+            if item is _DONE:
+                finished = True
+                return
+            if isinstance(item, Failed):
+                finished = True
+                raise item.error
+            yield item
+    finally:
+        if getter is not None:
+            getter.cancel()
+        if finished:
+            await task
+        elif not task.done():
+            task.cancel()
+            cancelled_work.inc(kind="run")
+            cancelled_run_seconds.inc(time.monotonic() - started)
+            # asyncio.wait, unlike gather, doesn't re-cancel the task if this wait is
+            # itself cancelled (as Starlette does on disconnect), which would cut
+            # short the graph's own cleanup of its running nodes
+            await asyncio.wait({task})
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, Field
+from typing import List, Literal
 import asyncio
 
 from app.graph.graph import app_graph
+from app.tools.results import RESULT_PAGE_MAX_ROWS, fetch_result_page
+from app.services.batch import BATCH_MAX_QUESTIONS, run_batch
+from app.api.disconnect import until_disconnected
+from app.api.sse import dumps, encode_events
+from app.observability.tracing import RequestTrace, request_trace
 
 router = APIRouter()
 
@@ -12,14 +17,25 @@ class ChatRequest(BaseModel):
     message: str
     thread_id: str = "default_thread"
 
-async def event_generator(user_message: str, thread_id: str):
+class BatchRequest(BaseModel):
+    questions: List[str] = Field(min_length=1, max_length=BATCH_MAX_QUESTIONS)
+
+async def event_generator(user_message: str, thread_id: str, request: Request):
+    with request_trace("chat") as trace:
+        # Tokens are coalesced into fewer frames (SSE_COALESCE_MS / SSE_COALESCE_BYTES)
+        async for frame in encode_events(_chat_events(user_message, thread_id, request, trace)):
+            yield frame
+
+async def _chat_events(user_message: str, thread_id: str, request: Request, trace: RequestTrace):
     config = {"configurable": {"thread_id": thread_id}}
     inputs = {"user_query": user_message}
     
     try:
-        yield f"data: {json.dumps({'type': 'start', 'data': 'Workflow started'})}\n\n"
+        yield {'type': 'start', 'data': 'Workflow started'}
 
-        async for mode, payload in app_graph.astream(inputs, config=config, stream_mode=["updates", "custom"]):
+        # The run is cancelled (LLM streams closed, SQL interrupted) if the client goes away
+        stream = app_graph.astream(inputs, config=config, stream_mode=["updates", "custom"])
+        async for mode, payload in until_disconnected(request, stream):
             if mode == "updates":
                 for node_name, state_update in payload.items():
                     # Handle state updates (thinking process, visualizations, etc.)
@@ -41,20 +57,51 @@ async def event_generator(user_message: str, thread_id: str):
                             except:
                                 event_payload["data"] = str(state_update["query_result"])
 
-                    yield f"data: {json.dumps(event_payload)}\n\n"
+                    yield event_payload
                     
             elif mode == "custom":
                 # Handle custom token stream
-                yield f"data: {json.dumps({'type': 'token', 'content': payload})}\n\n"
+                yield {'type': 'token', 'content': payload}
         
-        yield f"data: {json.dumps({'type': 'end', 'data': 'Workflow finished'})}\n\n"
+        # Per-request breakdown: node wall times, LLM calls (TTFT, tokens, retries, cost), SQL time
+        yield {'type': 'end', 'data': 'Workflow finished', 'timing': trace.summary()}
 
     except Exception as e:
-        yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
+        yield {'type': 'error', 'error': str(e)}
 
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     return StreamingResponse(
-        event_generator(request.message, request.thread_id),
+        event_generator(request.message, request.thread_id, http_request),
         media_type="text/event-stream"
     )
+
+@router.post("/batch")
+async def batch_endpoint(request: BatchRequest, http_request: Request):
+    """
+    Answers many questions concurrently. Streams one NDJSON line per question
+    as soon as it finishes: {"index", "question", "response", "sql", "data",
+    "visualization", "error"}.
+    """
+    async def lines():
+        with request_trace("batch"):
+            async for item in until_disconnected(http_request, run_batch(app_graph, request.questions)):
+                yield dumps(item) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/results/{result_id}")
+async def result_page_endpoint(
+    result_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=RESULT_PAGE_MAX_ROWS),
+    format: Literal["columns", "records"] = "columns",
+):
+    """
+    Pages through the full result of an executed query beyond the rows kept in the chat stream.
+    format=records returns rows as objects; chart specs load their data this way.
+    """
+    page = await fetch_result_page(result_id, offset, limit, records=format == "records")
+    if page is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired result id")
+    return page
@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import gzip
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.api.disconnect import Failed
+from app.observability.metrics import counter
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library
+    orjson = None
+
+# Tokens are sent together once this much time has passed since the first unsent one, or this many bytes are pending
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "20"))
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "256"))
+# node_update events whose data/visualization serialize to at least this many bytes are gzipped (0 = never)
+SSE_GZIP_MIN_BYTES = int(os.getenv("SSE_GZIP_MIN_BYTES", "0"))
+
+_GZIPPED_FIELDS = ("data", "visualization")
+
+sse_frames = counter("sse_frames_total", "Server-sent event frames written, by event type.", ("type",))
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(payload, separators=(",", ":"), default=str).encode()
+
+
+def _gzip_fields(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Moves a node_update's large data/visualization fields into one gzipped,
+    base64-encoded JSON object under "gzip", for the client to unpack.
+    """
+    fields = {k: event[k] for k in _GZIPPED_FIELDS if k in event}
+    if not fields:
+        return event
+    raw = dumps(fields)
+    if len(raw) < SSE_GZIP_MIN_BYTES:
+        return event
+    packed = {k: v for k, v in event.items() if k not in fields}
+    packed["gzip"] = base64.b64encode(gzip.compress(raw, compresslevel=6)).decode()
+    return packed
+
+
+def sse_frame(event: Dict[str, Any]) -> bytes:
+    """One `data:` frame for an event."""
+    if SSE_GZIP_MIN_BYTES and event.get("type") == "node_update":
+        event = _gzip_fields(event)
+    sse_frames.inc(type=event.get("type", ""))
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+_END = object()
+
+
+async def encode_events(
+    events: AsyncIterator[Dict[str, Any]],
+    window_ms: float = SSE_COALESCE_MS,
+    max_bytes: int = SSE_COALESCE_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Encodes chat events as SSE frames. Consecutive token events are merged
+    into one frame, sent `window_ms` after the first of them arrived or once
+    `max_bytes` are pending, whichever is first; any other event sends the
+    pending tokens ahead of itself, so ordering is kept. `window_ms=0` sends
+    every token as its own frame.
+
+    `events` is read and encoded by one task that queues finished frames, so
+    the response only wakes up per frame, and the window is one timer per
+    frame rather than a timeout per token.
+    """
+    loop = asyncio.get_running_loop()
+    frames: "asyncio.Queue" = asyncio.Queue()
+    pending: List[str] = []
+    pending_bytes = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def flush():
+        nonlocal pending, pending_bytes, timer
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        if pending:
+            frames.put_nowait(sse_frame({"type": "token", "content": "".join(pending)}))
+            pending, pending_bytes = [], 0
+
+    async def pump():
+        nonlocal pending_bytes, timer
+        try:
+            async for event in events:
+                if event.get("type") == "token" and window_ms > 0:
+                    pending.append(event["content"])
+                    pending_bytes += len(event["content"])
+                    if pending_bytes >= max_bytes:
+                        flush()
+                    elif timer is None:
+                        timer = loop.call_later(window_ms / 1000, flush)
+                    continue
+                flush()
+                frames.put_nowait(sse_frame(event))
+            flush()
+            frames.put_nowait(_END)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            frames.put_nowait(Failed(e))
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            frame = await frames.get()
+            if frame is _END:
+                return
+            if isinstance(frame, Failed):
+                raise frame.error
+            yield frame
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if not task.done():
+            task.cancel()
+        await asyncio.wait({task})
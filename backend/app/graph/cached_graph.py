@@ -0,0 +1,120 @@
+from typing import Any, Dict, Optional
+
+from app.services.answer_cache import AnswerCache, CachedAnswer
+from app.tools.catalog import get_schema_catalog_async
+from app.tools.results import execute_query_result, register_result, result_data_url
+from app.tools.sql import get_data_stamp
+
+
+class AnswerCachingGraph:
+    """
+    Wraps the compiled LangGraph workflow with the answer cache.
+
+    - Fresh hit (same schema, unchanged data): the cached answer is replayed,
+      no LLM call and at most one SQL execution.
+    - Stale hit (data changed): the cached SQL is re-executed and only the
+      synthesizer/visualization nodes run again.
+    - Miss: the full workflow runs and its answer is cached.
+
+    Everything not overridden here is delegated to the wrapped graph.
+    """
+
+    def __init__(self, graph, cache: Optional[AnswerCache]):
+        self._graph = graph
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+    async def astream(self, inputs, config=None, stream_mode="updates", **kwargs):
+        user_query = inputs.get("user_query") if isinstance(inputs, dict) else None
+        if self._cache is None or not user_query:
+            async for item in self._graph.astream(inputs, config, stream_mode=stream_mode, **kwargs):
+                yield item
+            return
+
+        schema_version = (await get_schema_catalog_async()).schema_version
+        data_stamp = get_data_stamp()
+        entry = await self._cache.lookup(user_query, schema_version)
+
+        if entry is not None and entry.data_stamp == data_stamp:
+            async for item in self._replay(entry, stream_mode):
+                yield item
+            return
+
+        if entry is not None:
+            # Same question, new data: skip straight to validating the cached SQL
+            await self._graph.aupdate_state(config, self._resume_values(user_query, entry), as_node="sql_generator")
+            stream = self._graph.astream(None, config, stream_mode=stream_mode, **kwargs)
+        else:
+            stream = self._graph.astream(inputs, config, stream_mode=stream_mode, **kwargs)
+
+        async for item in stream:
+            yield item
+
+        await self._remember(user_query, schema_version, data_stamp, config)
+
+    @staticmethod
+    def _resume_values(user_query: str, entry: CachedAnswer) -> Dict[str, Any]:
+        return {
+            "user_query": user_query,
+            "refined_query": entry.refined_query or user_query,
+            "relevance": "relevant",
+            "selected_tables": entry.selected_tables,
+            "generated_sql": entry.generated_sql,
+            "retry_count": 0,
+            "validation_error": None,
+            "query_error": None,
+            "query_error_kind": None,
+            "sql_attempts": [],
+            "needs_visualization": False,
+            "visualization_type": None,
+            "visualization_spec": None,
+        }
+
+    async def _replay(self, entry: CachedAnswer, stream_mode):
+        results = entry.query_result
+        if results is None:
+            # Result was too large to cache; the SQL is still good for this data
+            results = await execute_query_result(entry.generated_sql)
+        else:
+            # Cached handles may have been evicted (or predate a restart)
+            results = {**results, "result_id": register_result(entry.generated_sql)}
+
+        spec = entry.visualization_spec
+        if spec and "url" in spec.get("data", {}):
+            # Large charts load their rows by result id, which was just re-issued
+            spec = {**spec, "data": result_data_url(results["result_id"])}
+
+        update = {
+            "answer_cache": {
+                "generated_sql": entry.generated_sql,
+                "query_result": results,
+                "natural_response": entry.natural_response,
+                "visualization_spec": spec,
+            }
+        }
+        yield ("updates", update) if isinstance(stream_mode, list) else update
+
+    async def _remember(self, user_query: str, schema_version: int, data_stamp: str, config):
+        state = (await self._graph.aget_state(config)).values
+        if (
+            state.get("relevance") != "relevant"
+            or not state.get("generated_sql")
+            or not state.get("is_valid_sql")
+            or state.get("query_error")
+            or not state.get("natural_response")
+        ):
+            return
+
+        await self._cache.store(
+            user_query,
+            schema_version=schema_version,
+            data_stamp=data_stamp,
+            refined_query=state.get("refined_query"),
+            selected_tables=state.get("selected_tables", []),
+            generated_sql=state["generated_sql"],
+            query_result=state.get("query_result"),
+            natural_response=state["natural_response"],
+            visualization_spec=state.get("visualization_spec") if state.get("needs_visualization") else None,
+        )
@@ -0,0 +1,388 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "sqlite")  # "sqlite" or "memory"
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", str(Path(__file__).parents[1] / "data" / "checkpoints.sqlite"))
+# Checkpoints kept per thread; older ones are deleted
+CHECKPOINT_MAX_PER_THREAD = int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20"))
+# Newest checkpoints per thread that keep large payloads; older ones are compacted
+CHECKPOINT_FULL_PAYLOAD_LATEST = int(os.getenv("CHECKPOINT_FULL_PAYLOAD_LATEST", "1"))
+# Threads idle for longer than this are deleted
+CHECKPOINT_THREAD_TTL_SECONDS = float(os.getenv("CHECKPOINT_THREAD_TTL_SECONDS", str(7 * 24 * 3600)))
+CHECKPOINT_SWEEP_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Channels whose values can be large (raw rows, chart data) and are dropped on compaction
+COMPACTED_CHANNELS = ("query_result", "visualization_spec")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT,
+    metadata BLOB NOT NULL,
+    compacted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threads_last_access ON threads (last_access);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Size-bounded, persistent LangGraph checkpointer backed by a local SQLite/WAL file.
+
+    - Retention: at most `max_per_thread` checkpoints are kept per thread.
+    - Compaction: all but the newest `full_payload_latest` checkpoints have
+      their large channels (raw rows, chart data) dropped.
+    - TTL: threads idle for longer than `thread_ttl_seconds` are deleted.
+    """
+
+    def __init__(
+        self,
+        path: str = CHECKPOINT_DB_PATH,
+        max_per_thread: int = CHECKPOINT_MAX_PER_THREAD,
+        full_payload_latest: int = CHECKPOINT_FULL_PAYLOAD_LATEST,
+        thread_ttl_seconds: float = CHECKPOINT_THREAD_TTL_SECONDS,
+        sweep_interval_seconds: float = CHECKPOINT_SWEEP_INTERVAL_SECONDS,
+    ):
+        super().__init__()
+        self.max_per_thread = max(1, max_per_thread)
+        self.full_payload_latest = max(1, full_payload_latest)
+        self.thread_ttl_seconds = thread_ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    # --- Reads -----------------------------------------------------------
+
+    def _pending_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        rows = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._pending_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                tup = self._to_tuple(thread_id, checkpoint_ns, row)
+                if filter and not all(tup.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                tuples.append(tup)
+        yield from tuples
+
+    # --- Writes ----------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, payload = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_payload = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    payload,
+                    metadata_type,
+                    metadata_payload,
+                ),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO threads (thread_id, last_access) VALUES (?, ?)",
+                (thread_id, time.time()),
+            )
+            self._enforce_retention(thread_id, checkpoint_ns)
+            self._compact(thread_id, checkpoint_ns)
+            self.conn.commit()
+            self._maybe_sweep()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts) have fixed negative indexes and are upserted
+        upsert = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, payload = self.serde.dumps_typed(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, type_, payload, task_path,
+            ))
+        verb = "INSERT OR REPLACE" if upsert else "INSERT OR IGNORE"
+        with self._lock:
+            self.conn.executemany(
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, "
+                "channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_threads([thread_id])
+            self.conn.commit()
+
+    # --- Bounding --------------------------------------------------------
+
+    def _delete_threads(self, thread_ids):
+        params = [(t,) for t in thread_ids]
+        self.conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", params)
+        self.conn.executemany("DELETE FROM writes WHERE thread_id = ?", params)
+        self.conn.executemany("DELETE FROM threads WHERE thread_id = ?", params)
+
+    def _enforce_retention(self, thread_id: str, checkpoint_ns: str):
+        """Deletes checkpoints (and their writes) beyond the per-thread limit."""
+        stale = self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_per_thread),
+        ).fetchall()
+        if not stale:
+            return
+        params = [(thread_id, checkpoint_ns, checkpoint_id) for (checkpoint_id,) in stale]
+        self.conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params
+        )
+        self.conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params
+        )
+
+    def _compact(self, thread_id: str, checkpoint_ns: str):
+        """Drops large channel values from all but the newest checkpoints of the thread."""
+        rows = self.conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND compacted = 0 "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.full_payload_latest),
+        ).fetchall()
+        for checkpoint_id, type_, payload in rows:
+            checkpoint = self.serde.loads_typed((type_, payload))
+            values = checkpoint.get("channel_values", {})
+            if any(channel in values for channel in COMPACTED_CHANNELS):
+                checkpoint["channel_values"] = {k: v for k, v in values.items() if k not in COMPACTED_CHANNELS}
+                type_, payload = self.serde.dumps_typed(checkpoint)
+            self.conn.execute(
+                "UPDATE checkpoints SET type = ?, checkpoint = ?, compacted = 1 "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (type_, payload, thread_id, checkpoint_ns, checkpoint_id),
+            )
+            placeholders = ", ".join("?" for _ in COMPACTED_CHANNELS)
+            self.conn.execute(
+                f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                f"AND channel IN ({placeholders})",
+                (thread_id, checkpoint_ns, checkpoint_id, *COMPACTED_CHANNELS),
+            )
+
+    def _maybe_sweep(self):
+        """Deletes threads idle for longer than the TTL, at most once per sweep interval."""
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval_seconds:
+            return
+        self._last_sweep = now
+        expired = self.conn.execute(
+            "SELECT thread_id FROM threads WHERE last_access < ?", (now - self.thread_ttl_seconds,)
+        ).fetchall()
+        if expired:
+            self._delete_threads([thread_id for (thread_id,) in expired])
+            self.conn.commit()
+
+    # --- Async API: same operations on a worker thread --------------------
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for tup in tuples:
+            yield tup
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def get_checkpointer(backend: str = CHECKPOINTER_BACKEND) -> BaseCheckpointSaver:
+    """Returns the configured checkpointer backend ("sqlite" or "memory")."""
+    if backend == "memory":
+        # Unbounded and lost on restart; useful for development and tests
+        return MemorySaver()
+    if backend == "sqlite":
+        return SqliteCheckpointSaver()
+    raise ValueError(f"Unknown CHECKPOINTER_BACKEND: {backend}")
@@ -1,36 +1,32 @@
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+import os
+from typing import Optional
+
+from langgraph.graph import StateGraph, START, END
 
 from app.state.state import AgentState
 from app.agents.router import query_router_node
-from app.agents.router import query_router_node
 from app.agents.rewriter import query_rewriter_node
 from app.agents.general import general_agent_node
-from app.agents.table_selector import table_selector_node
+from app.agents.table_selector import table_selector_node, speculative_table_selector_node
+from app.agents.frontend import fused_frontend_node
 from app.agents.sql_generator import sql_generator_node
+from app.agents.sql_repair import sql_repair_node
 from app.agents.validator import sql_validator_node
 from app.agents.executor import sql_executor_node
 from app.agents.synthesizer import response_synthesizer_node
 from app.agents.visualization import visualization_planner_node, visualization_generator_node
-
-# Define Graph
-workflow = StateGraph(AgentState)
-
-# Add Nodes
-# Add Nodes
-workflow.add_node("query_router", query_router_node)
-workflow.add_node("query_rewriter", query_rewriter_node)
-workflow.add_node("general_agent", general_agent_node)
-workflow.add_node("table_selector", table_selector_node)
-workflow.add_node("sql_generator", sql_generator_node)
-workflow.add_node("sql_validator", sql_validator_node)
-workflow.add_node("sql_executor", sql_executor_node)
-workflow.add_node("response_synthesizer", response_synthesizer_node)
-workflow.add_node("visualization_planner", visualization_planner_node)
-workflow.add_node("visualization_generator", visualization_generator_node)
-
-# Add Entry Point
-workflow.set_entry_point("query_router")
+from app.graph.cached_graph import AnswerCachingGraph
+from app.graph.checkpointer import get_checkpointer
+from app.services.answer_cache import get_answer_cache
+from app.observability.logger import logger
+from app.observability.tracing import traced_node
+
+# Run the rewriter and table selector in parallel with the router instead of after it
+SPECULATIVE_FRONTEND = os.getenv("SPECULATIVE_FRONTEND", "false").lower() == "true"
+# Route, rewrite and select tables in one LLM call (takes precedence over SPECULATIVE_FRONTEND)
+FUSED_FRONTEND = os.getenv("FUSED_FRONTEND", "false").lower() == "true"
+# Send failed queries to the repair node (fix this query) instead of regenerating them from scratch
+SQL_REPAIR_ENABLED = os.getenv("SQL_REPAIR_ENABLED", "true").lower() == "true"
 
 # Conditional Edges
 
@@ -39,13 +35,26 @@ def router_edge(state: AgentState):
         return "general_agent"
     return "query_rewriter"
 
+def fused_frontend_edge(state: AgentState):
+    if state.get("relevance") is None:
+        # Unparseable fused output: redo the front-end with the split nodes
+        return "query_router"
+    if state["relevance"] == "irrelevant":
+        return "general_agent"
+    return "sql_generator"
+
+def speculation_edge(state: AgentState):
+    if state["relevance"] == "irrelevant":
+        return "general_agent"
+    return "sql_generator"
+
 def validator_edge(state: AgentState):
     if state["is_valid_sql"]:
         return "sql_executor"
     else:
         # Check retry count (default max 3)
         if state.get("retry_count", 0) < 3:
-            return "sql_generator"
+            return "retry"
         return "end"
 
 def visualization_edge(state: AgentState):
@@ -53,72 +62,165 @@ def visualization_edge(state: AgentState):
         return "visualization_generator"
     return "end"
 
-workflow.add_conditional_edges(
-    "query_router",
-    router_edge,
-    {
-        "general_agent": "general_agent",
-        "query_rewriter": "query_rewriter"
-    }
-)
-
-workflow.add_edge("query_rewriter", "table_selector")
-workflow.add_edge("table_selector", "sql_generator")
-workflow.add_edge("sql_generator", "sql_validator")
-
-workflow.add_conditional_edges(
-    "sql_validator",
-    validator_edge,
-    {
-        "sql_executor": "sql_executor",
-        "sql_generator": "sql_generator",
-        "end": END
-    }
-)
-
 def executor_edge(state: AgentState):
     """Route based on execution success/failure"""
     query_error = state.get("query_error")
     retry_count = state.get("retry_count", 0)
-    
-    print(f"[Executor Edge] Query error: {query_error}")
-    print(f"[Executor Edge] Retry count: {retry_count}")
-    
+
     if query_error:
         # Check retry count
         if retry_count < 3:
-            print(f"[Executor Edge] Routing to sql_generator for retry")
-            return "sql_generator"
+            logger.debug(f"[Executor Edge] Query error, retry {retry_count}: {query_error}")
+            return "retry"
         # Max retries reached, proceed to synthesizer to report error
-        print(f"[Executor Edge] Max retries reached, routing to response_synthesizer")
+        logger.warning(f"[Executor Edge] Max retries reached, last error: {query_error}")
         return "response_synthesizer"
-    
-    print(f"[Executor Edge] No error, routing to response_synthesizer")
+
     return "response_synthesizer"
 
-workflow.add_conditional_edges(
-    "sql_executor",
-    executor_edge,
-    {
-        "sql_generator": "sql_generator",
-        "response_synthesizer": "response_synthesizer"
-    }
-)
-workflow.add_edge("response_synthesizer", "visualization_planner")
-
-workflow.add_conditional_edges(
-    "visualization_planner",
-    visualization_edge,
-    {
-        "visualization_generator": "visualization_generator",
-        "end": END
-    }
-)
-
-workflow.add_edge("visualization_generator", END)
-workflow.add_edge("general_agent", END)
-
-# Compile with MemorySaver for in-memory session isolation
-# Each thread_id gets isolated conversation history (lost on restart)
-checkpointer = MemorySaver()
-app_graph = workflow.compile(checkpointer=checkpointer)
+def speculation_join_node(state: AgentState):
+    """
+    Waits for the router, rewriter and table selector to finish.
+    Speculative work is discarded when the query turns out to be irrelevant.
+    """
+    if state["relevance"] == "irrelevant":
+        return {"refined_query": None, "selected_tables": []}
+    return {}
+
+def _add_node(workflow: StateGraph, name: str, fn, task: Optional[str] = None):
+    """
+    Adds a node wrapped for per-node timing and LLM call attribution; `task`
+    is the LLM task class the gateway uses to pick its model tier and timeout.
+    """
+    workflow.add_node(name, traced_node(name, fn, task))
+
+def _add_sequential_frontend(workflow: StateGraph, entry: bool = True):
+    """Router -> rewriter -> table selector, one LLM round-trip after another."""
+    _add_node(workflow, "query_router", query_router_node, task="classify")
+    _add_node(workflow, "query_rewriter", query_rewriter_node, task="rewrite")
+    _add_node(workflow, "table_selector", table_selector_node, task="select_tables")
+
+    if entry:
+        workflow.add_edge(START, "query_router")
+    workflow.add_conditional_edges(
+        "query_router",
+        router_edge,
+        {
+            "general_agent": "general_agent",
+            "query_rewriter": "query_rewriter"
+        }
+    )
+    workflow.add_edge("query_rewriter", "table_selector")
+    workflow.add_edge("table_selector", "sql_generator")
+
+def _add_speculative_frontend(workflow: StateGraph):
+    """Router, rewriter and raw-query table selector fan out from START in parallel."""
+    _add_node(workflow, "query_router", query_router_node, task="classify")
+    _add_node(workflow, "query_rewriter", query_rewriter_node, task="rewrite")
+    _add_node(workflow, "table_selector", speculative_table_selector_node, task="select_tables")
+    _add_node(workflow, "speculation_join", speculation_join_node)
+
+    frontend = ["query_router", "query_rewriter", "table_selector"]
+    for node in frontend:
+        workflow.add_edge(START, node)
+    workflow.add_edge(frontend, "speculation_join")
+    workflow.add_conditional_edges(
+        "speculation_join",
+        speculation_edge,
+        {
+            "general_agent": "general_agent",
+            "sql_generator": "sql_generator"
+        }
+    )
+
+def _add_fused_frontend(workflow: StateGraph):
+    """One structured call for relevance, rewrite and tables; the split nodes are kept as its fallback."""
+    _add_node(workflow, "fused_frontend", fused_frontend_node, task="select_tables")
+    _add_sequential_frontend(workflow, entry=False)
+
+    workflow.add_edge(START, "fused_frontend")
+    workflow.add_conditional_edges(
+        "fused_frontend",
+        fused_frontend_edge,
+        {
+            "query_router": "query_router",
+            "general_agent": "general_agent",
+            "sql_generator": "sql_generator"
+        }
+    )
+
+def build_workflow(
+    speculative: bool = SPECULATIVE_FRONTEND, fused: bool = FUSED_FRONTEND, repair: bool = SQL_REPAIR_ENABLED
+) -> StateGraph:
+    """
+    Builds the agent workflow; `fused` selects the single-call front-end,
+    otherwise `speculative` selects the parallel one. With `repair`, failed
+    queries are retried through the repair node, otherwise regenerated.
+    """
+    workflow = StateGraph(AgentState)
+
+    # Add Nodes
+    _add_node(workflow, "general_agent", general_agent_node, task="summarize")
+    _add_node(workflow, "sql_generator", sql_generator_node, task="generate_sql")
+    _add_node(workflow, "sql_validator", sql_validator_node)
+    if repair:
+        _add_node(workflow, "sql_repair", sql_repair_node, task="generate_sql")
+    _add_node(workflow, "sql_executor", sql_executor_node)
+    _add_node(workflow, "response_synthesizer", response_synthesizer_node, task="summarize")
+    _add_node(workflow, "visualization_planner", visualization_planner_node, task="chart")
+    _add_node(workflow, "visualization_generator", visualization_generator_node, task="chart")
+
+    if fused:
+        _add_fused_frontend(workflow)
+    elif speculative:
+        _add_speculative_frontend(workflow)
+    else:
+        _add_sequential_frontend(workflow)
+
+    workflow.add_edge("sql_generator", "sql_validator")
+    if repair:
+        workflow.add_edge("sql_repair", "sql_validator")
+    retry = "sql_repair" if repair else "sql_generator"
+
+    workflow.add_conditional_edges(
+        "sql_validator",
+        validator_edge,
+        {
+            "sql_executor": "sql_executor",
+            "retry": retry,
+            "end": END
+        }
+    )
+
+    workflow.add_conditional_edges(
+        "sql_executor",
+        executor_edge,
+        {
+            "retry": retry,
+            "response_synthesizer": "response_synthesizer"
+        }
+    )
+    workflow.add_edge("response_synthesizer", "visualization_planner")
+
+    workflow.add_conditional_edges(
+        "visualization_planner",
+        visualization_edge,
+        {
+            "visualization_generator": "visualization_generator",
+            "end": END
+        }
+    )
+
+    workflow.add_edge("visualization_generator", END)
+    workflow.add_edge("general_agent", END)
+    return workflow
+
+# Define Graph
+workflow = build_workflow()
+
+# Each thread_id gets isolated conversation history. The default SQLite
+# checkpointer persists it with per-thread retention, compaction and TTL;
+# CHECKPOINTER_BACKEND=memory restores the unbounded in-memory MemorySaver.
+checkpointer = get_checkpointer()
+# Repeat questions are answered from the answer cache without running the LLM pipeline
+app_graph = AnswerCachingGraph(workflow.compile(checkpointer=checkpointer), get_answer_cache())
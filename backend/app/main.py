@@ -1,8 +1,31 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.routes import router as api_router
+from app.tools.sql import close_connection_pool
+from app.tools.catalog import get_schema_catalog_async
+from app.tools.engines import get_analytic_engine
+from app.observability.metrics import render_metrics
+from app.observability.logger import logger
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the schema catalog once up front so the first request doesn't pay for it
+    try:
+        await get_schema_catalog_async()
+    except ConnectionError as e:
+        logger.warning(f"Schema catalog not loaded at startup: {e}")
+    # Start building the analytic engine's mirror in the background
+    analytic = get_analytic_engine()
+    if analytic is not None:
+        analytic.current()
+    yield
+    # Release pooled SQLite connections and worker threads
+    close_connection_pool()
 
-app = FastAPI(title="SQL Agent API", version="1.0.0")
+app = FastAPI(title="SQL Agent API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -20,6 +43,11 @@ app.include_router(api_router, prefix="/api")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
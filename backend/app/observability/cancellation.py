@@ -0,0 +1,12 @@
+from app.observability.metrics import counter
+
+# Shared by the API layer (runs), the LLM nodes (streams) and the SQL layer (queries)
+cancelled_work = counter(
+    "cancelled_work_total",
+    "Work abandoned because the client disconnected, by kind (run, llm_stream, sql_query).",
+    ("kind",),
+)
+cancelled_run_seconds = counter(
+    "cancelled_run_seconds_total",
+    "How long cancelled runs had been going when their client disconnected.",
+)
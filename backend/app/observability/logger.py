@@ -1,5 +1,6 @@
 import logging
 import json
+import os
 import sys
 from datetime import datetime
 
@@ -19,7 +20,7 @@ class JsonFormatter(logging.Formatter):
 
 def setup_logger(name: str = "sql_agent"):
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
     
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(JsonFormatter())
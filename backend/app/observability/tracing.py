@@ -0,0 +1,211 @@
+import asyncio
+import functools
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.observability.metrics import counter, histogram
+
+# USD per 1M (prompt, completion) tokens, for the per-request cost estimate
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+node_duration = histogram("graph_node_duration_seconds", "Wall time per graph node run.", ("node",))
+llm_duration = histogram("llm_request_duration_seconds", "Wall time per LLM call, until the last token.", ("node", "model"))
+llm_ttft = histogram("llm_time_to_first_token_seconds", "Time to the first streamed token of an LLM call.", ("node", "model"))
+llm_tokens = counter("llm_tokens_total", "LLM tokens by node, model and kind (prompt/completion).", ("node", "model", "kind"))
+llm_retries = counter("llm_retries_total", "HTTP-level retries of LLM calls (rate limits, transient errors).", ("node", "model"))
+llm_cost = counter("llm_cost_usd_total", "Estimated LLM spend in USD from token usage and MODEL_PRICES.", ("model",))
+sql_duration = histogram("sql_query_duration_seconds", "Wall time per SQL statement, including queueing for a worker.", ("kind",))
+request_duration = histogram("request_duration_seconds", "Wall time per chat/batch request.", ("endpoint",))
+
+
+class LLMCall:
+    """Timing and usage of one chat completion."""
+
+    def __init__(self, node: str, model: str):
+        self.node = node
+        self.model = model
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.attempts = 0  # HTTP attempts, counted by the rate-limit request hook
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def set_usage(self, usage):
+        if usage is not None:
+            self.prompt_tokens = usage.prompt_tokens
+            self.completion_tokens = usage.completion_tokens
+
+    @property
+    def cost_usd(self) -> Optional[float]:
+        prices = MODEL_PRICES.get(self.model)
+        if prices is None or self.prompt_tokens is None:
+            return None
+        return (self.prompt_tokens * prices[0] + (self.completion_tokens or 0) * prices[1]) / 1_000_000
+
+    def finish(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.started
+        llm_duration.observe(self.duration, node=self.node, model=self.model)
+        if self.ttft is not None:
+            llm_ttft.observe(self.ttft, node=self.node, model=self.model)
+        if self.prompt_tokens is not None:
+            llm_tokens.inc(self.prompt_tokens, node=self.node, model=self.model, kind="prompt")
+            llm_tokens.inc(self.completion_tokens or 0, node=self.node, model=self.model, kind="completion")
+        if self.cost_usd is not None:
+            llm_cost.inc(self.cost_usd, model=self.model)
+        if self.attempts > 1:
+            llm_retries.inc(self.attempts - 1, node=self.node, model=self.model)
+
+
+class RequestTrace:
+    """Everything timed during one request: node runs, LLM calls and SQL statements."""
+
+    def __init__(self):
+        self.request_id = uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.nodes: List[Dict[str, Any]] = []
+        self.llm_calls: List[LLMCall] = []
+        self.sql_seconds = 0.0
+        self.sql_statements = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-request timing breakdown, attached to the SSE `end` event."""
+        nodes: Dict[str, Dict[str, Any]] = {}
+        for run in self.nodes:
+            entry = nodes.setdefault(run["node"], {"runs": 0, "ms": 0.0})
+            entry["runs"] += 1
+            entry["ms"] += run["ms"]
+        for entry in nodes.values():
+            entry["ms"] = round(entry["ms"], 1)
+
+        llm = []
+        for call in self.llm_calls:
+            llm.append({
+                "node": call.node,
+                "model": call.model,
+                "ms": round(call.duration * 1000, 1) if call.duration is not None else None,
+                "ttft_ms": round(call.ttft * 1000, 1) if call.ttft is not None else None,
+                "prompt_tokens": call.prompt_tokens,
+                "completion_tokens": call.completion_tokens,
+                "retries": max(call.attempts - 1, 0),
+            })
+        costs = [c.cost_usd for c in self.llm_calls if c.cost_usd is not None]
+        return {
+            "request_id": self.request_id,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "nodes": nodes,
+            "llm_calls": llm,
+            "prompt_tokens": sum(c.prompt_tokens or 0 for c in self.llm_calls),
+            "completion_tokens": sum(c.completion_tokens or 0 for c in self.llm_calls),
+            "cost_usd": round(sum(costs), 6) if costs else None,
+            "sql_ms": round(self.sql_seconds * 1000, 1),
+            "sql_statements": self.sql_statements,
+            "sql_retries": max(nodes.get("sql_generator", {}).get("runs", 0) - 1, 0) + nodes.get("sql_repair", {}).get("runs", 0),
+        }
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+_node: ContextVar[str] = ContextVar("graph_node", default="")
+_llm_call: ContextVar[Optional[LLMCall]] = ContextVar("llm_call", default=None)
+_task: ContextVar[Optional[str]] = ContextVar("llm_task", default=None)
+
+
+@contextmanager
+def request_trace(endpoint: str):
+    """Starts a trace for the current request; tasks spawned inside inherit it."""
+    trace = RequestTrace()
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        try:
+            _trace.reset(token)
+        except ValueError:
+            pass  # a streaming response closed from another context
+        request_duration.observe(time.perf_counter() - trace.started, endpoint=endpoint)
+
+
+def current_task() -> Optional[str]:
+    """The LLM task class declared by the running graph node, if any."""
+    return _task.get()
+
+
+def current_llm_call() -> Optional[LLMCall]:
+    """The LLM call in progress in this context (used to count HTTP attempts)."""
+    return _llm_call.get()
+
+
+@contextmanager
+def llm_call(model: str):
+    """Times one LLM request; HTTP attempts made inside the block are counted against it."""
+    call = LLMCall(_node.get() or "other", model)
+    trace = _trace.get()
+    if trace is not None:
+        trace.llm_calls.append(call)
+    token = _llm_call.set(call)
+    try:
+        yield call
+    finally:
+        _llm_call.reset(token)
+
+
+def record_sql(kind: str, seconds: float):
+    sql_duration.observe(seconds, kind=kind)
+    trace = _trace.get()
+    if trace is not None:
+        trace.sql_seconds += seconds
+        trace.sql_statements += 1
+
+
+def _record_node(name: str, started: float):
+    elapsed = time.perf_counter() - started
+    node_duration.observe(elapsed, node=name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.nodes.append({"node": name, "ms": elapsed * 1000})
+
+
+def traced_node(name: str, fn, task: Optional[str] = None):
+    """
+    Wraps a graph node so its runs are timed and its LLM calls attributed to
+    it. `task` is the node's LLM task class, which the gateway routes on.
+    """
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(state):
+            tokens = _node.set(name), _task.set(task)
+            started = time.perf_counter()
+            try:
+                return await fn(state)
+            finally:
+                _record_node(name, started)
+                _node.reset(tokens[0])
+                _task.reset(tokens[1])
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        tokens = _node.set(name), _task.set(task)
+        started = time.perf_counter()
+        try:
+            return fn(state)
+        finally:
+            _record_node(name, started)
+            _node.reset(tokens[0])
+            _task.reset(tokens[1])
+    return wrapper
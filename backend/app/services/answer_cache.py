@@ -0,0 +1,251 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.observability.metrics import counter
+from app.observability.logger import logger
+from app.services.llm import get_openai_client
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", str(Path(__file__).parents[1] / "data" / "answer_cache.sqlite"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+# Larger results are not stored; a hit re-executes the cached SQL instead
+ANSWER_CACHE_MAX_RESULT_ROWS = int(os.getenv("ANSWER_CACHE_MAX_RESULT_ROWS", "1000"))
+# Optional embedding-nearest lookup for paraphrased questions
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "false").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_EMBEDDING_MODEL = os.getenv("ANSWER_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+
+cache_lookups = counter("answer_cache_lookups_total", "Answer cache lookups by outcome.", ("result",))
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases and strips punctuation/extra whitespace so trivially different phrasings share a key."""
+    return " ".join(_WORD_RE.findall(question.lower()))
+
+
+class CachedAnswer(BaseModel):
+    """A completed answer to a relevant question."""
+    question: str
+    schema_version: int
+    data_stamp: str
+    refined_query: Optional[str] = None
+    selected_tables: List[str] = []
+    generated_sql: str
+    query_result: Optional[Dict[str, Any]] = None
+    natural_response: str
+    visualization_spec: Optional[Dict[str, Any]] = None
+    created_at: float
+    embedding: Optional[List[float]] = None
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of answers keyed on (normalized question, schema version),
+    with a write-through SQLite store so entries survive restarts.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = ANSWER_CACHE_PATH,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        semantic: bool = ANSWER_CACHE_SEMANTIC,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic = semantic
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        # A miss embeds the question once for lookup and reuses it for store
+        self._embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Unit-length embeddings of the entries that have one, rebuilt on the first lookup after a change
+        self._vectors: Optional[np.ndarray] = None
+        self._vector_keys: List[str] = []
+        self._vector_versions: Optional[np.ndarray] = None
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open_store(path)
+
+    @staticmethod
+    def _key(question: str, schema_version: int) -> str:
+        return f"{schema_version}:{question}"
+
+    def _open_store(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM answers WHERE created_at < ?", (cutoff,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, payload FROM answers ORDER BY created_at DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        # Oldest first so the most recent entries end up at the MRU end
+        for key, payload in reversed(rows):
+            self._entries[key] = CachedAnswer.model_validate_json(payload)
+
+    def _expired(self, entry: CachedAnswer) -> bool:
+        return time.time() - entry.created_at > self.ttl_seconds
+
+    def _get(self, key: str) -> Optional[CachedAnswer]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                self._vectors = None
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    async def _embed(self, question: str) -> List[float]:
+        if question in self._embeddings:
+            return self._embeddings[question]
+        client = get_openai_client()
+        response = await client.embeddings.create(model=ANSWER_CACHE_EMBEDDING_MODEL, input=question)
+        embedding = response.data[0].embedding
+        self._embeddings[question] = embedding
+        while len(self._embeddings) > 256:
+            self._embeddings.popitem(last=False)
+        return embedding
+
+    def _matrix(self, dim: int) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """The entries' unit embeddings (one row each), their keys and schema versions. Call with the lock held."""
+        if self._vectors is None or self._vectors.shape[1] != dim:
+            keyed = [(k, e) for k, e in self._entries.items() if e.embedding and len(e.embedding) == dim]
+            vectors = np.array([e.embedding for _, e in keyed], dtype=np.float32).reshape(len(keyed), dim)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._vectors = vectors / np.where(norms == 0, 1.0, norms)
+            self._vector_keys = [k for k, _ in keyed]
+            self._vector_versions = np.array([e.schema_version for _, e in keyed], dtype=np.int64)
+        return self._vectors, self._vector_keys, self._vector_versions
+
+    def _nearest(self, embedding: List[float], schema_version: int) -> Optional[CachedAnswer]:
+        """The most similar unexpired entry at or above ANSWER_CACHE_SIMILARITY, scored in one matrix product."""
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        with self._lock:
+            vectors, keys, versions = self._matrix(len(query))
+            scores = vectors @ query
+            scores[versions != schema_version] = -np.inf
+            hits = np.flatnonzero(scores >= ANSWER_CACHE_SIMILARITY)
+            for i in hits[np.argsort(-scores[hits])]:
+                entry = self._entries.get(keys[i])
+                if entry is not None and not self._expired(entry):
+                    return entry
+        return None
+
+    async def lookup(self, user_query: str, schema_version: int) -> Optional[CachedAnswer]:
+        """Finds a cached answer for the question, by exact normalized match or (optionally) by embedding."""
+        question = normalize_question(user_query)
+        entry = self._get(self._key(question, schema_version))
+        if entry is not None:
+            cache_lookups.inc(result="hit")
+            return entry
+
+        if self.semantic:
+            try:
+                entry = self._nearest(await self._embed(question), schema_version)
+            except Exception as e:
+                logger.warning(f"[Answer Cache] Embedding lookup failed: {e}")
+                entry = None
+            if entry is not None:
+                cache_lookups.inc(result="semantic_hit")
+                return entry
+
+        cache_lookups.inc(result="miss")
+        return None
+
+    async def store(
+        self,
+        user_query: str,
+        schema_version: int,
+        data_stamp: str,
+        refined_query: Optional[str],
+        selected_tables: List[str],
+        generated_sql: str,
+        query_result: Optional[Dict[str, Any]],
+        natural_response: str,
+        visualization_spec: Optional[Dict[str, Any]],
+    ):
+        """Records a completed answer, evicting the least recently used entries beyond the cap."""
+        question = normalize_question(user_query)
+        embedding = None
+        if self.semantic:
+            try:
+                embedding = await self._embed(question)
+            except Exception as e:
+                logger.warning(f"[Answer Cache] Embedding failed, storing without it: {e}")
+
+        entry = CachedAnswer(
+            question=question,
+            schema_version=schema_version,
+            data_stamp=data_stamp,
+            refined_query=refined_query,
+            selected_tables=selected_tables,
+            generated_sql=generated_sql,
+            query_result=query_result if query_result and query_result["row_count"] <= ANSWER_CACHE_MAX_RESULT_ROWS else None,
+            natural_response=natural_response,
+            visualization_spec=visualization_spec,
+            created_at=time.time(),
+            embedding=embedding,
+        )
+        key = self._key(question, schema_version)
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self._vectors = None
+
+        if self._db is not None:
+            await asyncio.to_thread(self._persist, key, entry, evicted)
+
+    def _persist(self, key: str, entry: CachedAnswer, evicted: List[str]):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers (key, payload, created_at) VALUES (?, ?, ?)",
+                (key, entry.model_dump_json(), entry.created_at),
+            )
+            self._db.executemany("DELETE FROM answers WHERE key = ?", [(k,) for k in evicted])
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors = None
+            if self._db is not None:
+                self._db.execute("DELETE FROM answers")
+                self._db.commit()
+
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Returns the process-wide answer cache, or None when caching is disabled."""
+    global _answer_cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.observability.metrics import counter
+from app.services.answer_cache import normalize_question
+
+# Questions answered at once across all batch requests in this process
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+
+batch_questions = counter(
+    "batch_questions_total",
+    "Batch questions by outcome; duplicates reuse the answer of an identical question.",
+    ("outcome",),
+)
+
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def get_batch_slots() -> asyncio.Semaphore:
+    """Returns the process-wide limit on concurrently running batch questions."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    return _slots
+
+
+async def answer_question(graph, question: str, thread_id: str) -> Dict[str, Any]:
+    """Runs one question through the graph and returns its final answer fields."""
+    config = {"configurable": {"thread_id": thread_id}}
+    values: Dict[str, Any] = {}
+    async for update in graph.astream({"user_query": question}, config=config, stream_mode="updates"):
+        for state_update in update.values():
+            if isinstance(state_update, dict):
+                values.update(state_update)
+
+    error = values.get("query_error")
+    if not values.get("natural_response") and not error:
+        error = values.get("validation_error") or "No answer was produced"
+    return {
+        "response": values.get("natural_response"),
+        "sql": values.get("generated_sql"),
+        "data": values.get("query_result"),
+        "visualization": values.get("visualization_spec"),
+        "error": error,
+    }
+
+
+async def run_batch(graph, questions: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answers `questions` concurrently and yields one result per question, in
+    completion order. Identical questions (after normalization) run once.
+    Each question gets a throwaway thread, deleted from the checkpointer
+    once answered, so batch runs don't pile up conversation state.
+    """
+    batch_id = uuid.uuid4().hex[:12]
+    groups: Dict[str, List[int]] = {}
+    for index, question in enumerate(questions):
+        groups.setdefault(normalize_question(question) or question, []).append(index)
+
+    slots = get_batch_slots()
+    checkpointer = getattr(graph, "checkpointer", None)
+    finished: "asyncio.Queue[tuple]" = asyncio.Queue()
+
+    async def worker(n: int, indices: List[int]):
+        thread_id = f"batch-{batch_id}-{n}"
+        async with slots:
+            try:
+                answer = await answer_question(graph, questions[indices[0]], thread_id)
+            except Exception as e:
+                answer = {"response": None, "sql": None, "data": None, "visualization": None, "error": str(e)}
+            finally:
+                if checkpointer is not None:
+                    await checkpointer.adelete_thread(thread_id)
+        await finished.put((indices, answer))
+
+    tasks = [asyncio.create_task(worker(n, indices)) for n, indices in enumerate(groups.values())]
+    try:
+        for _ in range(len(tasks)):
+            indices, answer = await finished.get()
+            batch_questions.inc(outcome="error" if answer["error"] else "answered")
+            batch_questions.inc(len(indices) - 1, outcome="duplicate")
+            for index in indices:
+                yield {"index": index, "question": questions[index], **answer}
+    finally:
+        # Client went away or the batch finished: don't leave questions running
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,17 +1,271 @@
+import asyncio
 import os
-from openai import AsyncOpenAI
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import openai
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Imported after load_dotenv so the limiter sees LLM_REQUESTS_PER_MINUTE from .env
+from app.services.rate_limit import LLMRateLimiter, rate_limit_hooks
+from app.services.llm_cache import cacheable, get_llm_cache
+from app.services.single_flight import SingleFlight, fingerprint
+from app.observability.tracing import LLMCall, current_task, llm_call
+from app.observability.logger import logger
+from app.observability.metrics import counter
+
+# LLM gateway: graph nodes declare a task class; each class maps to a model tier and a timeout.
+# Nodes don't name a model: calls go to their task's tier, or to the strong tier with the gateway off.
+LLM_GATEWAY_ENABLED = os.getenv("LLM_GATEWAY_ENABLED", "true").lower() == "true"
+LLM_MODEL_TIERS = {
+    "fast": os.getenv("LLM_MODEL_FAST", "gpt-4o-mini"),
+    "strong": os.getenv("LLM_MODEL_STRONG", "gpt-4o"),
+}
+_DEFAULT_TASKS = {
+    # task: (tier, timeout seconds)
+    "classify": ("fast", 10),
+    # Picks the schema the SQL is written against; LLM_TIER_SELECT_TABLES=fast opts into the cheaper tier
+    "select_tables": ("strong", 15),
+    "rewrite": ("fast", 15),
+    "generate_sql": ("strong", 30),
+    "summarize": ("strong", 30),
+    "chart": ("fast", 20),
+}
+TASK_TIERS = {task: os.getenv(f"LLM_TIER_{task.upper()}", tier) for task, (tier, _) in _DEFAULT_TASKS.items()}
+TASK_TIMEOUTS = {
+    task: float(os.getenv(f"LLM_TIMEOUT_{task.upper()}", str(timeout))) for task, (_, timeout) in _DEFAULT_TASKS.items()
+}
+# Send a duplicate request once a call runs past this quantile of its recent latencies
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Retry once on the other tier's model after a timeout or a server/connection/rate-limit error
+LLM_FALLBACK_ENABLED = os.getenv("LLM_FALLBACK_ENABLED", "true").lower() == "true"
+
+_FALLBACK_ERRORS = (TimeoutError, openai.APIConnectionError, openai.InternalServerError, openai.RateLimitError)
+
+gateway_events = counter(
+    "llm_gateway_events_total",
+    "LLM gateway interventions by task: timeout, fallback, hedged (duplicate sent), hedge_won.",
+    ("task", "event"),
+)
+
 _client = None
+_traced_client = None
+_rate_limiter = None
+
+
+class _TracedStream:
+    """Passes a streamed completion through, recording time-to-first-token and usage."""
+
+    def __init__(self, stream, call: LLMCall):
+        self._stream = stream
+        self._call = call
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        try:
+            async for chunk in self._stream:
+                if getattr(chunk, "usage", None) is not None:
+                    self._call.set_usage(chunk.usage)
+                if not chunk.choices:
+                    continue  # usage-only final chunk
+                if chunk.choices[0].delta.content:
+                    self._call.first_token()
+                yield chunk
+        finally:
+            self._call.finish()
+
+    async def close(self):
+        self._call.finish()
+        await self._stream.close()
+
+
+class _LatencyWindow:
+    """Recent response times of one task/model, for the hedging threshold."""
+
+    def __init__(self, size: int = 200):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _routed_model(task: Optional[str], request: Dict[str, Any]) -> str:
+    """The model the gateway sends a call to: its task's tier, else the model it asked for, else the strong tier."""
+    if task not in TASK_TIERS:
+        return request.get("model") or LLM_MODEL_TIERS["strong"]
+    # A tier name, or a model name set directly (LLM_TIER_CLASSIFY=gpt-4.1-nano)
+    return LLM_MODEL_TIERS.get(TASK_TIERS[task], TASK_TIERS[task])
+
+
+async def _discard(response):
+    """Releases a response that lost a hedged race."""
+    if isinstance(response, _TracedStream):
+        await response.close()
+
+
+class _TracedCompletions:
+    """
+    chat.completions behind the LLM gateway. Calls made from a graph node
+    that declares a task class are routed: the task's model tier replaces
+    any requested model, the call is bounded by the task's timeout, hedged
+    with a second request once it runs past the task's recent p95, and
+    retried once on the other tier if it times out or the API fails.
+    Other calls are only traced. Identical concurrent calls (same task and
+    request) are sent once, and a streamed answer is fanned out to each caller;
+    deterministic (temperature=0) calls are answered from the response cache
+    when the same request to the same model has been answered before.
+    """
+
+    def __init__(self, completions):
+        self._completions = completions
+        self._latency: Dict[Tuple[str, str], _LatencyWindow] = {}
+        self._flights = SingleFlight("llm")
+
+    async def create(self, **request):
+        task = current_task() if LLM_GATEWAY_ENABLED else None
+        request = {**request, "model": _routed_model(task, request)}
+        key = fingerprint(task, request)
+        if request.get("stream", False):
+            return await self._flights.stream(key, lambda: self._complete(task, request))
+        return await self._flights.do(key, lambda: self._complete(task, request))
+
+    async def _complete(self, task: Optional[str], request: Dict[str, Any]):
+        cache = get_llm_cache()
+        if cache is None or not cacheable(request):
+            return await self._route(task, request)
+        return await cache.complete(request["model"], request, lambda: self._route(task, request))
+
+    async def _route(self, task: Optional[str], request: Dict[str, Any]):
+        if task not in TASK_TIERS:
+            return await self._send(request)
+
+        model = request["model"]
+        timeout = TASK_TIMEOUTS[task]
+        try:
+            return await self._hedged(task, request, timeout)
+        except _FALLBACK_ERRORS as e:
+            if isinstance(e, TimeoutError):
+                gateway_events.inc(task=task, event="timeout")
+            fallback = next((m for m in LLM_MODEL_TIERS.values() if m != model), None)
+            if not LLM_FALLBACK_ENABLED or fallback is None:
+                raise
+            gateway_events.inc(task=task, event="fallback")
+            logger.warning(f"[LLM Gateway] {task} on {model} failed ({type(e).__name__}), falling back to {fallback}")
+            async with asyncio.timeout(timeout):
+                return await self._send({**request, "model": fallback})
+
+    async def _hedged(self, task: str, request: Dict[str, Any], timeout: float):
+        window = self._latency.setdefault((task, request["model"]), _LatencyWindow())
+        hedge_after = window.quantile(LLM_HEDGE_QUANTILE) if LLM_HEDGE_ENABLED else None
+        started = time.perf_counter()
+        first = asyncio.ensure_future(self._send(request))
+        attempts = [first]
+        winner = None
+        try:
+            async with asyncio.timeout(timeout):
+                if hedge_after is not None:
+                    await asyncio.wait({first}, timeout=hedge_after)
+                    if not first.done():
+                        gateway_events.inc(task=task, event="hedged")
+                        attempts.append(asyncio.ensure_future(self._send(request)))
+
+                pending = set(attempts)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    winner = next((a for a in attempts if a in done and not a.exception()), None)
+                    if winner is not None:
+                        if winner is not first:
+                            gateway_events.inc(task=task, event="hedge_won")
+                        return winner.result()
+                raise first.exception()
+        finally:
+            # Time of the first attempt (a lower bound if it was cut short) keeps the p95 honest
+            window.add(time.perf_counter() - started)
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+                elif attempt is not winner and not attempt.cancelled() and not attempt.exception():
+                    await _discard(attempt.result())
+
+    async def _send(self, request: Dict[str, Any]):
+        stream = request.get("stream", False)
+        if stream:
+            # Ask for the usage chunk so streamed calls report tokens too
+            request = {"stream_options": {"include_usage": True}, **request}
+        with llm_call(request.get("model", "")) as call:
+            try:
+                response = await self._completions.create(**request)
+            except BaseException:
+                call.finish()
+                raise
+        if stream:
+            return _TracedStream(response, call)
+        call.first_token()
+        call.set_usage(getattr(response, "usage", None))
+        call.finish()
+        return response
+
+
+class _TracedChat:
+    def __init__(self, chat):
+        self.completions = _TracedCompletions(chat.completions)
+
+
+class TracedOpenAI:
+    """
+    Wraps an AsyncOpenAI client so every chat completion is timed and its
+    tokens, retries and cost are recorded against the current node and
+    request. Everything else is delegated to the wrapped client.
+    """
+
+    def __init__(self, client):
+        self.wrapped = client
+        self.chat = _TracedChat(client.chat)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """Returns the process-wide LLM request pacer shared by every caller."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = LLMRateLimiter()
+    return _rate_limiter
 
 def get_openai_client() -> AsyncOpenAI:
-    """Returns a configured AsyncOpenAI client."""
-    global _client
+    """Returns a configured AsyncOpenAI client, instrumented for tracing."""
+    global _client, _traced_client
     if _client is None:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
-            print("Warning: OPENAI_API_KEY not found in environment variables.")
-        _client = AsyncOpenAI(api_key=api_key)
-    return _client
+            logger.warning("OPENAI_API_KEY not found in environment variables.")
+        # All LLM traffic (chat, batch, embeddings) goes through one rate limiter;
+        # OPENAI_BASE_URL points the agent at any OpenAI-compatible server (e.g. benchmarks.fake_llm_server)
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            http_client=DefaultAsyncHttpxClient(event_hooks=rate_limit_hooks(get_llm_rate_limiter())),
+        )
+    if _traced_client is None or _traced_client.wrapped is not _client:
+        _traced_client = TracedOpenAI(_client)
+    return _traced_client
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from app.observability.metrics import counter
+from app.services.single_flight import fingerprint
+
+# Responses to deterministic (temperature=0) calls, keyed on the model and the whole request
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+# Optional on-disk tier behind the in-memory LRU ("" = memory only)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "20000"))
+
+llm_cache_lookups = counter(
+    "llm_cache_lookups_total",
+    "LLM response cache lookups by model and outcome (hit, disk_hit, miss).",
+    ("model", "result"),
+)
+
+
+def cacheable(request: Dict[str, Any]) -> bool:
+    """Only calls that ask for one deterministic answer are worth replaying."""
+    return request.get("temperature") == 0 and request.get("n", 1) == 1
+
+
+def response_key(model: str, request: Dict[str, Any]) -> str:
+    """Content address of a call: the model that answers it plus messages, tools/functions and options."""
+    return fingerprint(model, {k: v for k, v in request.items() if k not in ("model", "stream_options")})
+
+
+class _ReplayedStream:
+    """A cached streamed completion, yielded chunk by chunk like a live one."""
+
+    def __init__(self, chunks: List[Dict[str, Any]]):
+        self._chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            yield ChatCompletionChunk.model_validate(chunk)
+            await asyncio.sleep(0)  # let other streams (and the SSE encoder) run between chunks
+
+    async def close(self):
+        pass
+
+
+class _RecordingStream:
+    """Passes a live stream through and hands its chunks to `store` once it has been read to the end."""
+
+    def __init__(self, stream, store: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        self._stream = stream
+        self._store = store
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        chunks = []
+        async for chunk in self._stream:
+            chunks.append(chunk.model_dump(mode="json", exclude_unset=True))
+            yield chunk
+        await self._store(chunks)
+
+    async def close(self):
+        await self._stream.close()
+
+
+class LLMResponseCache:
+    """
+    LRU + TTL cache of LLM responses by content address, with an optional
+    SQLite tier that holds more entries than memory and survives restarts.
+    A disk hit is promoted to memory. Entries are stored as JSON payloads and
+    rebuilt into fresh response objects on every hit.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        disk_max_entries: int = LLM_CACHE_DISK_MAX_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open_store(path)
+
+    def _open_store(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._db.commit()
+
+    def _remember(self, key: str, created_at: float, payload: Any):
+        with self._lock:
+            self._entries[key] = (created_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT created_at, payload FROM responses WHERE key = ?", (key,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _write(self, key: str, created_at: float, payload: Any):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(payload, separators=(",", ":")), created_at),
+            )
+            # Trim the oldest entries in batches rather than on every write
+            (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.disk_max_entries * 1.1:
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY created_at LIMIT ?)",
+                    (count - self.disk_max_entries,),
+                )
+            self._db.commit()
+
+    async def get(self, key: str, model: str = "") -> Optional[Any]:
+        """The cached payload for `key`, from memory or else the disk tier, if it has not expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            llm_cache_lookups.inc(model=model, result="hit")
+            return entry[1]
+
+        if self._db is not None:
+            entry = await asyncio.to_thread(self._read, key)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._remember(key, *entry)
+                llm_cache_lookups.inc(model=model, result="disk_hit")
+                return entry[1]
+
+        llm_cache_lookups.inc(model=model, result="miss")
+        return None
+
+    async def put(self, key: str, payload: Any):
+        """Stores a response payload in memory and, when configured, on disk."""
+        created_at = time.time()
+        self._remember(key, created_at, payload)
+        if self._db is not None:
+            await asyncio.to_thread(self._write, key, created_at, payload)
+
+    async def complete(self, model: str, request: Dict[str, Any], send: Callable[[], Awaitable[Any]]):
+        """
+        Answers `request` from the cache, or with `send()` and caches the
+        response. Streamed responses are replayed chunk by chunk, and only
+        cached once the live stream has been read to the end.
+        """
+        key = response_key(model, request)
+        payload = await self.get(key, model)
+        if request.get("stream", False):
+            if payload is not None:
+                return _ReplayedStream(payload)
+            return _RecordingStream(await send(), lambda chunks: self.put(key, chunks))
+        if payload is not None:
+            return ChatCompletion.model_validate(payload)
+        response = await send()
+        await self.put(key, response.model_dump(mode="json", exclude_unset=True))
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Returns the process-wide LLM response cache, or None when it is disabled."""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
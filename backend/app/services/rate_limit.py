@@ -0,0 +1,114 @@
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from app.observability.metrics import counter
+from app.observability.tracing import current_llm_call
+
+# Client-side request budget for the LLM API (0 = no proactive limit, only 429 backoff)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+
+rate_limit_events = counter(
+    "llm_rate_limit_events_total",
+    "LLM rate limiting: requests that waited for the local budget, and 429 responses.",
+    ("event",),
+)
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parses OpenAI's x-ratelimit-reset-* durations ("20ms", "1.5s", "6m0s") into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def retry_delay(response: Any) -> Optional[float]:
+    """Seconds the API asks us to wait before the next request, if it says so."""
+    headers = response.headers
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+    if response.status_code == 429 or headers.get("x-ratelimit-remaining-requests") == "0":
+        return parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or 1.0
+    return None
+
+
+class LLMRateLimiter:
+    """
+    Process-wide pacing of LLM requests: a token bucket refilled at
+    `requests_per_minute`, plus a shared pause that every caller honours
+    once the API reports its limit is exhausted.
+    """
+
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, requests_per_minute / 60.0)  # allow at most ~1s of burst
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a request may be sent."""
+        async with self._lock:
+            waited = False
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    waited = True
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    break
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                waited = True
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+            if waited:
+                rate_limit_events.inc(event="waited")
+
+    def pause(self, seconds: float):
+        """Holds back all callers for `seconds` (e.g. after a 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def rate_limit_hooks(limiter: LLMRateLimiter) -> Dict[str, list]:
+    """
+    httpx event hooks that pace every request (including the SDK's own
+    retries) through `limiter` and learn from rate-limit headers. Hooks rather
+    than a transport subclass, so they work with whichever httpx flavour the
+    installed OpenAI SDK builds its client on.
+    """
+
+    async def on_request(request):
+        call = current_llm_call()
+        if call is not None:
+            call.attempts += 1
+        await limiter.acquire()
+
+    async def on_response(response):
+        if response.status_code == 429:
+            rate_limit_events.inc(event="429")
+        delay = retry_delay(response)
+        if delay:
+            limiter.pause(delay)
+
+    return {"request": [on_request], "response": [on_response]}
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from app.observability.metrics import counter
+
+# Concurrent identical LLM calls and SQL queries share one execution instead of each running their own
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+T = TypeVar("T")
+
+single_flight_calls = counter(
+    "single_flight_calls_total",
+    "LLM calls and SQL queries by kind (llm, sql) and role: leader (ran it) or follower (shared one in flight).",
+    ("kind", "role"),
+)
+
+
+def fingerprint(*parts: Any) -> str:
+    """A stable hash of JSON-serializable request parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class _Flight:
+    """One in-flight execution and how many callers are waiting on it."""
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class _SharedStream:
+    """
+    One upstream stream read by a pump task into a chunk buffer that every
+    subscriber replays from the start, so callers joining late miss nothing.
+    """
+
+    def __init__(self, open_stream: Callable[[], Awaitable[Any]]):
+        self.chunks: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.opened: "asyncio.Future" = asyncio.get_running_loop().create_future()
+        self.changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(open_stream))
+        self.waiters = 0
+
+    def _publish(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def _pump(self, open_stream: Callable[[], Awaitable[Any]]):
+        try:
+            upstream = await open_stream()
+        except asyncio.CancelledError:
+            self.opened.cancel()
+            raise
+        except Exception as e:
+            self.opened.set_exception(e)
+            self.finished = True
+            return
+        self.opened.set_result(None)
+        try:
+            async for chunk in upstream:
+                self.chunks.append(chunk)
+                self._publish()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._publish()
+            await upstream.close()
+
+
+class _StreamView:
+    """A subscriber's handle on a shared stream, usable like the stream itself."""
+
+    def __init__(self, shared: _SharedStream, release: Callable[[], None]):
+        self._shared = shared
+        self._release = release
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        shared = self._shared
+        i = 0
+        while True:
+            while i < len(shared.chunks):
+                yield shared.chunks[i]
+                i += 1
+            if shared.finished:
+                if shared.error is not None:
+                    raise shared.error
+                return
+            await shared.changed.wait()
+
+    async def close(self):
+        if not self._closed:
+            self._closed = True
+            self._release()
+
+
+class SingleFlight:
+    """
+    Runs at most one execution per key at a time: callers arriving while one
+    is in flight wait for its outcome instead of starting their own. Nothing
+    is kept once it finishes. The execution runs in its own task (in the
+    first caller's context, so its tracing is charged there), and is only
+    cancelled once every caller waiting on it has been.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._flights: Dict[str, Any] = {}
+
+    def _forget(self, key: str, flight: Any):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _join(self, key: str, start: Callable[[], Any]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = start()
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            single_flight_calls.inc(kind=self.kind, role="leader")
+        else:
+            single_flight_calls.inc(kind=self.kind, role="follower")
+        flight.waiters += 1
+        return flight
+
+    def _leave(self, key: str, flight: Any):
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            self._forget(key, flight)
+            flight.task.cancel()
+
+    async def do(self, key: str, work: Callable[[], Awaitable[T]]) -> T:
+        """Returns `work()`'s result, shared with every concurrent caller of the same key."""
+        if not SINGLE_FLIGHT_ENABLED:
+            return await work()
+        flight = self._join(key, lambda: _Flight(asyncio.ensure_future(work())))
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(key, flight)
+
+    async def stream(self, key: str, open_stream: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns a view of the stream `open_stream()` opens, shared with every
+        concurrent caller of the same key: one upstream request, every chunk
+        delivered to each of them. Errors opening it are raised here, as they
+        would be by `open_stream()`.
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return await open_stream()
+        shared = self._join(key, lambda: _SharedStream(open_stream))
+        try:
+            await asyncio.shield(shared.opened)
+        except BaseException:
+            self._leave(key, shared)
+            raise
+        return _StreamView(shared, lambda: self._leave(key, shared))
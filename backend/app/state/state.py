@@ -1,6 +1,29 @@
 import operator
 from typing import Annotated, List, Optional, TypedDict, Any, Dict
 
+class QueryResult(TypedDict):
+    """Column-oriented, row-capped query result: column names once, rows as lists."""
+    result_id: str  # Handle for paging further rows via /api/results/{result_id}
+    columns: List[str]
+    rows: List[List[Any]]
+    row_count: int  # Number of rows in `rows`
+    truncated: bool  # True if the query produced more rows than were kept
+
+class ColumnProfile(TypedDict):
+    """Per-column statistics of a query result."""
+    name: str
+    kind: str  # "numeric", "temporal", "text" or "empty"
+    distinct: int
+    nulls: int
+    min: Any
+    max: Any
+    mean: Optional[float]
+
+class SqlAttempt(TypedDict):
+    """A generated query that failed, and why."""
+    sql: str
+    error: str
+
 class AgentState(TypedDict):
     """Global state for the SQL agent workflow."""
     
@@ -9,21 +32,26 @@ class AgentState(TypedDict):
     refined_query: Optional[str]  # Rewritten query to remove ambiguity
     
     # Workflow logic
-    relevance: str  # "relevant" or "irrelevant"
+    relevance: Optional[str]  # "relevant", "irrelevant", or None if the fused front-end output was unparseable
     selected_tables: List[str]
     
     # SQL Generation & Execution
     generated_sql: str
-    query_result: List[Dict[str, Any]]
+    query_result: Optional[QueryResult]
+    result_profile: Optional[List[ColumnProfile]]
+    result_digest: Optional[str]  # Token-budgeted summary shared by synthesizer and viz planner
     query_error: Optional[str]
+    query_error_kind: Optional[str]  # "too_expensive" (over the cost/time budget) or "failed"
     is_valid_sql: bool
     retry_count: int = 0
     validation_error: Optional[str]
+    sql_attempts: List[SqlAttempt]  # Failed queries of this question, oldest first, shown to the repair node
     
     # Final Output
     natural_response: str
     visualization_spec: Optional[Dict[str, Any]]
     needs_visualization: bool
+    visualization_type: Optional[str]  # "bar", "line", "pie" or "scatter"
     
     # Logging
     logs: Annotated[List[str], operator.add]
@@ -0,0 +1,105 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.observability.metrics import counter
+from app.services.single_flight import fingerprint
+from app.tools import repair
+from app.tools.cost import QueryCost, estimate_query_cost
+from app.tools.sql import fetch_rows_async
+from app.tools.validator import canonical_sql, validate_sql_safety
+
+# Queries generated in parallel on the first attempt; the cheapest valid one is kept (1 = off)
+SQL_CANDIDATES = int(os.getenv("SQL_CANDIDATES", "1"))
+# The first candidate is generated at temperature 0, the others at temperatures spread up to this
+SQL_CANDIDATE_MAX_TEMPERATURE = float(os.getenv("SQL_CANDIDATE_MAX_TEMPERATURE", "0.8"))
+# Run every valid candidate and keep the result most of them agree on
+SQL_CANDIDATE_CROSS_CHECK = os.getenv("SQL_CANDIDATE_CROSS_CHECK", "false").lower() == "true"
+
+candidate_events = counter(
+    "sql_candidate_events_total",
+    "Parallel SQL candidates: generated, valid, invalid, too_expensive; per round picked_first, picked_other, "
+    "none_valid; with the cross-check, agreed or disagreed.",
+    ("event",),
+)
+
+
+class Candidate(BaseModel):
+    """A generated query after the local checks: the (possibly fixed) SQL, why it can't be used, and its plan cost."""
+    sql: str
+    error: Optional[str] = None
+    cost: Optional[QueryCost] = None
+    fixes: List[str] = []
+
+    @property
+    def usable(self) -> bool:
+        return self.error is None and not (self.cost is not None and self.cost.too_expensive)
+
+
+def candidate_temperatures(count: int) -> List[float]:
+    """Sampling temperatures of `count` candidates: 0 first (cacheable), then spread up to SQL_CANDIDATE_MAX_TEMPERATURE."""
+    return [0] + [round(SQL_CANDIDATE_MAX_TEMPERATURE * i / (count - 1), 2) for i in range(1, count)]
+
+
+async def check_candidate(sql: str) -> Candidate:
+    """The validator's checks without side effects: safety, compile (with identifier fixes), then the plan's cost."""
+    is_safe, message = validate_sql_safety(sql)
+    if not is_safe:
+        return Candidate(sql=sql, error=message)
+    check = await repair.precheck_query(sql)
+    # With the precheck off, the dry run still has to compile the query
+    error = check.error if repair.SQL_PRECHECK_ENABLED else await repair.compile_error(sql)
+    if error is not None:
+        return Candidate(sql=check.sql, error=f"SQLite rejected the query: {error}", fixes=check.fixes)
+    return Candidate(sql=check.sql, fixes=check.fixes, cost=await estimate_query_cost(check.sql))
+
+
+async def _result_signature(sql: str) -> Optional[str]:
+    """Fingerprint of a query's rows (as a multiset, so row order and column names don't matter)."""
+    try:
+        columns, rows, _ = await fetch_rows_async(sql)
+    except Exception:
+        return None
+    return fingerprint(len(columns), sorted(repr(row) for row in rows))
+
+
+async def _by_agreement(usable: List[Candidate]) -> List[Candidate]:
+    """Reorders cheapest-first candidates so those whose result most candidates share come first."""
+    signatures = await asyncio.gather(*(_result_signature(c.sql) for c in usable))
+    votes: Dict[str, int] = {}
+    for signature in signatures:
+        if signature is not None:
+            votes[signature] = votes.get(signature, 0) + 1
+    if not votes:
+        return usable
+    candidate_events.inc(event="agreed" if max(votes.values()) == len(usable) else "disagreed")
+    ranked = sorted(range(len(usable)), key=lambda i: -votes.get(signatures[i], 0))
+    return [usable[i] for i in ranked]
+
+
+async def pick_candidate(sqls: List[str]) -> Candidate:
+    """
+    Checks the distinct candidates concurrently and returns the usable one
+    with the cheapest plan (generation order breaks ties), or with
+    SQL_CANDIDATE_CROSS_CHECK the cheapest of those returning the most
+    common result. If none is usable, the first one is returned as checked,
+    for the validator and repair loop to handle.
+    """
+    distinct: Dict[str, str] = {}
+    for sql in sqls:
+        distinct.setdefault(canonical_sql(sql), sql)
+    checked = await asyncio.gather(*(check_candidate(sql) for sql in distinct.values()))
+    for candidate in checked:
+        event = "invalid" if candidate.error else "valid" if candidate.usable else "too_expensive"
+        candidate_events.inc(event=event)
+
+    usable = sorted((c for c in checked if c.usable), key=lambda c: c.cost.estimated_rows if c.cost else 0)
+    if not usable:
+        candidate_events.inc(event="none_valid")
+        return checked[0]
+    if SQL_CANDIDATE_CROSS_CHECK and len(usable) > 1:
+        usable = await _by_agreement(usable)
+    candidate_events.inc(event="picked_first" if usable[0] is checked[0] else "picked_other")
+    return usable[0]
@@ -0,0 +1,257 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.observability.logger import logger
+from app.tools.sql import get_connection_pool, get_db_connection, get_db_versions, get_query_executor
+
+# Distinct values sampled per text column (for table retrieval and schema prompts)
+CATALOG_SAMPLE_VALUES = int(os.getenv("CATALOG_SAMPLE_VALUES", "5"))
+# Longest a table's COUNT(*) may run; slower counts keep the previous count (or sqlite_stat1's estimate)
+CATALOG_COUNT_TIMEOUT_SECONDS = float(os.getenv("CATALOG_COUNT_TIMEOUT_SECONDS", "1.0"))
+_TEXT_TYPES = ("CHAR", "CLOB", "TEXT")
+
+
+class ColumnInfo(BaseModel):
+    """A single column of a table."""
+    name: str
+    type: str
+    not_null: bool = False
+    primary_key: bool = False
+
+
+class ForeignKeyInfo(BaseModel):
+    """A foreign key edge from `column` to `ref_table.ref_column`."""
+    column: str
+    ref_table: str
+    ref_column: Optional[str] = None
+
+
+class IndexInfo(BaseModel):
+    """An index and the columns it covers, in key order."""
+    name: str
+    columns: List[str]
+    unique: bool = False
+
+
+class TableInfo(BaseModel):
+    """Everything the agents need to know about a table."""
+    name: str
+    create_sql: str
+    columns: List[ColumnInfo]
+    foreign_keys: List[ForeignKeyInfo] = Field(default_factory=list)
+    indexes: List[IndexInfo] = Field(default_factory=list)
+    row_count: Optional[int] = None
+
+    @property
+    def column_names(self) -> List[str]:
+        return [c.name for c in self.columns]
+
+
+def _count_rows(conn: sqlite3.Connection, table: str) -> Optional[int]:
+    """
+    COUNT(*) of a table, or None once it runs past CATALOG_COUNT_TIMEOUT_SECONDS.
+    SQLite answers it with one b-tree walk that never calls the progress
+    handler, so the connection is interrupted from a timer instead.
+    """
+    quoted = table.replace('"', '""')
+    timer = threading.Timer(CATALOG_COUNT_TIMEOUT_SECONDS, conn.interrupt)
+    timer.start()
+    try:
+        # fetchall() runs the statement to completion, so a late interrupt finds nothing to stop
+        return conn.execute(f'SELECT COUNT(*) FROM "{quoted}"').fetchall()[0][0]
+    except sqlite3.OperationalError as e:
+        if "interrupted" not in str(e):
+            raise
+        return None
+    finally:
+        timer.cancel()
+        timer.join()
+
+
+def _estimated_rows(conn: sqlite3.Connection, table: str) -> Optional[int]:
+    """The table's row count as of the last ANALYZE, from sqlite_stat1."""
+    try:
+        row = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,)).fetchone()
+    except sqlite3.OperationalError:
+        return None  # never analyzed
+    return int(row[0].split()[0]) if row and row[0] else None
+
+
+class SchemaCatalog:
+    """
+    In-process snapshot of the database schema.
+    Loaded once and reused until PRAGMA schema_version changes. When PRAGMA
+    data_version changes, rows are recounted in the background and requests
+    keep using the previous counts meanwhile.
+    """
+
+    def __init__(self, tables: Dict[str, TableInfo], schema_version: int, data_version: int):
+        self.tables = tables
+        self.table_names = list(tables)
+        self.schema_version = schema_version
+        self.data_version = data_version
+        self._by_lower = {name.lower(): info for name, info in tables.items()}
+        self._samples: Dict[str, Dict[str, List[str]]] = {}
+        self._recounting = False
+        self._recount_lock = threading.Lock()
+
+    def get_table(self, name: str) -> Optional[TableInfo]:
+        """Case-insensitive O(1) table lookup, mirroring SQLite identifier rules."""
+        return self.tables.get(name) or self._by_lower.get(name.lower())
+
+    def schema_string(self, table_names: Optional[List[str]] = None) -> str:
+        """Returns the pre-rendered CREATE statements for the given tables."""
+        names = table_names or self.table_names
+        parts = [t.create_sql for t in (self.get_table(n) for n in names) if t and t.create_sql]
+        return "\n\n".join(parts)
+
+    def sample_values(self, table_name: str) -> Dict[str, List[str]]:
+        """
+        A few distinct values of each text column of the table, read on first
+        use and cached until the data changes.
+        """
+        table = self.get_table(table_name)
+        if table is None or CATALOG_SAMPLE_VALUES <= 0:
+            return {}
+        samples = self._samples.get(table.name)
+        if samples is None:
+            samples = {}
+            quoted_table = table.name.replace('"', '""')
+            with get_connection_pool().connection() as conn:
+                for column in table.columns:
+                    if not any(t in column.type.upper() for t in _TEXT_TYPES):
+                        continue
+                    quoted = column.name.replace('"', '""')
+                    rows = conn.execute(
+                        f'SELECT DISTINCT "{quoted}" FROM "{quoted_table}" WHERE "{quoted}" IS NOT NULL LIMIT ?',
+                        (CATALOG_SAMPLE_VALUES,),
+                    ).fetchall()
+                    samples[column.name] = [str(row[0])[:40] for row in rows]
+            self._samples[table.name] = samples
+        return samples
+
+    @classmethod
+    def load(cls, schema_version: int, data_version: int) -> "SchemaCatalog":
+        """Reads the full schema from sqlite_master and the table pragmas."""
+        tables: Dict[str, TableInfo] = {}
+        with get_connection_pool().connection() as conn:
+            rows = conn.execute(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+            ).fetchall()
+            for row in rows:
+                name = row["name"]
+                columns = [
+                    ColumnInfo(
+                        name=c["name"],
+                        type=c["type"] or "",
+                        not_null=bool(c["notnull"]),
+                        primary_key=bool(c["pk"]),
+                    )
+                    for c in conn.execute("SELECT * FROM pragma_table_info(?)", (name,))
+                ]
+                foreign_keys = [
+                    ForeignKeyInfo(column=fk["from"], ref_table=fk["table"], ref_column=fk["to"])
+                    for fk in conn.execute("SELECT * FROM pragma_foreign_key_list(?)", (name,))
+                ]
+                indexes = [
+                    IndexInfo(
+                        name=idx["name"],
+                        unique=bool(idx["unique"]),
+                        columns=[
+                            ic["name"]
+                            for ic in conn.execute("SELECT * FROM pragma_index_info(?) ORDER BY seqno", (idx["name"],))
+                        ],
+                    )
+                    for idx in conn.execute("SELECT * FROM pragma_index_list(?)", (name,))
+                ]
+                tables[name] = TableInfo(
+                    name=name,
+                    create_sql=row["sql"] or "",
+                    columns=columns,
+                    foreign_keys=foreign_keys,
+                    indexes=indexes,
+                )
+        catalog = cls(tables, schema_version, data_version)
+        catalog.refresh_row_counts()
+        return catalog
+
+    def refresh_row_counts(self):
+        """
+        Recounts rows per table in the calling thread, on a connection of its
+        own. A count over CATALOG_COUNT_TIMEOUT_SECONDS keeps the table's
+        previous count, or takes sqlite_stat1's estimate if it has none.
+        """
+        conn = get_db_connection()
+        try:
+            for name, info in self.tables.items():
+                count = _count_rows(conn, name)
+                if count is None:
+                    logger.warning(f"[Catalog] Counting {name} exceeded {CATALOG_COUNT_TIMEOUT_SECONDS:g}s")
+                    count = info.row_count if info.row_count is not None else _estimated_rows(conn, name)
+                info.row_count = count
+        finally:
+            conn.close()
+
+    def data_changed(self, data_version: int):
+        """
+        Records a new data_version: cached samples are dropped and rows are
+        recounted in a background thread, one recount at a time. A recount
+        that finds the data changed again while it ran starts over.
+        """
+        self.data_version = data_version
+        self._samples.clear()
+        with self._recount_lock:
+            if self._recounting:
+                return
+            self._recounting = True
+
+        def recount():
+            try:
+                while True:
+                    counted = self.data_version
+                    self.refresh_row_counts()
+                    with self._recount_lock:
+                        if self.data_version == counted:
+                            self._recounting = False
+                            return
+            except Exception as e:
+                logger.warning(f"[Catalog] Row recount failed: {e}")
+                with self._recount_lock:
+                    self._recounting = False
+
+        threading.Thread(target=recount, name="catalog-recount", daemon=True).start()
+
+
+_catalog: Optional[SchemaCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_schema_catalog() -> SchemaCatalog:
+    """
+    Returns the process-wide schema catalog, reloading it only when the
+    database reports a new schema_version. A new data_version starts a
+    background recount and returns at once.
+    """
+    global _catalog
+    schema_version, data_version = get_db_versions()
+    with _catalog_lock:
+        if _catalog is None or _catalog.schema_version != schema_version:
+            _catalog = SchemaCatalog.load(schema_version, data_version)
+        elif _catalog.data_version != data_version:
+            _catalog.data_changed(data_version)
+        return _catalog
+
+
+async def get_schema_catalog_async() -> SchemaCatalog:
+    """
+    `get_schema_catalog` on the SQL worker pool: the version probe and any
+    reload never block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_query_executor(), get_schema_catalog)
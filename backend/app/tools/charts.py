@@ -0,0 +1,189 @@
+import re
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.state.state import ColumnProfile
+
+# Categorical results with more rows than this are left to the LLM planner
+CHART_MAX_CATEGORIES = 25
+# Pie charts only make sense for a handful of slices
+PIE_MAX_SLICES = 8
+
+_EXPLICIT_RE = re.compile(r"\b(plot|chart|graph|visuali[sz]e|visuali[sz]ation|diagram|histogram)\b", re.I)
+_PIE_RE = re.compile(r"\b(pie|share|proportion|percentage|breakdown)\b", re.I)
+_SCATTER_RE = re.compile(r"\b(scatter|correlat\w*|relationship)\b", re.I)
+_TREND_RE = re.compile(r"\b(trend|over time|per (day|week|month|quarter|year)|monthly|yearly|daily|weekly)\b", re.I)
+
+
+class VizPlannerOutput(BaseModel):
+    """Output schema for the visualization planner."""
+    needs_visualization: bool = Field(
+        description="Whether the user asked for a visualization or the data is best represented visually."
+    )
+    visualization_type: Optional[Literal["bar", "line", "pie", "scatter"]] = Field(
+        description="Type of chart to generate if needed."
+    )
+    reasoning: str = Field(description="Why visualization is needed or not.")
+
+
+_IDENTIFIER_RE = re.compile(r"(^[Ii][Dd]$|_[Ii][Dd]$|[a-z]Id$)")
+_TIME_NAME_RE = re.compile(r"(^|_)(year|month|quarter|week|day|date)$", re.I)
+
+
+def _is_time_like(profile: ColumnProfile) -> bool:
+    """Temporal strings, or integer columns named like a period (Year, invoice_month)."""
+    return profile["kind"] == "temporal" or (profile["kind"] == "numeric" and bool(_TIME_NAME_RE.search(profile["name"])))
+
+
+def _is_identifier(profile: ColumnProfile) -> bool:
+    """Numeric key columns (TrackId, customer_id, ...) are labels, not measures."""
+    return bool(_IDENTIFIER_RE.search(profile["name"]))
+
+
+def plan_chart(query: str, profiles: List[ColumnProfile], row_count: int) -> Optional[VizPlannerOutput]:
+    """
+    Decides from the query wording and the result's column profile whether a
+    chart is needed and which kind. Returns None when the shape is ambiguous
+    and the decision should be left to the LLM planner.
+    """
+    explicit = bool(_EXPLICIT_RE.search(query))
+    temporal = [p for p in profiles if _is_time_like(p)]
+    measures = [p for p in profiles if p["kind"] == "numeric" and not _is_identifier(p) and p not in temporal]
+    categories = [p for p in profiles if p["kind"] == "text" or (p["kind"] == "numeric" and _is_identifier(p))]
+
+    def plan(chart_type: Optional[str], reasoning: str) -> VizPlannerOutput:
+        return VizPlannerOutput(
+            needs_visualization=chart_type is not None,
+            visualization_type=chart_type,
+            reasoning=reasoning,
+        )
+
+    if row_count <= 1 and not explicit:
+        return plan(None, "A single row is best stated in text.")
+    if not measures:
+        if explicit:
+            return None
+        return plan(None, "No numeric column to plot.")
+
+    # Shape-driven chart type; the query wording only breaks ties
+    if temporal and row_count >= 2:
+        return plan("line", "Numeric values over a time column.")
+    if _SCATTER_RE.search(query) and len(measures) >= 2:
+        return plan("scatter", "The question relates two numeric columns.")
+    if len(categories) == 1 and row_count <= CHART_MAX_CATEGORIES:
+        if _PIE_RE.search(query) and row_count <= PIE_MAX_SLICES and len(measures) == 1:
+            return plan("pie", "Parts of a whole across a few categories.")
+        if explicit or len(measures) <= 2:
+            return plan("bar", "A numeric measure compared across categories.")
+    if not categories and len(measures) == 2 and row_count >= 10:
+        return plan("scatter", "Two numeric columns without labels.")
+    if _TREND_RE.search(query) and categories and row_count >= 3:
+        return plan("line", "The question asks for a trend.")
+    if explicit and categories and row_count <= CHART_MAX_CATEGORIES:
+        return plan("bar", "Chart explicitly requested.")
+
+    # Many categories, wide results, explicit request without an obvious shape, ...
+    return None
+
+
+class ChartEncoding(BaseModel):
+    """The chart choices the spec template needs; data never passes through here."""
+    mark: Literal["bar", "line", "point", "arc"] = Field(description="Vega-Lite mark.")
+    x: str = Field(description="Column on the x axis (the category or slice label for pie charts).")
+    y: str = Field(description="Numeric column on the y axis (the slice size for pie charts).")
+    color: Optional[str] = Field(default=None, description="Optional column used to color/group the marks.")
+    aggregate: Optional[Literal["sum", "mean", "count", "min", "max"]] = Field(
+        default=None, description="Aggregation applied to y when x repeats; omit if the data is already aggregated."
+    )
+    title: str = Field(description="Short chart title.")
+
+
+_MARKS = {"bar": "bar", "line": "line", "pie": "arc", "scatter": "point"}
+
+
+def _field_type(profile: ColumnProfile) -> str:
+    if _is_time_like(profile):
+        return "temporal" if profile["kind"] == "temporal" else "ordinal"
+    if profile["kind"] == "numeric" and not _is_identifier(profile):
+        return "quantitative"
+    return "nominal"
+
+
+def choose_encoding(
+    chart_type: Optional[str], profiles: List[ColumnProfile], row_count: int, title: str
+) -> Optional[ChartEncoding]:
+    """
+    Picks mark, x, y and color from the column profile for a planned chart
+    type. Returns None when no unambiguous mapping exists.
+    """
+    temporal = [p for p in profiles if _is_time_like(p)]
+    measures = [p for p in profiles if p["kind"] == "numeric" and not _is_identifier(p) and p not in temporal]
+    categories = [p for p in profiles if p["kind"] == "text" or (p["kind"] == "numeric" and _is_identifier(p))]
+    if chart_type not in _MARKS or not measures:
+        return None
+
+    def grouping(x: ColumnProfile, others: List[ColumnProfile]):
+        """(color, aggregate) for an x column: split by a small second category, or sum repeated x values."""
+        small = [p for p in others if p is not x and p["distinct"] <= 10]
+        if small:
+            return small[0]["name"], None
+        return None, ("sum" if x["distinct"] < row_count else None)
+
+    if chart_type == "scatter":
+        if len(measures) < 2:
+            return None
+        color = next((p["name"] for p in categories if p["distinct"] <= 10), None)
+        return ChartEncoding(mark="point", x=measures[0]["name"], y=measures[1]["name"], color=color, title=title)
+
+    if chart_type == "line":
+        x = (temporal or categories or [None])[0]
+        if x is None:
+            return None
+        color, aggregate = grouping(x, categories)
+        return ChartEncoding(mark="line", x=x["name"], y=measures[0]["name"], color=color, aggregate=aggregate, title=title)
+
+    x = (categories or temporal or [None])[0]
+    if x is None or len(categories) > 2:
+        return None
+    color, aggregate = grouping(x, categories if chart_type == "bar" else [])
+    return ChartEncoding(mark=_MARKS[chart_type], x=x["name"], y=measures[0]["name"], color=color, aggregate=aggregate, title=title)
+
+
+def build_vega_lite_spec(
+    encoding: ChartEncoding,
+    profiles: List[ColumnProfile],
+    data: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Fills the Vega-Lite template with a chosen encoding. `data` is the spec's
+    data block: inline `values` or a `url` the client loads the rows from.
+    """
+    types = {p["name"]: _field_type(p) for p in profiles}
+    x = {"field": encoding.x, "type": types.get(encoding.x, "nominal")}
+    y: Dict[str, Any] = {"field": encoding.y, "type": "quantitative"}
+    if encoding.aggregate:
+        y["aggregate"] = encoding.aggregate
+    tooltip = [dict(x), dict(y)]
+
+    if encoding.mark == "arc":
+        channels: Dict[str, Any] = {"theta": y, "color": {"field": encoding.x, "type": "nominal"}}
+    else:
+        channels = {"x": x, "y": y}
+        if encoding.mark == "bar" and x["type"] == "nominal":
+            x["sort"] = "-y"
+        if encoding.color:
+            channels["color"] = {"field": encoding.color, "type": types.get(encoding.color, "nominal")}
+            tooltip.append(dict(channels["color"]))
+    channels["tooltip"] = tooltip
+
+    return {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "title": encoding.title,
+        "data": data,
+        "mark": {"type": encoding.mark, "tooltip": True},
+        "encoding": channels,
+        "width": "container",
+        "height": 300,
+        "autosize": {"type": "fit", "contains": "padding"},
+    }
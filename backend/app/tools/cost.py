@@ -0,0 +1,160 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.tools.catalog import SchemaCatalog, get_schema_catalog_async
+from app.tools.sql import explain_query_plan_async
+
+# Queries whose plan is estimated to visit more rows than this are sent back for a rewrite
+QUERY_MAX_ESTIMATED_ROWS = int(os.getenv("QUERY_MAX_ESTIMATED_ROWS", "5000000"))
+# Full scans of tables at least this large are called out in the feedback
+QUERY_LARGE_TABLE_ROWS = int(os.getenv("QUERY_LARGE_TABLE_ROWS", "100000"))
+QUERY_COST_GUARD_ENABLED = os.getenv("QUERY_COST_GUARD_ENABLED", "true").lower() == "true"
+
+# Rows assumed per lookup through a non-unique (or automatic) index
+INDEX_FANOUT = 10
+
+_LOOP_RE = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\S+)(?: AS (\S+))?(.*)$")
+_INDEX_RE = re.compile(r"INDEX (\S+)")
+_IDENT_RE = re.compile(r'"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\]|\w+|\S')
+_NOT_ALIASES = {
+    "WHERE", "ON", "USING", "JOIN", "LEFT", "RIGHT", "FULL", "INNER", "OUTER", "CROSS", "NATURAL",
+    "GROUP", "ORDER", "LIMIT", "OFFSET", "HAVING", "WINDOW", "UNION", "EXCEPT", "INTERSECT",
+    "AND", "OR", "NOT", "AS", "SET", "INDEXED", "VALUES", "SELECT", "FROM",
+}
+
+
+class QueryCost(BaseModel):
+    """What EXPLAIN QUERY PLAN says about a query, priced with the catalog's row counts."""
+    estimated_rows: int
+    full_scans: List[str] = []  # "Table (N rows)" for scans of large tables
+    unindexed_joins: List[str] = []  # tables joined without a usable index
+    plan: List[str] = []
+
+    @property
+    def too_expensive(self) -> bool:
+        return self.estimated_rows > QUERY_MAX_ESTIMATED_ROWS
+
+    def feedback(self) -> str:
+        """Structured explanation for the SQL generator when the query is rejected."""
+        lines = [
+            f"Query too expensive: the plan would visit ~{self.estimated_rows:,} rows "
+            f"(limit {QUERY_MAX_ESTIMATED_ROWS:,})."
+        ]
+        if self.unindexed_joins:
+            lines.append(f"Joins without an index (each row of the outer table scans these): {', '.join(self.unindexed_joins)}.")
+        if self.full_scans:
+            lines.append(f"Full scans of large tables: {', '.join(self.full_scans)}.")
+        lines.append(
+            "Rewrite it to touch fewer rows: join on key/foreign-key columns, add WHERE filters, "
+            "aggregate before joining, or add a LIMIT."
+        )
+        return "\n".join(lines)
+
+
+def _index_name(detail: str) -> Optional[str]:
+    match = _INDEX_RE.search(detail)
+    return match.group(1) if match else None
+
+
+def table_aliases(sql: str, catalog: SchemaCatalog) -> Dict[str, str]:
+    """Maps the aliases used in the query (`Track t`, `Track AS t`) to table names."""
+    tokens = [t.strip('"`[]') for t in _IDENT_RE.findall(sql)]
+    aliases: Dict[str, str] = {}
+    for i, token in enumerate(tokens):
+        table = catalog.get_table(token)
+        if table is None:
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j].upper() == "AS":
+            j += 1
+        if j < len(tokens) and re.match(r"^[^\W\d]\w*$", tokens[j]) and tokens[j].upper() not in _NOT_ALIASES:
+            aliases[tokens[j].lower()] = table.name
+    return aliases
+
+
+def estimate_plan_cost(
+    plan: List[Tuple[int, int, str]], sql: str, catalog: SchemaCatalog
+) -> QueryCost:
+    """
+    Prices a query plan as the number of rows its nested loops visit.
+    Sibling SCAN/SEARCH steps are the loops of one join (outer to inner), so
+    their row counts multiply; subqueries and compound parts are added, and
+    correlated subqueries are repeated for every row of the enclosing loops.
+    """
+    aliases = table_aliases(sql, catalog)
+    unique_indexes = {
+        index.name for table in catalog.tables.values() for index in table.indexes if index.unique
+    }
+    children: Dict[int, List[Tuple[int, str]]] = {}
+    for node_id, parent, detail in plan:
+        children.setdefault(parent, []).append((node_id, detail))
+
+    full_scans: List[str] = []
+    unindexed: List[str] = []
+
+    def table_rows(name: str) -> Tuple[Optional[str], int]:
+        table = catalog.get_table(name) or catalog.get_table(aliases.get(name.lower(), ""))
+        if table is None:
+            return None, 0
+        return table.name, table.row_count or 0
+
+    def cost(parent: int) -> int:
+        loops = 1
+        has_loop = False
+        added = 0
+        correlated = 0
+        for node_id, detail in children.get(parent, []):
+            match = _LOOP_RE.match(detail)
+            if detail.startswith("SCAN CONSTANT ROW"):
+                continue
+            if match:
+                kind, name, alias, rest = match.groups()
+                table, rows = table_rows(alias or name)
+                if kind == "SCAN":
+                    # A scan of a CTE/subquery is priced by the subquery itself
+                    factor = rows if table else 1
+                    if has_loop and table:
+                        unindexed.append(table)
+                    if table and rows >= QUERY_LARGE_TABLE_ROWS:
+                        full_scans.append(f"{table} ({rows:,} rows)")
+                elif "PRIMARY KEY" in rest or _index_name(rest) in unique_indexes:
+                    factor = 1
+                else:
+                    factor = INDEX_FANOUT
+                    if "AUTOMATIC" in rest and table:
+                        unindexed.append(table)
+                loops *= max(factor, 1)
+                has_loop = True
+                added += cost(node_id)
+            elif detail.startswith("CORRELATED"):
+                correlated += cost(node_id)
+            else:
+                # MATERIALIZE / CO-ROUTINE / compound parts / LIST SUBQUERY / temp b-trees
+                added += cost(node_id)
+        base = loops if has_loop else 0
+        return base + added + (loops if has_loop else 1) * correlated
+
+    estimated = cost(0)
+    return QueryCost(
+        estimated_rows=estimated,
+        full_scans=full_scans,
+        unindexed_joins=sorted(set(unindexed)),
+        plan=[detail for _, _, detail in plan],
+    )
+
+
+async def estimate_query_cost(sql: str) -> Optional[QueryCost]:
+    """
+    Runs EXPLAIN QUERY PLAN and prices it. Returns None when the guard is
+    disabled or the query can't be planned (execution then reports the error).
+    """
+    if not QUERY_COST_GUARD_ENABLED:
+        return None
+    try:
+        plan = await explain_query_plan_async(sql)
+    except Exception:
+        return None
+    return estimate_plan_cost(plan, sql, await get_schema_catalog_async())
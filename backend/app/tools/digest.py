@@ -0,0 +1,143 @@
+import os
+import re
+from typing import Any, List, Optional
+
+import numpy as np
+
+from app.state.state import ColumnProfile, QueryResult
+
+# Prompt budget for the result digest shared by the synthesizer and visualization planner
+RESULT_DIGEST_TOKEN_BUDGET = int(os.getenv("RESULT_DIGEST_TOKEN_BUDGET", "1500"))
+# Rows shown from each end of the result when it doesn't fit the budget
+RESULT_DIGEST_EDGE_ROWS = int(os.getenv("RESULT_DIGEST_EDGE_ROWS", "10"))
+# Longest cell value rendered in the digest
+RESULT_DIGEST_MAX_CELL_CHARS = 80
+
+_TEMPORAL_RE = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?([ T]\d{2}:\d{2}(:\d{2})?)?$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English/SQL-ish text)."""
+    return (len(text) + 3) // 4
+
+
+def _is_temporal(values: List[Any]) -> bool:
+    sample = [v for v in values[:20] if v is not None]
+    return bool(sample) and all(isinstance(v, str) and _TEMPORAL_RE.match(v) for v in sample)
+
+
+def profile_result(result: QueryResult) -> List[ColumnProfile]:
+    """
+    Per-column type, distinct/null counts and min/max/mean: rows are transposed
+    once with zip(*rows) and numeric columns are reduced as numpy arrays.
+    """
+    columns = result["columns"]
+    values_by_column = list(zip(*result["rows"])) if result["rows"] else [() for _ in columns]
+
+    profiles: List[ColumnProfile] = []
+    for name, values in zip(columns, values_by_column):
+        present = [v for v in values if v is not None]
+        numeric = [v for v in present if isinstance(v, (int, float)) and not isinstance(v, bool)]
+
+        if not present:
+            kind = "empty"
+        elif len(numeric) == len(present):
+            kind = "numeric"
+        elif _is_temporal(present):
+            kind = "temporal"
+        else:
+            kind = "text"
+
+        profile: ColumnProfile = {
+            "name": name,
+            "kind": kind,
+            "distinct": len(set(present)),
+            "nulls": len(values) - len(present),
+            "min": None,
+            "max": None,
+            "mean": None,
+        }
+        if kind == "numeric":
+            array = np.asarray(numeric)
+            if array.dtype.kind in "iuf":
+                profile["min"] = array.min().item()
+                profile["max"] = array.max().item()
+                profile["mean"] = float(array.mean())
+            else:  # integers too large for int64
+                profile["min"] = min(numeric)
+                profile["max"] = max(numeric)
+                profile["mean"] = sum(numeric) / len(numeric)
+        elif kind == "temporal":
+            profile["min"] = min(present)
+            profile["max"] = max(present)
+        profiles.append(profile)
+    return profiles
+
+
+def _format_cell(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    text = repr(value)
+    if len(text) > RESULT_DIGEST_MAX_CELL_CHARS:
+        text = text[: RESULT_DIGEST_MAX_CELL_CHARS - 3] + "..."
+    return text
+
+
+def _format_row(row: List[Any]) -> str:
+    return "(" + ", ".join(_format_cell(v) for v in row) + ")"
+
+
+def format_column_profile(profile: ColumnProfile) -> str:
+    """One digest line per column: kind, distinct/null counts and range."""
+    line = f"- {profile['name']}: {profile['kind']}, {profile['distinct']} distinct, {profile['nulls']} nulls"
+    if profile["kind"] == "numeric":
+        line += f", min {_format_cell(profile['min'])}, max {_format_cell(profile['max'])}, mean {profile['mean']:.6g}"
+    elif profile["kind"] == "temporal":
+        line += f", from {profile['min']} to {profile['max']}"
+    return line
+
+
+def build_result_digest(
+    result: Optional[QueryResult],
+    profiles: Optional[List[ColumnProfile]] = None,
+    token_budget: int = RESULT_DIGEST_TOKEN_BUDGET,
+) -> str:
+    """
+    Renders a compact, token-budgeted description of a query result:
+    row count, per-column stats and a header + tuples table. Results that
+    don't fit show only their first and last rows.
+    """
+    if not result or not result["rows"]:
+        return "The query returned no rows."
+
+    rows = result["rows"]
+    if profiles is None:
+        profiles = profile_result(result)
+
+    count = f"{result['row_count']} rows" + (" (result truncated; more rows exist)" if result["truncated"] else "")
+    header = "\n".join([f"Row count: {count}", "Column stats:", *(format_column_profile(p) for p in profiles)])
+    table_header = "(" + ", ".join(result["columns"]) + ")"
+
+    # Render rows until the budget runs out, so a huge result is never fully stringified
+    budget = token_budget - estimate_tokens(header) - estimate_tokens(table_header)
+    rendered: List[str] = []
+    used = 0
+    for row in rows:
+        line = _format_row(row)
+        used += estimate_tokens(line) + 1
+        if used > budget and len(rows) > 2:
+            break
+        rendered.append(line)
+    else:
+        body = "\n".join([table_header, *rendered])
+        return f"{header}\nRows:\n{body}"
+
+    # Too large: keep the first/last rows, shrinking until it fits the budget
+    edge = min(RESULT_DIGEST_EDGE_ROWS, len(rows) // 2)
+    while True:
+        first = [_format_row(row) for row in rows[:edge]]
+        last = [_format_row(row) for row in rows[len(rows) - edge:]]
+        body = "\n".join([table_header, *first, f"... {len(rows) - 2 * edge} rows omitted ...", *last])
+        if edge <= 1 or estimate_tokens(header) + estimate_tokens(body) <= token_budget:
+            return f"{header}\nRows (first {edge} and last {edge}):\n{body}"
+        edge -= 1
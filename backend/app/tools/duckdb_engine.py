@@ -0,0 +1,314 @@
+import os
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.observability.logger import logger
+from app.tools.catalog import get_schema_catalog
+from app.tools.engines import ExecutionEngine
+from app.tools.sql import (
+    SQL_FETCH_BATCH_SIZE,
+    SQL_MAX_RESULT_ROWS,
+    SQL_QUERY_TIMEOUT_SECONDS,
+    QueryBudgetExceeded,
+    QueryCancelled,
+    get_connection_pool,
+    get_db_connection,
+    get_db_versions,
+)
+from app.tools.validator import sql_tokens
+from app.observability.cancellation import cancelled_work
+
+try:
+    import duckdb
+except ImportError:  # optional: SQL_ANALYTIC_ENGINE=duckdb needs it
+    duckdb = None
+
+# Queries reading tables with fewer rows than this in total stay on SQLite, which answers them faster
+DUCKDB_MIN_ROWS = int(os.getenv("DUCKDB_MIN_ROWS", "100000"))
+# DuckDB worker threads per query (0 = one per core)
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0"))
+
+_MIRROR_BATCH_ROWS = 65536
+_WATCH_INTERVAL = 0.05  # seconds between budget/cancellation checks of a running query
+
+# Functions that return the same values in both engines; a query calling anything else (SQLite's
+# date/time and printf-style functions, DuckDB's table functions such as read_text, ...) stays on SQLite
+_PORTABLE_FUNCTIONS = {
+    "SUM", "COUNT", "AVG", "MIN", "MAX",
+    "ABS", "COALESCE", "IFNULL", "NULLIF", "LENGTH", "SUBSTR", "INSTR", "REPLACE", "TRIM", "LTRIM", "RTRIM",
+}
+# Aggregates: one argument each (DuckDB's two-argument MIN/MAX return lists, SQLite's are scalar)
+_AGGREGATES = {"SUM", "COUNT", "AVG", "MIN", "MAX"}
+# Keywords that can precede "(" without being a function call
+_PAREN_KEYWORDS = {
+    "SELECT", "FROM", "JOIN", "ON", "USING", "WHERE", "AND", "OR", "NOT", "IN", "EXISTS", "AS", "BY",
+    "HAVING", "CASE", "WHEN", "THEN", "ELSE", "DISTINCT", "ALL", "ANY", "UNION", "EXCEPT", "INTERSECT",
+    "LIMIT", "OFFSET", "BETWEEN", "IS", "OVER", "FILTER", "VALUES",
+}
+# LIKE is case-insensitive in SQLite; CAST to an integer truncates there and rounds in DuckDB; the rest are
+# SQLite internals or DuckDB statements that must never reach the mirror
+_SQLITE_ONLY_WORDS = {
+    "LIKE", "GLOB", "REGEXP", "MATCH", "CAST", "ROWID", "OID", "_ROWID_", "COLLATE",
+    "COPY", "ATTACH", "DETACH", "INSTALL", "LOAD", "PRAGMA", "SET", "RESET", "CALL", "EXPORT", "IMPORT",
+}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _duckdb_type(storage_classes: Optional[str]) -> str:
+    """Column type for the values SQLite actually stores in a column (typeof), whatever its declared type."""
+    kinds = set((storage_classes or "null").split(",")) - {"null"}
+    if "text" in kinds or not kinds:
+        return "VARCHAR"
+    if kinds == {"integer"}:
+        return "BIGINT"
+    if kinds <= {"integer", "real"}:
+        return "DOUBLE"
+    return "BLOB" if kinds == {"blob"} else "VARCHAR"
+
+
+def _column_arrays(values: Tuple[Any, ...], duckdb_type: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    A batch of one column for DuckDB to scan, plus a mask of its NULLs if it
+    has any: numpy scans can't hold NULL, so they are filled in and masked.
+    """
+    nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    mask = nulls if nulls.any() else None
+    if duckdb_type == "BIGINT":
+        return np.array([0 if v is None else v for v in values], dtype=np.int64), mask
+    if duckdb_type == "DOUBLE":
+        return np.array([0.0 if v is None else float(v) for v in values], dtype=np.float64), mask
+    if duckdb_type == "VARCHAR":
+        values = ["" if v is None else v if isinstance(v, str) else str(v) for v in values]
+    else:
+        values = [b"" if v is None else v for v in values]
+    return np.array(values, dtype=object), mask
+
+
+def portable_analytic_query(query: str) -> Tuple[bool, List[str]]:
+    """
+    Whether a query aggregates and only uses constructs DuckDB evaluates like
+    SQLite (no integer `/` or `%`, `LIMIT offset, count`, case-insensitive
+    LIKE, functions outside `_PORTABLE_FUNCTIONS`, or file paths in FROM),
+    so DuckDB returns the same rows; and the names it reads, for sizing.
+    """
+    tokens = [(kind, text) for kind, text in sql_tokens(query) if kind not in ("space", "comment")]
+    aggregates = False
+    after_limit = False
+    calls: List[Optional[str]] = []  # per open parenthesis, the aggregate it calls (if any)
+    names = []
+    for i, (kind, text) in enumerate(tokens):
+        upper = text.upper()
+        previous = tokens[i - 1][1].upper() if i else ""
+        if kind == "op":
+            if text in ("/", "%") or (text == "," and (after_limit or (calls and calls[-1] is not None))):
+                return False, []
+            if text == "(":
+                calls.append(previous if previous in _AGGREGATES else None)
+            elif text == ")" and calls:
+                calls.pop()
+        elif kind == "string" and previous in ("FROM", "JOIN"):
+            return False, []
+        elif kind in ("word", "quoted"):
+            called = i + 1 < len(tokens) and tokens[i + 1][1] == "("
+            if upper in _SQLITE_ONLY_WORDS or (
+                called and (kind == "quoted" or (upper not in _PORTABLE_FUNCTIONS and upper not in _PAREN_KEYWORDS))
+            ):
+                return False, []
+            aggregates |= upper == "GROUP" or (called and upper in _AGGREGATES)
+            after_limit = after_limit or upper == "LIMIT"
+            names.append(text.strip('"`[]'))
+    return aggregates, names
+
+
+def sqlite_column_names(query: str, parameters: tuple = ()) -> List[str]:
+    """
+    The result column names SQLite gives a query (DuckDB spells unaliased
+    expressions differently), from a LIMIT 0 wrapper that reads no rows.
+    """
+    tokens = [text for _, text in sql_tokens(query)]
+    while tokens and (tokens[-1].strip() in ("", ";") or tokens[-1].startswith(("--", "/*"))):
+        tokens.pop()
+    with get_connection_pool().connection() as conn:
+        cursor = conn.execute(f"SELECT * FROM ({''.join(tokens)}\n) LIMIT 0", parameters)
+        wrapped = [d[0] for d in cursor.description]
+    # A subquery renames repeated column names to "name:1", "name:2", ...
+    names: List[str] = []
+    for name in wrapped:
+        base, _, suffix = name.rpartition(":")
+        names.append(base if suffix.isdigit() and base in names else name)
+    return names
+
+
+class _Watchdog:
+    """Interrupts a running DuckDB query once its time budget runs out or its caller cancels it."""
+
+    def __init__(self, cursor, cancel: Optional[threading.Event]):
+        self.reason: Optional[str] = None
+        self._done = threading.Event()
+        deadline = time.monotonic() + SQL_QUERY_TIMEOUT_SECONDS if SQL_QUERY_TIMEOUT_SECONDS > 0 else None
+
+        def watch():
+            while not self._done.wait(_WATCH_INTERVAL):
+                if cancel is not None and cancel.is_set():
+                    self.reason = "cancelled"
+                elif deadline is not None and time.monotonic() > deadline:
+                    self.reason = f"exceeded the {SQL_QUERY_TIMEOUT_SECONDS:g}s time limit"
+                if self.reason is not None:
+                    cursor.interrupt()
+                    return
+
+        threading.Thread(target=watch, name="duckdb-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._done.set()
+
+    def error(self, e: Exception) -> Exception:
+        if self.reason == "cancelled":
+            cancelled_work.inc(kind="sql_query")
+            return QueryCancelled("Query cancelled")
+        if self.reason is not None:
+            return QueryBudgetExceeded(f"Query {self.reason}")
+        return Exception(f"Query execution failed: {e}")
+
+
+class DuckDBEngine(ExecutionEngine):
+    """
+    Runs large aggregate queries vectorized on an in-memory DuckDB mirror of
+    the SQLite database. The mirror is rebuilt in the background whenever
+    the database reports a new (schema_version, data_version); until it is
+    current, every query goes to SQLite, so results are never stale.
+    """
+
+    name = "duckdb"
+
+    def __init__(self):
+        self._con = None
+        self._versions: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._building = False
+
+    def _build(self) -> Tuple[Any, Tuple[int, int]]:
+        # Versions are read first: a commit during the copy makes the mirror stale right away
+        versions = get_db_versions()
+        con = duckdb.connect(":memory:")
+        if DUCKDB_THREADS > 0:
+            con.execute(f"SET threads = {DUCKDB_THREADS}")
+        # SQLite sorts NULLs as the smallest value
+        con.execute("SET default_null_order = 'nulls_first_on_asc_last_on_desc'")
+        source = get_db_connection()
+        try:
+            for table in get_schema_catalog().tables.values():
+                columns = table.column_names
+                storage = source.execute(
+                    "SELECT " + ", ".join(f"group_concat(DISTINCT typeof({_quote(c)}))" for c in columns)
+                    + f" FROM {_quote(table.name)}"
+                ).fetchone()
+                types = [_duckdb_type(s) for s in storage]
+                con.execute(
+                    f"CREATE TABLE {_quote(table.name)} ("
+                    + ", ".join(f"{_quote(c)} {t}" for c, t in zip(columns, types)) + ")"
+                )
+                cursor = source.execute(f"SELECT {', '.join(map(_quote, columns))} FROM {_quote(table.name)}")
+                while batch := cursor.fetchmany(_MIRROR_BATCH_ROWS):
+                    scan, select = {}, []
+                    for i, (values, duckdb_type) in enumerate(zip(zip(*batch), types)):
+                        scan[f"c{i}"], mask = _column_arrays(values, duckdb_type)
+                        if mask is None:
+                            select.append(f"c{i}")
+                        else:
+                            scan[f"n{i}"] = mask
+                            select.append(f"CASE WHEN n{i} THEN NULL ELSE c{i} END")
+                    con.register("_mirror_batch", scan)
+                    con.execute(f"INSERT INTO {_quote(table.name)} SELECT {', '.join(select)} FROM _mirror_batch")
+                    con.unregister("_mirror_batch")
+        finally:
+            source.close()
+        # Queries only ever read the mirror: no files, extensions or settings changes from SQL
+        con.execute("SET enable_external_access = false")
+        con.execute("SET lock_configuration = true")
+        return con, versions
+
+    def refresh(self):
+        """Rebuilds the mirror now, in the calling thread."""
+        started = time.perf_counter()
+        con, versions = self._build()
+        with self._lock:
+            # Queries still running on the previous mirror keep it alive until they finish
+            self._con, self._versions = con, versions
+        logger.info(f"[SQL Engine] DuckDB mirror of {versions} built in {time.perf_counter() - started:.2f}s")
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+
+        def rebuild():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"[SQL Engine] DuckDB mirror rebuild failed: {e}")
+            finally:
+                with self._lock:
+                    self._building = False
+
+        threading.Thread(target=rebuild, name="duckdb-mirror", daemon=True).start()
+
+    def current(self) -> bool:
+        """Whether the mirror matches the database; starts a rebuild if it doesn't."""
+        if self._versions == get_db_versions():
+            return True
+        self._refresh_in_background()
+        return False
+
+    def accepts(self, query: str) -> bool:
+        analytic, names = portable_analytic_query(query)
+        if not analytic:
+            return False
+        catalog = get_schema_catalog()
+        tables = {table.name: table for table in map(catalog.get_table, names) if table is not None}
+        rows = sum(table.row_count or 0 for table in tables.values())
+        return rows >= DUCKDB_MIN_ROWS and self.current()
+
+    def fetch_rows(
+        self,
+        query: str,
+        parameters: tuple = (),
+        offset: int = 0,
+        max_rows: int = SQL_MAX_RESULT_ROWS,
+        cancel: Optional[threading.Event] = None,
+    ) -> Tuple[List[str], List[List[Any]], bool]:
+        with self._lock:
+            con = self._con
+        cursor = con.cursor()
+        watchdog = _Watchdog(cursor, cancel)
+        try:
+            cursor.execute(query, list(parameters))
+            columns = sqlite_column_names(query, parameters)
+
+            skipped = 0
+            while skipped < offset:
+                batch = cursor.fetchmany(min(SQL_FETCH_BATCH_SIZE, offset - skipped))
+                if not batch:
+                    return columns, [], False
+                skipped += len(batch)
+
+            rows: List[List[Any]] = []
+            while len(rows) < max_rows:
+                batch = cursor.fetchmany(min(SQL_FETCH_BATCH_SIZE, max_rows - len(rows)))
+                if not batch:
+                    return columns, rows, False
+                rows.extend(list(row) for row in batch)
+
+            return columns, rows, cursor.fetchone() is not None
+        except Exception as e:
+            raise watchdog.error(e)
+        finally:
+            watchdog.stop()
+            cursor.close()
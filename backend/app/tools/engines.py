@@ -0,0 +1,99 @@
+import os
+import threading
+from typing import Any, List, Optional, Tuple
+
+from app.observability.logger import logger
+from app.observability.metrics import counter
+from app.tools.sql import SQL_MAX_RESULT_ROWS, QueryBudgetExceeded, QueryCancelled, fetch_rows
+
+# Analytic engine for large aggregate queries ("" = SQLite only, "duckdb" = DuckDB mirror of the database)
+SQL_ANALYTIC_ENGINE = os.getenv("SQL_ANALYTIC_ENGINE", "").lower()
+
+engine_queries = counter(
+    "sql_engine_queries_total",
+    "Queries by execution engine and outcome (ok, error, fallback: the analytic engine failed and SQLite ran it).",
+    ("engine", "result"),
+)
+
+
+class ExecutionEngine:
+    """
+    A backend that runs the agent's read-only queries. `fetch_rows` has the
+    contract of `app.tools.sql.fetch_rows` (columns, at most `max_rows` rows
+    as lists, whether more were available; QueryBudgetExceeded and
+    QueryCancelled on abort). Generated SQL is SQLite's dialect, so other
+    engines only `accept` queries they run with the same results.
+    """
+
+    name = "sqlite"
+
+    def accepts(self, query: str) -> bool:
+        return True
+
+    def fetch_rows(
+        self,
+        query: str,
+        parameters: tuple = (),
+        offset: int = 0,
+        max_rows: int = SQL_MAX_RESULT_ROWS,
+        cancel: Optional[threading.Event] = None,
+    ) -> Tuple[List[str], List[List[Any]], bool]:
+        return fetch_rows(query, parameters, offset, max_rows, cancel)
+
+
+_sqlite = ExecutionEngine()
+_analytic: Optional[ExecutionEngine] = None
+_analytic_lock = threading.Lock()
+
+
+def get_analytic_engine() -> Optional[ExecutionEngine]:
+    """Returns the configured analytic engine, or None when there is none (or its package is not installed)."""
+    global _analytic
+    if SQL_ANALYTIC_ENGINE != "duckdb":
+        return None
+    with _analytic_lock:
+        if _analytic is None:
+            from app.tools.duckdb_engine import DuckDBEngine, duckdb
+
+            if duckdb is None:
+                logger.warning("SQL_ANALYTIC_ENGINE=duckdb but the duckdb package is not installed; using SQLite only")
+                _analytic = _sqlite
+            else:
+                _analytic = DuckDBEngine()
+    return _analytic if _analytic is not _sqlite else None
+
+
+def engine_for(query: str) -> ExecutionEngine:
+    """The analytic engine when it is configured, up to date and accepts the query; SQLite otherwise."""
+    analytic = get_analytic_engine()
+    if analytic is not None and analytic.accepts(query):
+        return analytic
+    return _sqlite
+
+
+def run_query(
+    query: str,
+    parameters: tuple = (),
+    offset: int = 0,
+    max_rows: int = SQL_MAX_RESULT_ROWS,
+    cancel: Optional[threading.Event] = None,
+) -> Tuple[List[str], List[List[Any]], bool]:
+    """
+    Runs a query on the engine `engine_for` picks. If the analytic engine
+    fails for any reason other than its budget or a cancellation, SQLite
+    runs the query instead, so routing never turns an answer into an error.
+    """
+    engine = engine_for(query)
+    try:
+        result = engine.fetch_rows(query, parameters, offset, max_rows, cancel)
+    except (QueryBudgetExceeded, QueryCancelled):
+        raise
+    except Exception as e:
+        if engine is _sqlite:
+            engine_queries.inc(engine=engine.name, result="error")
+            raise
+        engine_queries.inc(engine=engine.name, result="fallback")
+        logger.info(f"[SQL Engine] {engine.name} failed, running on SQLite: {e}")
+        return _sqlite.fetch_rows(query, parameters, offset, max_rows, cancel)
+    engine_queries.inc(engine=engine.name, result="ok")
+    return result
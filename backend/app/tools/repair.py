@@ -0,0 +1,184 @@
+import difflib
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.observability.metrics import counter
+from app.tools.catalog import SchemaCatalog, get_schema_catalog_async
+from app.tools.cost import table_aliases
+from app.tools.sql import explain_query_plan_async
+from app.tools.table_index import text_words
+from app.tools.validator import sql_tokens
+
+# Compile generated SQL (prepare only) before running it, fixing unknown table/column names locally
+SQL_PRECHECK_ENABLED = os.getenv("SQL_PRECHECK_ENABLED", "true").lower() == "true"
+# Identifier fixes applied to one query before it goes back to the LLM for repair
+SQL_AUTOFIX_MAX_EDITS = int(os.getenv("SQL_AUTOFIX_MAX_EDITS", "3"))
+
+_NO_SUCH_RE = re.compile(r"no such (column|table): (\S+)")
+_PLAIN_IDENT_RE = re.compile(r"^[^\W\d]\w*$")
+_CLOSE_MATCH_CUTOFF = 0.85
+
+repair_events = counter(
+    "sql_repair_events_total",
+    "SQL repair loop: compile_error (caught before running), autofixed (fixed locally), llm_repair (sent back to the LLM).",
+    ("event",),
+)
+
+
+class Precheck(BaseModel):
+    """Outcome of the local checks: the (possibly fixed) query, SQLite's error if it still fails, and the fixes applied."""
+    sql: str
+    error: Optional[str] = None
+    fixes: List[str] = []
+
+
+async def compile_error(query: str) -> Optional[str]:
+    """Prepares the query without running it (EXPLAIN QUERY PLAN) and returns SQLite's error, if any."""
+    try:
+        await explain_query_plan_async(query)
+    except Exception as e:
+        return str(e).removeprefix("Query execution failed: ")
+    return None
+
+
+def _normalise(name: str) -> str:
+    return "".join(text_words(name))
+
+
+def _closest(name: str, candidates: List[str]) -> Optional[str]:
+    """The one candidate that is `name` up to case, underscores and plurals, or failing that a near spelling."""
+    by_key: Dict[str, List[str]] = {}
+    for candidate in candidates:
+        by_key.setdefault(_normalise(candidate), []).append(candidate)
+    key = _normalise(name)
+    if key in by_key:
+        return by_key[key][0] if len(by_key[key]) == 1 else None
+    close = difflib.get_close_matches(key, list(by_key), n=2, cutoff=_CLOSE_MATCH_CUTOFF)
+    if len(close) == 1 and len(by_key[close[0]]) == 1:
+        return by_key[close[0]][0]
+    return None
+
+
+def _ident(token: str) -> str:
+    return token[1:-1] if token[:1] in "\"`[" else token
+
+
+def _quote(name: str) -> str:
+    return name if _PLAIN_IDENT_RE.match(name) else '"' + name.replace('"', '""') + '"'
+
+
+def _replace(sql: str, name: str, replacement: str, qualifier: Optional[str] = None, new_qualifier: Optional[str] = None) -> str:
+    """
+    Rewrites references to identifier `name` (as `qualifier.name` when given,
+    otherwise unqualified) outside strings and comments.
+    """
+    tokens = list(sql_tokens(sql))
+    out: List[str] = []
+    for i, (kind, text) in enumerate(tokens):
+        if kind in ("word", "quoted") and _ident(text).lower() == name.lower():
+            before = tokens[i - 1][1] if i else ""
+            if qualifier is None and before != ".":
+                out.append(_quote(replacement))
+                continue
+            if qualifier is not None and before == "." and i >= 2 and _ident(tokens[i - 2][1]).lower() == qualifier.lower():
+                if new_qualifier is not None:
+                    out[-2] = _quote(new_qualifier)
+                out.append(_quote(replacement))
+                continue
+        out.append(text)
+    return "".join(out)
+
+
+def _qualifiers(sql: str, catalog: SchemaCatalog) -> Dict[str, str]:
+    """Qualifier (lowercased alias, or table name for unaliased tables) -> table, for the tables the query reads."""
+    aliases = table_aliases(sql, catalog)
+    aliased = set(aliases.values())
+    qualifiers = dict(aliases)
+    for kind, text in sql_tokens(sql):
+        table = catalog.get_table(_ident(text)) if kind in ("word", "quoted") else None
+        if table is not None and table.name not in aliased:
+            qualifiers[table.name.lower()] = table.name
+    return qualifiers
+
+
+def _fix_column(sql: str, name: str, catalog: SchemaCatalog) -> Optional[Tuple[str, str]]:
+    qualifier, _, column = name.rpartition(".")
+    qualifiers = _qualifiers(sql, catalog)
+    if qualifier:
+        table = qualifiers.get(qualifier.lower())
+        if table is not None:
+            match = _closest(column, catalog.tables[table].column_names)
+            if match:
+                return _replace(sql, column, match, qualifier), f"{name} -> {qualifier}.{match}"
+        # The column belongs to another table of the query: requalify it
+        owners = {(q, _closest(column, catalog.tables[t].column_names)) for q, t in qualifiers.items()}
+        owners = {(q, match) for q, match in owners if match and q != qualifier.lower()}
+        tables = {qualifiers[q] for q, _ in owners}
+        if len(owners) == 1 and len(tables) == 1:
+            owner, match = owners.pop()
+            written = next((_ident(text) for _, text in sql_tokens(sql) if _ident(text).lower() == owner), owner)
+            return _replace(sql, column, match, qualifier, written), f"{name} -> {written}.{match}"
+        return None
+    matches = {_closest(column, catalog.tables[t].column_names) for t in set(qualifiers.values())} - {None}
+    if len(matches) == 1:
+        match = matches.pop()
+        return _replace(sql, column, match), f"{column} -> {match}"
+    return None
+
+
+def _defined_aliases(sql: str) -> set:
+    """Names introduced with `AS` (result columns, CTEs); an unknown one is a misuse, not a typo."""
+    tokens = [(kind, text) for kind, text in sql_tokens(sql) if kind not in ("space", "comment")]
+    return {
+        _ident(tokens[i + 1][1]).lower()
+        for i, (kind, text) in enumerate(tokens[:-1])
+        if kind == "word" and text.upper() == "AS"
+    }
+
+
+def autofix_identifier(sql: str, error: str, catalog: SchemaCatalog) -> Optional[Tuple[str, str]]:
+    """
+    Fixes the unknown table or column SQLite reported, when the catalog has
+    exactly one near match among the tables the query reads: a different
+    spelling (`billing_country` -> `BillingCountry`, `Tracks` -> `Track`)
+    or the right column under the wrong alias (`c.Total` -> `i.Total`).
+    Returns the fixed query and a description of the edit.
+    """
+    match = _NO_SUCH_RE.search(error)
+    if match is None:
+        return None
+    what, name = match.groups()
+    if what == "table":
+        table = _closest(name, catalog.table_names)
+        return (_replace(sql, name, table), f"{name} -> {table}") if table else None
+    if name.rpartition(".")[2].lower() in _defined_aliases(sql):
+        return None
+    return _fix_column(sql, name, catalog)
+
+
+async def precheck_query(sql: str) -> Precheck:
+    """
+    Compiles the query without running it; unknown table/column errors are
+    fixed locally (up to SQL_AUTOFIX_MAX_EDITS) and recompiled, so only
+    errors that need the LLM cost a round-trip. A no-op when SQL_PRECHECK_ENABLED is off.
+    """
+    if not SQL_PRECHECK_ENABLED:
+        return Precheck(sql=sql)
+    catalog = await get_schema_catalog_async()
+    fixes: List[str] = []
+    error = await compile_error(sql)
+    while error is not None and len(fixes) < SQL_AUTOFIX_MAX_EDITS:
+        fixed = autofix_identifier(sql, error, catalog)
+        if fixed is None:
+            break
+        sql, fix = fixed
+        fixes.append(fix)
+        error = await compile_error(sql)
+    if fixes and error is None:
+        repair_events.inc(event="autofixed")
+    if error is not None:
+        repair_events.inc(event="compile_error")
+    return Precheck(sql=sql, error=error, fixes=fixes)
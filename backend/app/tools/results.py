@@ -0,0 +1,80 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.state.state import QueryResult
+from app.tools.sql import fetch_rows_async, SQL_MAX_RESULT_ROWS
+
+# How many result handles stay pageable; only the SQL is kept, never the rows
+RESULT_HANDLE_CAPACITY = int(os.getenv("RESULT_HANDLE_CAPACITY", "10000"))
+RESULT_PAGE_MAX_ROWS = int(os.getenv("RESULT_PAGE_MAX_ROWS", "1000"))
+
+_handles: "OrderedDict[str, str]" = OrderedDict()
+_handles_lock = threading.Lock()
+
+
+def register_result(sql: str) -> str:
+    """Registers the SQL behind a result and returns its pageable handle."""
+    result_id = uuid.uuid4().hex
+    with _handles_lock:
+        _handles[result_id] = sql
+        while len(_handles) > RESULT_HANDLE_CAPACITY:
+            _handles.popitem(last=False)
+    return result_id
+
+
+def get_result_sql(result_id: str) -> Optional[str]:
+    """Returns the SQL behind a result handle, if it is still registered."""
+    with _handles_lock:
+        return _handles.get(result_id)
+
+
+async def execute_query_result(sql: str, max_rows: int = SQL_MAX_RESULT_ROWS) -> QueryResult:
+    """Runs the query and returns its first `max_rows` rows as a pageable, columnar result."""
+    columns, rows, truncated = await fetch_rows_async(sql, max_rows=max_rows)
+    return {
+        "result_id": register_result(sql),
+        "columns": columns,
+        "rows": rows,
+        "row_count": len(rows),
+        "truncated": truncated,
+    }
+
+
+async def fetch_result_page(
+    result_id: str, offset: int, limit: int, records: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetches rows [offset, offset + limit) of a registered result, or None if the handle is unknown.
+    Out-of-range paging is clamped (offset >= 0, 1 <= limit <= RESULT_PAGE_MAX_ROWS) and the
+    offset actually used is returned. With `records`, rows are returned as one dict per row
+    (the shape Vega-Lite loads).
+    """
+    sql = get_result_sql(result_id)
+    if sql is None:
+        return None
+    offset = max(0, offset)
+    limit = max(1, min(limit, RESULT_PAGE_MAX_ROWS))
+    columns, rows, has_more = await fetch_rows_async(sql, offset=offset, max_rows=limit)
+    if records:
+        rows = [dict(zip(columns, row)) for row in rows]
+    return {"result_id": result_id, "columns": columns, "rows": rows, "offset": offset, "has_more": has_more}
+
+
+def result_data_url(result_id: str, limit: int = RESULT_PAGE_MAX_ROWS) -> Dict[str, Any]:
+    """Vega-Lite data block that loads a result's rows from the paging endpoint."""
+    return {
+        "url": f"/api/results/{result_id}?limit={limit}&format=records",
+        "format": {"type": "json", "property": "rows"},
+    }
+
+
+def result_rows_as_dicts(result: Optional[QueryResult], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Expands (up to `limit`) columnar rows into one dict per row."""
+    if not result:
+        return []
+    rows = result["rows"] if limit is None else result["rows"][:limit]
+    columns = result["columns"]
+    return [dict(zip(columns, row)) for row in rows]
@@ -1,22 +1,221 @@
-from typing import List, Dict
-from app.tools.sql import get_table_names, get_table_schema
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
-def get_database_schema_string(table_names: List[str] = None) -> str:
+from app.observability.metrics import counter
+from app.tools.catalog import ColumnInfo, SchemaCatalog, TableInfo, get_schema_catalog
+from app.tools.sql import get_query_executor
+from app.tools.table_index import text_words
+
+# "compact" renders `Table(col:type, ...)` lines plus foreign-key edges; "ddl" sends the raw CREATE statements
+SCHEMA_PROMPT_FORMAT = os.getenv("SCHEMA_PROMPT_FORMAT", "compact")
+# Only spell out the columns the question is about; the others are listed by name
+SCHEMA_PRUNE_COLUMNS = os.getenv("SCHEMA_PRUNE_COLUMNS", "true").lower() == "true"
+# Sample values shown per rendered text column (from the catalog's cached samples)
+SCHEMA_SAMPLE_VALUES = int(os.getenv("SCHEMA_SAMPLE_VALUES", "3"))
+SCHEMA_RENDER_CACHE_SIZE = int(os.getenv("SCHEMA_RENDER_CACHE_SIZE", "512"))
+
+_SAMPLE_CHARS = 24
+# Always rendered in full: what a result row is usually labelled by
+_LABEL_WORDS = {"name", "title"}
+# Question words that point at columns they don't share a word with
+_SYNONYMS = {
+    "revenue": {"total", "price", "quantity"},
+    "sale": {"total", "price", "quantity"},
+    "sold": {"quantity", "price"},
+    "spent": {"total"},
+    "spend": {"total"},
+    "earn": {"total"},
+    "income": {"total"},
+    "purchase": {"quantity", "total"},
+    "bought": {"quantity", "total"},
+    "cost": {"price", "total"},
+    "expensive": {"price", "total"},
+    "cheap": {"price", "total"},
+    "when": {"date"},
+    "day": {"date"},
+    "month": {"date"},
+    "monthly": {"date"},
+    "year": {"date"},
+    "yearly": {"date"},
+    "annual": {"date"},
+    "recent": {"date"},
+    "latest": {"date"},
+    "trend": {"date"},
+    "long": {"millisecond"},
+    "longest": {"millisecond"},
+    "duration": {"millisecond"},
+    "length": {"millisecond"},
+    "minute": {"millisecond"},
+    "size": {"byte"},
+    "largest": {"byte"},
+    "where": {"country", "city"},
+    "location": {"country", "city", "address"},
+    "manager": {"report"},
+    "contact": {"email", "phone"},
+}
+
+_fragment_lookups = counter("schema_fragment_cache_total", "Rendered schema fragment lookups by outcome.", ("result",))
+
+
+def get_database_schema_string(
+    table_names: List[str] = None, question: Optional[str] = None, prune: bool = True
+) -> str:
     """
     Returns a formatted string containing the schema for the specified tables.
     If no tables are specified, returns schema for all tables.
+    Served from the in-process schema catalog, so no disk round-trips per table.
     """
-    if not table_names:
-        table_names = get_table_names()
-    
-    schema_parts = []
-    for table in table_names:
-        schema = get_table_schema(table)
-        if schema:
-            schema_parts.append(schema)
-            
-    return "\n\n".join(schema_parts)
+    catalog = get_schema_catalog()
+    if SCHEMA_PROMPT_FORMAT == "ddl":
+        return catalog.schema_string(table_names)
+    features = question_features(question) if question and prune and SCHEMA_PRUNE_COLUMNS else None
+    return render_compact_schema(catalog, table_names or catalog.table_names, features)
+
+
+async def get_database_schema_string_async(
+    table_names: List[str] = None, question: Optional[str] = None, prune: bool = True
+) -> str:
+    """`get_database_schema_string` on the SQL worker pool (it may load the catalog or sample values)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_query_executor(), get_database_schema_string, table_names, question, prune
+    )
+
 
 def get_all_table_names_formatted() -> str:
     """Returns a comma-separated string of all table names."""
-    return ", ".join(get_table_names())
+    return ", ".join(get_schema_catalog().table_names)
+
+
+def question_features(question: str) -> FrozenSet[str]:
+    """The question's words, plus the column words its vaguer terms ("revenue", "monthly") stand for."""
+    words = set(text_words(question))
+    for word in list(words):
+        words |= _SYNONYMS.get(word, set())
+    return frozenset(words)
+
+
+def _short_type(declared: str) -> str:
+    upper = declared.upper()
+    if "INT" in upper:
+        return "int"
+    if any(t in upper for t in ("CHAR", "CLOB", "TEXT")):
+        return "text"
+    if any(t in upper for t in ("REAL", "FLOA", "DOUB")):
+        return "real"
+    if any(t in upper for t in ("NUM", "DEC")):
+        return "num"
+    return declared.split("(")[0].lower() or "any"
+
+
+def _column_words(column: ColumnInfo, samples: List[str]) -> FrozenSet[str]:
+    words = set(text_words(column.name))
+    for value in samples:
+        words.update(text_words(value))
+    return frozenset(words)
+
+
+def _render_column(column: ColumnInfo, samples: List[str]) -> str:
+    rendered = f"{column.name}:{_short_type(column.type)}"
+    if column.primary_key:
+        rendered += " pk"
+    if samples and SCHEMA_SAMPLE_VALUES > 0:
+        shown = ",".join(repr(v[:_SAMPLE_CHARS]) for v in samples[:SCHEMA_SAMPLE_VALUES])
+        rendered += f" e.g. {shown}"
+    return rendered
+
+
+def render_table(table: TableInfo, samples: Dict[str, List[str]], features: Optional[FrozenSet[str]]) -> str:
+    """
+    One table as `Table(col:type, ...)`. With question `features`, only keys,
+    label columns and columns whose name or sample values match the question
+    are spelled out; the rest are listed by name after `+`, so the model
+    still knows they exist.
+    """
+    keys = {fk.column for fk in table.foreign_keys}
+    full, named = [], []
+    for column in table.columns:
+        column_samples = samples.get(column.name, [])
+        words = _column_words(column, column_samples)
+        if (
+            features is None
+            or column.primary_key
+            or column.name in keys
+            or words & _LABEL_WORDS
+            or words & features
+        ):
+            full.append(_render_column(column, column_samples))
+        else:
+            named.append(column.name)
+    body = ", ".join(full)
+    if named:
+        body += " +" + ",".join(named)
+    return f"{table.name}({body})"
+
+
+_memo: "OrderedDict[Tuple, object]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _memoized(key: Tuple, build):
+    with _memo_lock:
+        value = _memo.get(key)
+        if value is not None:
+            _memo.move_to_end(key)
+            return value, True
+    value = build()
+    with _memo_lock:
+        _memo[key] = value
+        while len(_memo) > SCHEMA_RENDER_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return value, False
+
+
+def _vocabulary(table: TableInfo, samples: Dict[str, List[str]]) -> FrozenSet[str]:
+    """Every word a question could match in `table`'s column names and sample values."""
+    words = set()
+    for column in table.columns:
+        words |= _column_words(column, samples.get(column.name, []))
+    return frozenset(words)
+
+
+def _table_fragment(catalog: SchemaCatalog, table: TableInfo, features: Optional[FrozenSet[str]]) -> str:
+    """
+    Rendered table, memoized per (schema/data version, table, matching
+    question features): questions that touch the same columns share an entry.
+    """
+    samples = catalog.sample_values(table.name)
+    versions = (catalog.schema_version, catalog.data_version, table.name)
+    relevant = None
+    if features is not None:
+        # Only the question features this table could match can change how it renders
+        vocabulary, _ = _memoized(("vocabulary", *versions), lambda: _vocabulary(table, samples))
+        relevant = features & vocabulary
+    fragment, hit = _memoized(("fragment", *versions, relevant), lambda: render_table(table, samples, relevant))
+    _fragment_lookups.inc(result="hit" if hit else "miss")
+    return fragment
+
+
+def render_compact_schema(
+    catalog: SchemaCatalog, table_names: List[str], features: Optional[FrozenSet[str]] = None
+) -> str:
+    """
+    Token-minimal schema for the SQL generator: one `Table(col:type, ...)`
+    line per table, then the foreign-key edges between the given tables
+    (`Track.AlbumId -> Album.AlbumId`). `features=None` renders every column.
+    """
+    tables = [t for t in (catalog.get_table(name) for name in table_names) if t is not None]
+    names = {t.name for t in tables}
+    lines = [_table_fragment(catalog, table, features) for table in tables]
+    edges = []
+    for table in tables:
+        for fk in table.foreign_keys:
+            ref = catalog.get_table(fk.ref_table)
+            if ref is not None and ref.name in names:
+                edges.append(f"{table.name}.{fk.column} -> {ref.name}.{fk.ref_column or fk.column}")
+    if edges:
+        lines.append("Joins: " + "; ".join(edges))
+    return "\n".join(lines)
@@ -1,48 +1,379 @@
+import asyncio
+import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.observability.cancellation import cancelled_work
+from app.observability.tracing import record_sql
+from app.services.single_flight import SingleFlight, fingerprint
+from app.tools.validator import canonical_sql, read_only_authorizer
 
 # Configure DB Path
 # Assuming running from backend/ or root, careful with path
 # Current file is backend/app/tools/sql.py
 # Database is backend/app/data/chinook.db
-DB_PATH = Path(__file__).parents[1] / "data" / "chinook.db"
+DB_PATH = Path(os.getenv("SQL_AGENT_DB_PATH", Path(__file__).parents[1] / "data" / "chinook.db"))
+
+# Pool / connection tuning
+SQL_POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "8"))
+SQL_MMAP_SIZE = int(os.getenv("SQL_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+SQL_CACHE_SIZE_KB = int(os.getenv("SQL_CACHE_SIZE_KB", str(64 * 1024)))  # per connection
+
+# Result set bounds
+SQL_MAX_RESULT_ROWS = int(os.getenv("SQL_MAX_RESULT_ROWS", "1000"))
+SQL_FETCH_BATCH_SIZE = int(os.getenv("SQL_FETCH_BATCH_SIZE", "256"))
+
+# Execution budget per query (0 disables a limit)
+SQL_QUERY_TIMEOUT_SECONDS = float(os.getenv("SQL_QUERY_TIMEOUT_SECONDS", "10"))
+SQL_MAX_VM_STEPS = int(os.getenv("SQL_MAX_VM_STEPS", "200000000"))
+SQL_PROGRESS_INTERVAL = 10000  # VM instructions between budget checks
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a query is aborted for exceeding its time or VM-step budget."""
+
+
+class QueryCancelled(Exception):
+    """Raised when a running query is aborted because its caller went away."""
+
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
+def get_db_connection() -> sqlite3.Connection:
+    """Establishes a tuned, read-only connection to the SQLite database."""
     try:
         if not DB_PATH.exists():
             raise FileNotFoundError(f"Database not found at {DB_PATH}")
-        
-        conn = sqlite3.connect(DB_PATH)
+
+        # mode=ro makes the file handle itself read-only; query_only guards the connection
+        uri = f"{DB_PATH.resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
         conn.row_factory = sqlite3.Row  # Return rows as dict-like objects
+        conn.execute(f"PRAGMA mmap_size = {SQL_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{SQL_CACHE_SIZE_KB}")  # negative value = KiB
+        conn.execute("PRAGMA query_only = ON")
+        # Denies writes, ATTACH, most pragmas and file functions when a statement is prepared
+        conn.set_authorizer(read_only_authorizer)
         return conn
     except Exception as e:
         raise ConnectionError(f"Failed to connect to database: {e}")
 
+
+class ConnectionPool:
+    """
+    A bounded pool of read-only SQLite connections.
+    Connections are opened lazily up to `size` and reused, so connect/teardown
+    cost is paid once per connection instead of once per query.
+    """
+
+    def __init__(self, size: int = SQL_POOL_SIZE):
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise ConnectionError("Connection pool is closed")
+            if self._created < self.size:
+                conn = get_db_connection()
+                self._created += 1
+                return conn
+
+        # Pool exhausted: wait for a connection to be released
+        return self._idle.get()
+
+    def _release(self, conn: sqlite3.Connection):
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection for the duration of the `with` block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Closes all idle connections; busy ones are closed when released."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[ConnectionPool] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Dedicated connection for change detection: PRAGMA data_version is only
+# meaningful when it is read repeatedly from the same connection.
+_probe: Optional[sqlite3.Connection] = None
+_probe_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """Returns the process-wide connection pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_query_executor() -> ThreadPoolExecutor:
+    """Returns the bounded worker pool used to run queries off the event loop."""
+    global _executor
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=SQL_POOL_SIZE, thread_name_prefix="sql-worker")
+    return _executor
+
+
+def get_db_versions() -> Tuple[int, int]:
+    """
+    Returns (schema_version, data_version) for the database.
+    schema_version changes on DDL; data_version changes whenever another
+    connection commits. Both are cheap header reads.
+    """
+    global _probe
+    with _probe_lock:
+        if _probe is None:
+            _probe = get_db_connection()
+        schema_version = _probe.execute("PRAGMA schema_version").fetchone()[0]
+        data_version = _probe.execute("PRAGMA data_version").fetchone()[0]
+        return schema_version, data_version
+
+
+def get_data_stamp() -> str:
+    """
+    Returns a process-independent fingerprint of the database contents.
+    data_version counters are per-connection and restart from scratch in a new
+    process, so anything persisted to disk is keyed on this stamp instead: the
+    size and mtime of the database file and its WAL, which every commit touches.
+    """
+    parts = []
+    for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal")):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+    return "/".join(parts)
+
+
+def close_connection_pool():
+    """Shuts down the worker threads and closes pooled connections."""
+    global _pool, _executor, _probe
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    with _probe_lock:
+        if _probe is not None:
+            _probe.close()
+            _probe = None
+
+
 def execute_read_query(query: str, parameters: tuple = ()) -> List[Dict[str, Any]]:
-    """Executes a read-only SQL query."""
-    conn = get_db_connection()
+    """
+    Executes a read-only SQL query through `fetch_rows`, so it runs under the
+    same time/VM-step budget and returns at most SQL_MAX_RESULT_ROWS rows.
+    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, parameters)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        columns, rows, _ = fetch_rows(query, parameters)
     except Exception as e:
         raise Exception(f"Query execution failed: {e}")
+    return [dict(zip(columns, row)) for row in rows]
+
+
+class _QueryBudget:
+    """
+    SQLite progress handler enforcing a wall-clock and VM-step budget.
+    SQLite calls it every SQL_PROGRESS_INTERVAL instructions; returning
+    True makes the running statement fail with "interrupted".
+    """
+
+    def __init__(self, cancel: Optional[threading.Event] = None):
+        self.deadline = time.monotonic() + SQL_QUERY_TIMEOUT_SECONDS if SQL_QUERY_TIMEOUT_SECONDS > 0 else None
+        self.max_calls = SQL_MAX_VM_STEPS // SQL_PROGRESS_INTERVAL if SQL_MAX_VM_STEPS > 0 else None
+        self.cancel = cancel
+        self.calls = 0
+        self.reason: Optional[str] = None
+
+    def __call__(self) -> bool:
+        self.calls += 1
+        if self.cancel is not None and self.cancel.is_set():
+            self.reason = "cancelled"
+        elif self.max_calls is not None and self.calls > self.max_calls:
+            self.reason = f"exceeded the budget of {SQL_MAX_VM_STEPS:,} VM steps"
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = f"exceeded the {SQL_QUERY_TIMEOUT_SECONDS:g}s time limit"
+        return self.reason is not None
+
+    def error(self, e: Exception) -> Exception:
+        """Maps an "interrupted" error from an aborted statement to the reason it was aborted."""
+        if self.reason == "cancelled":
+            cancelled_work.inc(kind="sql_query")
+            return QueryCancelled("Query cancelled")
+        if self.reason is not None:
+            return QueryBudgetExceeded(f"Query {self.reason}")
+        return Exception(f"Query execution failed: {e}")
+
+
+def fetch_rows(
+    query: str,
+    parameters: tuple = (),
+    offset: int = 0,
+    max_rows: int = SQL_MAX_RESULT_ROWS,
+    cancel: Optional[threading.Event] = None,
+) -> Tuple[List[str], List[List[Any]], bool]:
+    """
+    Executes a read-only SQL query and streams at most `max_rows` rows (after
+    skipping `offset`) in `fetchmany` batches, so memory stays bounded however
+    large the full result is. The query is aborted once it exceeds its time or
+    VM-step budget (QueryBudgetExceeded) or `cancel` is set (QueryCancelled).
+    Returns (column names, rows as lists, whether more rows were available).
+    """
+    budget = _QueryBudget(cancel)
+    with get_connection_pool().connection() as conn:
+        conn.set_progress_handler(budget, SQL_PROGRESS_INTERVAL)
+        cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples, no per-row dict
+        try:
+            cursor.execute(query, parameters)
+            columns = [d[0] for d in cursor.description or ()]
+
+            skipped = 0
+            while skipped < offset:
+                batch = cursor.fetchmany(min(SQL_FETCH_BATCH_SIZE, offset - skipped))
+                if not batch:
+                    return columns, [], False
+                skipped += len(batch)
+
+            rows: List[List[Any]] = []
+            while len(rows) < max_rows:
+                batch = cursor.fetchmany(min(SQL_FETCH_BATCH_SIZE, max_rows - len(rows)))
+                if not batch:
+                    return columns, rows, False
+                rows.extend(list(row) for row in batch)
+
+            return columns, rows, cursor.fetchone() is not None
+        except Exception as e:
+            raise budget.error(e)
+        finally:
+            # Finalizes the statement so the pooled connection holds no read lock
+            cursor.close()
+            conn.set_progress_handler(None, 0)
+
+
+_query_flights = SingleFlight("sql")
+
+
+async def fetch_rows_async(
+    query: str,
+    parameters: tuple = (),
+    offset: int = 0,
+    max_rows: int = SQL_MAX_RESULT_ROWS,
+) -> Tuple[List[str], List[List[Any]], bool]:
+    """
+    `fetch_rows` on the SQL worker pool, or on the analytic engine when one
+    is configured and takes the query. Concurrent calls for the same query
+    (up to formatting), page and database version share one execution.
+    Cancelling the awaiting task aborts the query on its worker thread
+    instead of leaving it running, once no other caller is waiting on it.
+    """
+    # The version probe blocks on SQLite: it runs on a default-pool thread, off the event loop
+    # and never queued behind long queries on the SQL workers
+    versions = await asyncio.to_thread(get_db_versions)
+    key = fingerprint(canonical_sql(query), parameters, offset, max_rows, versions)
+    columns, rows, more = await _query_flights.do(key, lambda: _run_fetch_rows(query, parameters, offset, max_rows))
+    return list(columns), list(rows), more
+
+
+async def _run_fetch_rows(
+    query: str, parameters: tuple, offset: int, max_rows: int
+) -> Tuple[List[str], List[List[Any]], bool]:
+    # Imported here: the engines build on this module
+    from app.tools.engines import run_query
+
+    loop = asyncio.get_running_loop()
+    cancel = threading.Event()
+    started = time.perf_counter()
+    future = loop.run_in_executor(get_query_executor(), run_query, query, parameters, offset, max_rows, cancel)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+    finally:
+        record_sql("query", time.perf_counter() - started)
+
+
+def explain_query_plan(query: str) -> List[Tuple[int, int, str]]:
+    """Returns the (id, parent, detail) rows of EXPLAIN QUERY PLAN; the query is only prepared, never run."""
+    with get_connection_pool().connection() as conn:
+        try:
+            return [(row[0], row[1], row[3]) for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+        except Exception as e:
+            raise Exception(f"Query execution failed: {e}")
+
+
+async def explain_query_plan_async(query: str) -> List[Tuple[int, int, str]]:
+    """`explain_query_plan` on the SQL worker pool."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(get_query_executor(), explain_query_plan, query)
     finally:
-        conn.close()
+        record_sql("explain", time.perf_counter() - started)
+
+
+async def execute_read_query_async(query: str, parameters: tuple = ()) -> List[Dict[str, Any]]:
+    """
+    `execute_read_query` through `fetch_rows_async`: runs on the worker pool,
+    shares identical concurrent queries and is aborted when cancelled.
+    """
+    try:
+        columns, rows, _ = await fetch_rows_async(query, parameters)
+    except Exception as e:
+        raise Exception(f"Query execution failed: {e}")
+    return [dict(zip(columns, row)) for row in rows]
+
 
 def get_table_names() -> List[str]:
-    """Retrieves all table names from the database."""
-    query = "SELECT name FROM sqlite_master WHERE type='table';"
-    results = execute_read_query(query)
-    return [row['name'] for row in results]
+    """Retrieves all table names from the cached schema catalog."""
+    from app.tools.catalog import get_schema_catalog
+    return get_schema_catalog().table_names
+
 
 def get_table_schema(table_name: str) -> str:
-    """Retrieves the schema CREATE statement for a specific table."""
-    query = "SELECT sql FROM sqlite_master WHERE type='table' AND name=?;"
-    results = execute_read_query(query, (table_name,))
-    if results:
-        return results[0]['sql']
+    """Retrieves the schema CREATE statement for a specific table from the catalog."""
+    from app.tools.catalog import get_schema_catalog
+    table = get_schema_catalog().get_table(table_name)
+    if table:
+        return table.create_sql
     return ""
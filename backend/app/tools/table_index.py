@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.tools.catalog import SchemaCatalog, TableInfo, get_schema_catalog
+from app.tools.sql import get_query_executor
+
+# Schemas with at most this many tables are sent to the LLM whole; larger ones go through retrieval
+TABLE_INDEX_MIN_TABLES = int(os.getenv("TABLE_INDEX_MIN_TABLES", "30"))
+# Tables retrieved by similarity, and the cap after adding their foreign-key neighbours
+TABLE_INDEX_TOP_K = int(os.getenv("TABLE_INDEX_TOP_K", "8"))
+TABLE_INDEX_MAX_CANDIDATES = int(os.getenv("TABLE_INDEX_MAX_CANDIDATES", "16"))
+TABLE_INDEX_DIM = int(os.getenv("TABLE_INDEX_DIM", "512"))
+TABLE_INDEX_PATH = os.getenv("TABLE_INDEX_PATH", str(Path(__file__).parents[1] / "data" / "table_index"))
+
+_WORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_COMMENT_RE = re.compile(r"^(.*?)--\s*(.+)$")
+_WORD_WEIGHT = 1.0
+_TRIGRAM_WEIGHT = 0.4
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def text_words(text: str) -> List[str]:
+    """Lowercased words, with identifiers split on case and underscores and lightly stemmed."""
+    return [_stem(raw.lower()) for raw in _WORD_RE.findall(text)]
+
+
+def text_features(text: str) -> List[Tuple[str, float]]:
+    """
+    Words (see `text_words`) plus their character trigrams, so "invoices",
+    "InvoiceLine" and "invoice_id" share features.
+    """
+    features = []
+    for word in text_words(text):
+        features.append((word, _WORD_WEIGHT))
+        padded = f"<{word}>"
+        features.extend((padded[i:i + 3], _TRIGRAM_WEIGHT) for i in range(len(padded) - 2))
+    return features
+
+
+def embed_text(text: str, dim: int = TABLE_INDEX_DIM) -> np.ndarray:
+    """
+    Signed crc32 feature hashes of the text's words and trigrams, L2-normalised.
+    Not a model embedding: deterministic and local, with no model or API call.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in text_features(text):
+        h = zlib.crc32(feature.encode())
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _comments(table: TableInfo) -> Tuple[List[str], Dict[str, List[str]]]:
+    """`--` comments in the CREATE statement, attached to the column defined on the same line."""
+    table_comments: List[str] = []
+    column_comments: Dict[str, List[str]] = {}
+    names = {c.name.lower(): c.name for c in table.columns}
+    for line in table.create_sql.splitlines():
+        match = _COMMENT_RE.match(line)
+        if not match:
+            continue
+        words = re.findall(r"\w+", match.group(1).lower())
+        column = next((names[w] for w in words if w in names), None)
+        if column:
+            column_comments.setdefault(column, []).append(match.group(2))
+        else:
+            table_comments.append(match.group(2))
+    return table_comments, column_comments
+
+
+def table_documents(table: TableInfo, samples: Dict[str, List[str]]) -> List[str]:
+    """The texts indexed for a table: its name (and comments), then one per column with type, comments and sample values."""
+    table_comments, column_comments = _comments(table)
+    documents = [" ".join([table.name, table.name, *table_comments])]
+    for column in table.columns:
+        parts = [table.name, column.name, column.name, column.type, *column_comments.get(column.name, [])]
+        parts.extend(samples.get(column.name, []))
+        documents.append(" ".join(parts))
+    return documents
+
+
+def schema_fingerprint(catalog: SchemaCatalog, dim: int, samples: Optional[Dict[str, Dict[str, List[str]]]] = None) -> str:
+    """Identifies an index build: the dimension, every CREATE statement and the sample values indexed with them."""
+    digest = hashlib.sha256(f"v2:{dim}".encode())
+    for name in catalog.table_names:
+        digest.update(catalog.tables[name].create_sql.encode())
+        digest.update(json.dumps((samples or {}).get(name, {}), sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+class TableIndex:
+    """
+    Vector index of a schema: one vector per table and per column, stored as a
+    memory-mapped float32 matrix. A table scores as its best-matching vector.
+
+    The matrix is dimension-major (dim x vectors): hashed query embeddings
+    are sparse, so a search only reads the rows of the query's non-zero
+    dimensions instead of the whole matrix.
+    """
+
+    def __init__(self, vectors: np.ndarray, tables: List[str], offsets: np.ndarray, neighbours: Dict[str, List[str]]):
+        self.vectors = vectors
+        self.tables = tables
+        self.offsets = offsets  # first vector of each table; vectors are grouped by table
+        self.neighbours = neighbours
+
+    @classmethod
+    def build(
+        cls,
+        catalog: SchemaCatalog,
+        samples: Optional[Dict[str, Dict[str, List[str]]]] = None,
+        path: Optional[str] = None,
+        dim: int = TABLE_INDEX_DIM,
+    ) -> "TableIndex":
+        """Embeds every table's documents; with `path`, saves the matrix there and maps it back in."""
+        rows: List[np.ndarray] = []
+        offsets: List[int] = []
+        for name in catalog.table_names:
+            table = catalog.tables[name]
+            offsets.append(len(rows))
+            rows.extend(embed_text(doc, dim) for doc in table_documents(table, (samples or {}).get(name, {})))
+        vectors = np.ascontiguousarray(np.vstack(rows).T) if rows else np.zeros((dim, 0), dtype=np.float32)
+
+        neighbours: Dict[str, List[str]] = {name: [] for name in catalog.table_names}
+        for name in catalog.table_names:
+            for fk in catalog.tables[name].foreign_keys:
+                ref = catalog.get_table(fk.ref_table)
+                if ref is None or ref.name == name:
+                    continue
+                for a, b in ((name, ref.name), (ref.name, name)):
+                    if b not in neighbours[a]:
+                        neighbours[a].append(b)
+
+        index = cls(vectors, list(catalog.table_names), np.array(offsets, dtype=np.int64), neighbours)
+        if path:
+            index.save(path)
+            return cls.load(path)
+        return index
+
+    def save(self, path: str):
+        """Writes the index to a scratch directory and renames it into place, so readers never see half of it."""
+        directory = Path(path)
+        scratch = directory.with_name(f"{directory.name}.tmp-{os.getpid()}")
+        scratch.mkdir(parents=True, exist_ok=True)
+        np.save(scratch / "vectors.npy", np.ascontiguousarray(self.vectors, dtype=np.float32))
+        meta = {"tables": self.tables, "offsets": self.offsets.tolist(), "neighbours": self.neighbours}
+        (scratch / "meta.json").write_text(json.dumps(meta))
+        try:
+            os.rename(scratch, directory)
+        except OSError:
+            # Another process built the same index first
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str) -> "TableIndex":
+        directory = Path(path)
+        meta = json.loads((directory / "meta.json").read_text())
+        vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+        return cls(vectors, meta["tables"], np.array(meta["offsets"], dtype=np.int64), meta["neighbours"])
+
+    def search(self, query: str, k: int = TABLE_INDEX_TOP_K) -> List[Tuple[str, float]]:
+        """Top-k tables by cosine similarity of their best-matching vector to the query."""
+        if not self.tables:
+            return []
+        embedding = embed_text(query, self.vectors.shape[0])
+        dims = np.flatnonzero(embedding)
+        scores = embedding[dims] @ self.vectors[dims]
+        table_scores = np.maximum.reduceat(scores, self.offsets)
+        k = min(k, len(self.tables))
+        top = np.argpartition(-table_scores, k - 1)[:k]
+        top = top[np.argsort(-table_scores[top])]
+        return [(self.tables[i], float(table_scores[i])) for i in top]
+
+    def candidates(self, query: str, k: int = TABLE_INDEX_TOP_K, limit: int = TABLE_INDEX_MAX_CANDIDATES) -> List[str]:
+        """Top-k tables, then their foreign-key neighbours (joins need them) up to `limit` tables."""
+        ranked = [name for name, _ in self.search(query, k)]
+        selected = list(ranked)
+        for name in ranked:
+            for neighbour in self.neighbours.get(name, []):
+                if len(selected) >= limit:
+                    return selected
+                if neighbour not in selected:
+                    selected.append(neighbour)
+        return selected
+
+
+_index: Optional[TableIndex] = None
+_index_fingerprint: Optional[str] = None
+_index_versions: Optional[Tuple[int, int]] = None
+_index_lock = threading.Lock()
+
+
+def _prune_indexes(keep: Path):
+    """Deletes indexes of earlier schemas or samples (processes still mapping one keep their open files)."""
+    for other in Path(TABLE_INDEX_PATH).iterdir():
+        if other != keep and ".tmp-" not in other.name:
+            shutil.rmtree(other, ignore_errors=True)
+
+
+def get_table_index() -> TableIndex:
+    """
+    Returns the index for the current schema and sample values. Whenever the
+    schema or data version changes the samples are re-read, and the index is
+    rebuilt if they differ from the ones it was built with. Built indexes are
+    kept under TABLE_INDEX_PATH keyed by that fingerprint, so restarts map the
+    existing matrix instead of rebuilding.
+    """
+    global _index, _index_fingerprint, _index_versions
+    catalog = get_schema_catalog()
+    versions = (catalog.schema_version, catalog.data_version)
+    with _index_lock:
+        if _index is None or _index_versions != versions:
+            samples = {name: catalog.sample_values(name) for name in catalog.table_names}
+            fingerprint = schema_fingerprint(catalog, TABLE_INDEX_DIM, samples)
+            if _index is None or _index_fingerprint != fingerprint:
+                path = Path(TABLE_INDEX_PATH) / fingerprint
+                if (path / "meta.json").exists():
+                    _index = TableIndex.load(str(path))
+                else:
+                    _index = TableIndex.build(catalog, samples, str(path))
+                    _prune_indexes(path)
+                _index_fingerprint = fingerprint
+            _index_versions = versions
+        return _index
+
+
+def candidate_tables(query: str) -> List[str]:
+    """
+    Tables to offer the LLM for `query`: the whole schema when it is small,
+    otherwise the retrieved top-k tables and their foreign-key neighbours.
+    """
+    catalog = get_schema_catalog()
+    if len(catalog.table_names) <= TABLE_INDEX_MIN_TABLES:
+        return list(catalog.table_names)
+    return get_table_index().candidates(query)
+
+
+async def candidate_tables_async(query: str) -> List[str]:
+    """`candidate_tables` on the SQL worker pool (it may load the catalog, sample values or build the index)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_query_executor(), candidate_tables, query)
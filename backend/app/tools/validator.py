@@ -1,26 +1,166 @@
 import re
-from typing import Tuple
+import sqlite3
+from typing import Iterator, Tuple
+
+# Statements a read-only query may start with
+ALLOWED_STATEMENTS = {"SELECT", "WITH", "VALUES"}
+
+# Statements that write, change the schema, manage transactions or the connection
+FORBIDDEN_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "UPSERT", "MERGE", "TRUNCATE",
+    "CREATE", "DROP", "ALTER", "RENAME", "REINDEX", "VACUUM", "ANALYZE",
+    "ATTACH", "DETACH", "PRAGMA",
+    "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE",
+    "GRANT", "REVOKE",
+}
+
+# Functions that touch the filesystem or the SQLite internals
+FORBIDDEN_FUNCTIONS = {"LOAD_EXTENSION", "READFILE", "WRITEFILE", "EDIT", "FTS3_TOKENIZER", "SQLITE_DBPAGE"}
+
+# One alternation covers every SQLite token, so the query is scanned once,
+# left to right; literals and quoted identifiers are consumed whole and
+# never mistaken for keywords.
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<space>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+    | (?P<blob>[xX]'[0-9A-Fa-f]*')
+    | (?P<number>0[xX][0-9A-Fa-f]+|(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>[^\W\d][\w$]*)
+    | (?P<param>[?][0-9]*|[:@$][A-Za-z0-9_]+)
+    | (?P<unterminated>['"`\[]|/\*)
+    | (?P<semicolon>;)
+    | (?P<op>\|\||<<|>>|<=|>=|==|!=|<>|->>|->|[-+*/%<>=~&|(),.])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def sql_tokens(query: str) -> Iterator[Tuple[str, str]]:
+    """
+    Splits a query into (kind, text) tokens, whitespace and comments included,
+    so joining the texts gives the query back. Unexpected characters come out
+    as ("other", char).
+    """
+    pos = 0
+    while pos < len(query):
+        match = _TOKEN_RE.match(query, pos)
+        if match is None:
+            yield "other", query[pos]
+            pos += 1
+            continue
+        yield match.lastgroup, match.group()
+        pos = match.end()
+
+
+def canonical_sql(query: str) -> str:
+    """
+    The query with comments, trailing semicolons and layout dropped (tokens
+    joined by single spaces), so queries that differ only in formatting match.
+    """
+    tokens = [text for kind, text in sql_tokens(query) if kind not in ("space", "comment")]
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return " ".join(tokens)
 
-FORBIDDEN_KEYWORDS = [
-    "DROP", "DELETE", "TRUNCATE", "UPDATE", "INSERT", "ALTER", "GRANT", "REVOKE"
-]
 
 def validate_sql_safety(query: str) -> Tuple[bool, str]:
     """
-    Validates that the SQL query is read-only and safe to execute.
+    Validates that the SQL query is a single read-only statement.
     Returns (is_safe, error_message).
+
+    Keywords are only checked where a statement starts: the first word, and
+    after a WITH clause's last CTE. Elsewhere they are ordinary names
+    (`SELECT Name AS release`); the connection's authorizer still denies
+    anything but reads.
     """
-    # Normalize query
-    normalized = query.upper()
-    
-    # Check for forbidden keywords
-    for keyword in FORBIDDEN_KEYWORDS:
-        # Check for keyword as a whole word
-        if re.search(r'\b' + keyword + r'\b', normalized):
-            return False, f"SQL query contains forbidden keyword: {keyword}. Only read-only queries are allowed."
-            
-    # Basic check for semicolon at end (optional, sqlite handles it but good practice)
-    # if not query.strip().endswith(';'):
-    #     return False, "Query must end with a semicolon."
-        
+    statement_type = None
+    ended = False  # a top-level ';' was seen
+    depth = 0
+    main_pending = False  # a WITH query whose main statement hasn't been seen yet
+    after_cte = False  # a CTE body just closed: AS, ',' or the main statement follows
+    function_name = None  # forbidden function name, rejected if a '(' follows
+
+    pos = 0
+    length = len(query)
+    while pos < length:
+        match = _TOKEN_RE.match(query, pos)
+        if match is None:
+            return False, f"SQL query contains an unexpected character: {query[pos]!r}."
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group()
+
+        if kind == "space" or kind == "comment":
+            continue
+        if kind == "unterminated":
+            return False, "SQL query contains an unterminated string, identifier or comment."
+
+        if ended:
+            if kind == "semicolon":
+                continue
+            return False, "SQL query contains multiple statements. Only a single query is allowed."
+
+        if function_name is not None:
+            if text == "(":
+                return False, f"SQL query calls forbidden function: {function_name}."
+            function_name = None
+
+        if kind == "semicolon":
+            ended = True
+        elif kind == "word":
+            word = text.upper()
+            if statement_type is None:
+                if word not in ALLOWED_STATEMENTS:
+                    return False, f"Only SELECT queries are allowed, not {word} statements."
+                statement_type = word
+                main_pending = word == "WITH"
+            elif after_cte and word != "AS":
+                # The statement the CTEs feed, e.g. WITH x AS (...) INSERT INTO ...
+                if word in FORBIDDEN_KEYWORDS:
+                    return False, f"SQL query contains forbidden keyword: {word}. Only read-only queries are allowed."
+                if word not in ALLOWED_STATEMENTS:
+                    return False, f"Only SELECT queries are allowed, not {word} statements."
+                main_pending = False
+            elif word in FORBIDDEN_FUNCTIONS:
+                # Also a harmless column name; decide once the next token is known
+                function_name = word
+        elif statement_type is None:
+            return False, "SQL query must start with SELECT or WITH."
+        elif text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        after_cte = main_pending and depth == 0 and text == ")"
+
+    if statement_type is None:
+        return False, "SQL query is empty."
     return True, ""
+
+
+# Introspection pragmas the schema catalog and change detection rely on
+_READ_ONLY_PRAGMAS = {
+    "table_info", "table_xinfo", "foreign_key_list", "index_list", "index_info", "index_xinfo",
+    "schema_version", "data_version",
+}
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_RECURSIVE}
+
+
+def read_only_authorizer(action: int, arg1, arg2, db_name, trigger) -> int:
+    """
+    sqlite3 authorizer callback that denies, at statement-prepare time, anything
+    but reads, a few introspection pragmas and non-filesystem functions. This
+    holds even for SQL that somehow got past `validate_sql_safety`.
+    """
+    if action in _ALLOWED_ACTIONS:
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_FUNCTION:
+        return sqlite3.SQLITE_DENY if arg2 and arg2.upper() in FORBIDDEN_FUNCTIONS else sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_PRAGMA and arg1 and arg1.lower() in _READ_ONLY_PRAGMAS:
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_UPDATE and arg1 in ("sqlite_master", "sqlite_schema") and db_name == "main":
+        # Reported while pragma table-valued functions load the schema; the file is opened read-only anyway
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
@@ -0,0 +1,67 @@
+"""
+Throughput of /api/batch versus sending the same questions one at a time.
+
+Runs a report-style question list (with repeats) against a fake LLM with a
+fixed per-call latency, first sequentially and then through `run_batch`.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db ANSWER_CACHE_ENABLED=false python -m benchmarks.bench_batch --questions 48
+"""
+import argparse
+import asyncio
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import install_fake_client
+from app.graph.graph import build_workflow
+from app.services import batch
+
+TEMPLATES = [
+    "Show total revenue by billing country ({n})",
+    "Top customers by invoice total ({n})",
+    "How many tracks are in each genre? ({n})",
+    "Monthly invoice totals ({n})",
+]
+
+
+async def run(count: int, latency: float, concurrency: int):
+    client = install_fake_client(latency=latency, token_delay=0.0)
+    graph = build_workflow().compile(checkpointer=MemorySaver())
+    # Every 4th question repeats an earlier one, as nightly reports tend to
+    questions = [TEMPLATES[i % len(TEMPLATES)].format(n=i // len(TEMPLATES) if i % 4 else 0) for i in range(count)]
+
+    client.calls.clear()
+    start = time.perf_counter()
+    for i, question in enumerate(questions):
+        await batch.answer_question(graph, question, f"seq-{i}")
+    sequential = time.perf_counter() - start
+    sequential_calls = len(client.calls)
+
+    batch.BATCH_MAX_CONCURRENCY = concurrency
+    batch._slots = None
+    client.calls.clear()
+    start = time.perf_counter()
+    first = None
+    async for _ in batch.run_batch(graph, questions):
+        first = first or time.perf_counter() - start
+    batched = time.perf_counter() - start
+
+    print(f"sequential: {sequential:6.2f} s  {count / sequential:6.1f} q/s  LLM calls {sequential_calls}")
+    print(
+        f"batch x{concurrency:<3}: {batched:6.2f} s  {count / batched:6.1f} q/s  LLM calls {len(client.calls)}  "
+        f"first result after {first * 1000:.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=48)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake LLM latency per call (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.questions, args.latency, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Latency and LLM-fallback rate of the rule-based chart planner.
+
+Runs typical Chinook questions with their SQL, then times `plan_chart` on the
+result profiles and reports which ones would still go to the LLM planner.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db python -m benchmarks.bench_chart_planner
+"""
+import argparse
+import asyncio
+import time
+
+from app.tools.charts import plan_chart
+from app.tools.digest import profile_result
+from app.tools.results import execute_query_result
+
+CASES = [
+    ("How many tracks are there?", "SELECT COUNT(*) AS tracks FROM Track"),
+    ("Show total revenue by billing country", "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry ORDER BY Revenue DESC"),
+    ("Plot the number of tracks per genre", "SELECT g.Name, COUNT(*) AS Tracks FROM Track t JOIN Genre g ON g.GenreId = t.GenreId GROUP BY g.Name"),
+    ("Monthly sales trend", "SELECT strftime('%Y-%m', InvoiceDate) AS Month, SUM(Total) AS Sales FROM Invoice GROUP BY Month ORDER BY Month"),
+    ("Share of tracks by media type as a pie", "SELECT m.Name, COUNT(*) AS Tracks FROM Track t JOIN MediaType m ON m.MediaTypeId = t.MediaTypeId GROUP BY m.Name"),
+    ("List the names of all artists", "SELECT Name FROM Artist"),
+    ("Is track length correlated with file size?", "SELECT Milliseconds, Bytes FROM Track LIMIT 200"),
+    ("Customer details for customer 5", "SELECT * FROM Customer WHERE CustomerId = 5"),
+    ("Revenue per customer", "SELECT CustomerId, SUM(Total) AS Revenue FROM Invoice GROUP BY CustomerId"),
+    ("Track count and average length per album", "SELECT AlbumId, COUNT(*) AS Tracks, AVG(Milliseconds) AS AvgMs, SUM(Bytes) AS Bytes FROM Track GROUP BY AlbumId"),
+]
+
+
+async def run(repeats: int):
+    fallbacks = 0
+    for question, sql in CASES:
+        result = await execute_query_result(sql)
+        profile = profile_result(result)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            plan = plan_chart(question, profile, result["row_count"])
+        elapsed_us = (time.perf_counter() - start) / repeats * 1e6
+
+        if plan is None:
+            fallbacks += 1
+            decision = "-> LLM fallback"
+        elif plan.needs_visualization:
+            decision = f"chart: {plan.visualization_type}"
+        else:
+            decision = "no chart"
+        print(f"{elapsed_us:7.1f} us  {result['row_count']:>5} rows  {decision:<16} {question}")
+
+    print(f"\nLLM fallback rate: {fallbacks}/{len(CASES)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=1000, help="plan_chart calls per case")
+    args = parser.parse_args()
+    asyncio.run(run(args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Memory and throughput of the SQLite checkpointer vs the in-memory MemorySaver.
+
+Drives many threads through several turns each (fake LLM, no latency) with a
+large result set, then reports turns/sec and the Python heap still held by
+checkpoints afterwards.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db python -m benchmarks.bench_checkpointer --threads 50 --turns 5
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_llm import install_fake_client
+from app.graph.checkpointer import SqliteCheckpointSaver
+from app.graph.graph import build_workflow
+from langgraph.checkpoint.memory import MemorySaver
+
+LARGE_SQL = "SELECT * FROM Track"
+
+
+async def drive(graph, threads: int, turns: int) -> float:
+    start = time.perf_counter()
+    for turn in range(turns):
+        await asyncio.gather(*[
+            graph.ainvoke({"user_query": f"list all tracks ({turn})"}, config={"configurable": {"thread_id": f"bench-{t}"}})
+            for t in range(threads)
+        ])
+    return threads * turns / (time.perf_counter() - start)
+
+
+async def measure(name: str, saver, threads: int, turns: int):
+    graph = build_workflow().compile(checkpointer=saver)
+    await drive(graph, 1, 1)  # warm-up: imports, pools, schema catalog
+    gc.collect()
+    tracemalloc.start()
+    throughput = await drive(graph, threads, turns)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>8}: {throughput:7.1f} turns/s | retained heap {current / 2**20:7.1f} MiB | peak {peak / 2**20:7.1f} MiB")
+    return saver
+
+
+async def run(threads: int, turns: int):
+    install_fake_client(latency=0, token_delay=0, sql=LARGE_SQL, record_calls=False)
+    await measure("memory", MemorySaver(), threads, turns)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        saver = await measure("sqlite", SqliteCheckpointSaver(path=path), threads, turns)
+        saver.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"{'':>8}  on-disk size {os.path.getsize(path) / 2**20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.threads, args.turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Latency of large aggregate queries on SQLite versus the DuckDB mirror, and where each query is routed.
+
+Builds the DuckDB mirror of the database, then runs each query `--repeats`
+times on both engines and checks they return the same rows (floats
+compared to 6 significant digits). Run it on a scaled copy of the sample
+database (see `scale_db`): on the original, every table is below
+DUCKDB_MIN_ROWS and everything stays on SQLite. `--refresh` also commits
+one row (removed again afterwards) to show queries going back to SQLite
+until the mirror has caught up with the new data_version.
+
+    cd backend
+    python -m benchmarks.scale_db --source app/data/chinook.db --dest app/data/chinook_x100.db --factor 100
+    SQL_AGENT_DB_PATH=app/data/chinook_x100.db SQL_ANALYTIC_ENGINE=duckdb python -m benchmarks.bench_engines
+"""
+import argparse
+import sqlite3
+import statistics
+import time
+
+from app.tools import engines
+from app.tools.sql import DB_PATH
+
+QUERIES = [
+    (
+        "revenue by country",
+        "SELECT c.Country, SUM(il.UnitPrice * il.Quantity) AS Revenue, COUNT(DISTINCT i.InvoiceId) AS Invoices "
+        "FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId JOIN InvoiceLine il ON il.InvoiceId = i.InvoiceId "
+        "GROUP BY c.Country ORDER BY Revenue DESC",
+    ),
+    (
+        "top genres",
+        "SELECT g.Name, SUM(il.UnitPrice * il.Quantity) AS Revenue FROM InvoiceLine il "
+        "JOIN Track t ON t.TrackId = il.TrackId JOIN Genre g ON g.GenreId = t.GenreId "
+        "GROUP BY g.Name ORDER BY Revenue DESC LIMIT 5",
+    ),
+    (
+        "revenue by year",
+        "SELECT substr(i.InvoiceDate, 1, 4) AS Year, SUM(il.UnitPrice * il.Quantity) AS Revenue, COUNT(*) AS Lines "
+        "FROM Invoice i JOIN InvoiceLine il ON il.InvoiceId = i.InvoiceId GROUP BY Year ORDER BY Year",
+    ),
+    (
+        "tracks per customer",
+        "SELECT i.CustomerId, COUNT(DISTINCT il.TrackId) AS Tracks, MAX(i.Total) AS Largest FROM Invoice i "
+        "JOIN InvoiceLine il ON il.InvoiceId = i.InvoiceId GROUP BY i.CustomerId ORDER BY Tracks DESC LIMIT 10",
+    ),
+    (
+        "strftime (SQLite only)",
+        "SELECT strftime('%Y', InvoiceDate) AS Year, SUM(Total) FROM Invoice GROUP BY Year",
+    ),
+    ("no aggregate", "SELECT Name, Milliseconds FROM Track ORDER BY Milliseconds DESC LIMIT 5"),
+]
+
+
+def normalized(rows):
+    return sorted(
+        tuple(float(f"{v:.6g}") if isinstance(v, float) else v for v in row) for row in rows
+    )
+
+
+def median_ms(engine, query: str, repeats: int):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _, rows, _ = engine.fetch_rows(query)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, rows
+
+
+def show_refresh(duckdb_engine, query: str):
+    """Commits a row from another connection and times how long queries stay on SQLite."""
+    writer = sqlite3.connect(DB_PATH)
+    try:
+        line_id = writer.execute("SELECT MAX(InvoiceLineId) + 1 FROM InvoiceLine").fetchone()[0]
+        writer.execute(
+            "INSERT INTO InvoiceLine (InvoiceLineId, InvoiceId, TrackId, UnitPrice, Quantity) "
+            "SELECT ?, InvoiceId, TrackId, 1000, 1 FROM InvoiceLine LIMIT 1",
+            (line_id,),
+        )
+        writer.commit()
+        committed = time.perf_counter()
+        print(f"\ncommitted InvoiceLine {line_id}: next query runs on {engines.engine_for(query).name}")
+        while engines.engine_for(query) is not duckdb_engine:
+            time.sleep(0.05)
+        print(f"mirror caught up after {time.perf_counter() - committed:.2f}s")
+        agree = normalized(engines._sqlite.fetch_rows(query)[1]) == normalized(duckdb_engine.fetch_rows(query)[1])
+        print(f"results agree with the new row: {agree}")
+    finally:
+        writer.execute("DELETE FROM InvoiceLine WHERE InvoiceLineId = ?", (line_id,))
+        writer.commit()
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--refresh", action="store_true", help="commit (and remove) a row to show the mirror refresh")
+    args = parser.parse_args()
+
+    engines.SQL_ANALYTIC_ENGINE = "duckdb"
+    duckdb_engine = engines.get_analytic_engine()
+    if duckdb_engine is None:
+        raise SystemExit("the duckdb package is not installed")
+    start = time.perf_counter()
+    duckdb_engine.refresh()
+    print(f"mirror of {DB_PATH.name} built in {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'query':<24} {'routed to':<9} {'sqlite ms':>10} {'duckdb ms':>10} {'speedup':>8}  same rows")
+    for label, query in QUERIES:
+        routed = engines.engine_for(query).name
+        sqlite_ms, sqlite_rows = median_ms(engines._sqlite, query, args.repeats)
+        if routed != duckdb_engine.name:
+            print(f"{label:<24} {routed:<9} {sqlite_ms:10.1f} {'-':>10} {'-':>8}  -")
+            continue
+        duckdb_ms, duckdb_rows = median_ms(duckdb_engine, query, args.repeats)
+        same = normalized(sqlite_rows) == normalized(duckdb_rows)
+        print(f"{label:<24} {routed:<9} {sqlite_ms:10.1f} {duckdb_ms:10.1f} {sqlite_ms / duckdb_ms:7.1f}x  {same}")
+
+    if args.refresh:
+        show_refresh(duckdb_engine, QUERIES[0][1])
+
+
+if __name__ == "__main__":
+    main()
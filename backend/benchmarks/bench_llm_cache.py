@@ -0,0 +1,85 @@
+"""
+LLM calls and latency for repeated questions with the LLM response cache: cold, warm, after a restart.
+
+Asks `--questions` distinct questions three times on a fake LLM with a
+fixed per-call latency (answer cache off, so the whole graph runs each
+time): with an empty response cache, again with the in-memory tier warm,
+and once more with a fresh process-like cache that only has the SQLite
+tier. Deterministic calls (temperature=0) are served from the cache;
+the streamed answer is replayed chunk by chunk.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db ANSWER_CACHE_ENABLED=false python -m benchmarks.bench_llm_cache
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import install_fake_client
+from app.graph.graph import build_workflow
+from app.services import llm_cache
+from app.services.llm import LLM_MODEL_TIERS
+
+TEMPLATES = [
+    "Show total revenue by billing country for invoice {n}",
+    "Top customers by invoice total {n}",
+    "How many tracks are in each genre? {n}",
+    "Monthly invoice totals {n}",
+]
+
+
+async def ask(graph, question: str, thread_id: str):
+    """Returns (seconds, streamed tokens received)."""
+    tokens = 0
+    start = time.perf_counter()
+    config = {"configurable": {"thread_id": thread_id}}
+    async for mode, _ in graph.astream({"user_query": question}, config=config, stream_mode=["updates", "custom"]):
+        tokens += mode == "custom"
+    return time.perf_counter() - start, tokens
+
+
+def lookups():
+    return {
+        result: sum(llm_cache.llm_cache_lookups.value(model=m, result=result) for m in LLM_MODEL_TIERS.values())
+        for result in ("hit", "disk_hit", "miss")
+    }
+
+
+async def run(args):
+    client = install_fake_client(latency=args.latency, token_delay=args.token_delay, response_cache=True)
+    graph = build_workflow().compile(checkpointer=MemorySaver())
+    questions = [TEMPLATES[i % len(TEMPLATES)].format(n=i) for i in range(args.questions)]
+    path = os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite")
+    llm_cache._llm_cache = llm_cache.LLMResponseCache(path=path)
+
+    for label in ("cold", "warm memory", "restart (disk)"):
+        if label.startswith("restart"):
+            llm_cache._llm_cache = llm_cache.LLMResponseCache(path=path)
+        client.calls.clear()
+        before = lookups()
+        results = [await ask(graph, q, f"{label}-{i}") for i, q in enumerate(questions)]
+        seconds = [r[0] for r in results]
+        counts = {k: v - before[k] for k, v in lookups().items()}
+        print(
+            f"{label:<15} LLM calls {len(client.calls):3d}  p50 {statistics.median(seconds) * 1000:5.0f} ms  "
+            f"mean {statistics.mean(seconds) * 1000:5.0f} ms  tokens per answer {min(r[1] for r in results)}  "
+            f"cache hits {counts['hit']:.0f} memory / {counts['disk_hit']:.0f} disk, {counts['miss']:.0f} misses"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM latency per call (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="fake LLM delay between streamed chunks (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+End-to-end latency with and without the LLM gateway's model tiers and hedging.
+
+Answers the same questions through the graph three times against a fake LLM
+whose strong model is slower than its fast one and whose calls occasionally
+hit a slow tail: with every node on the strong model (gateway off), with
+per-task model tiers, and with tiers plus hedged requests.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db ANSWER_CACHE_ENABLED=false python -m benchmarks.bench_llm_gateway
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import install_fake_client
+from app.graph.graph import build_workflow
+from app.services import batch, llm
+
+QUESTIONS = [
+    "Show total revenue by billing country",
+    "Top customers by invoice total",
+    "How many tracks are in each genre?",
+    "Monthly invoice totals",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def hedge_count() -> float:
+    return sum(llm.gateway_events.value(task=task, event="hedged") for task in llm.TASK_TIERS)
+
+
+async def run_config(label: str, args, gateway: bool, hedge: bool):
+    llm.LLM_GATEWAY_ENABLED = gateway
+    llm.LLM_HEDGE_ENABLED = hedge
+    client = install_fake_client(
+        latency=args.strong_latency,
+        token_delay=0.0,
+        model_latency={llm.LLM_MODEL_TIERS["fast"]: args.fast_latency, llm.LLM_MODEL_TIERS["strong"]: args.strong_latency},
+        tail_probability=args.tail_probability,
+        tail_factor=args.tail_factor,
+    )
+    graph = build_workflow().compile(checkpointer=MemorySaver())
+    slots = asyncio.Semaphore(args.concurrency)
+    hedged_before = hedge_count()
+
+    async def one(i: int) -> float:
+        async with slots:
+            start = time.perf_counter()
+            await batch.answer_question(graph, QUESTIONS[i % len(QUESTIONS)], f"{label}-{i}")
+            return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(one(i) for i in range(args.questions)))
+    models = Counter(call.get("model") for call in client.calls)
+    hedged = hedge_count() - hedged_before
+    print(
+        f"{label:<16} p50 {percentile(latencies, 50) * 1000:6.0f} ms  p95 {percentile(latencies, 95) * 1000:6.0f} ms  "
+        f"calls {dict(models)}  hedged {hedged:.0f}"
+    )
+
+
+async def run(args):
+    await run_config("all strong", args, gateway=False, hedge=False)
+    await run_config("tiers", args, gateway=True, hedge=False)
+    await run_config("tiers + hedging", args, gateway=True, hedge=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=80)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--strong-latency", type=float, default=0.2, help="fake latency of the strong model (s)")
+    parser.add_argument("--fast-latency", type=float, default=0.06, help="fake latency of the fast model (s)")
+    parser.add_argument("--tail-probability", type=float, default=0.05, help="share of calls that hit the slow tail")
+    parser.add_argument("--tail-factor", type=float, default=8.0, help="slowdown of tail calls")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
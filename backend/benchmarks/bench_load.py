@@ -0,0 +1,236 @@
+"""
+Load test of /api/chat against the fake LLM server, at fixed concurrency.
+
+Starts `benchmarks.fake_llm_server` and the API (uvicorn) as subprocesses,
+with the API pointed at the fake through OPENAI_BASE_URL, then sends
+`--requests` chat requests with at most `--concurrency` in flight. Reports
+end-to-end latency and time-to-first-token percentiles, requests/sec, and
+the API process's RSS growth. `--max-p95-ms` / `--max-errors` make it exit
+non-zero on a regression, for CI-style runs. Use `benchmarks.scale_db` to
+build a larger database for `--db`.
+
+    cd backend
+    python -m benchmarks.bench_load --db app/data/chinook.db --requests 200 --concurrency 16
+    python -m benchmarks.bench_load --db app/data/chinook_x100.db --json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+QUESTIONS = [
+    "Show total revenue by billing country",
+    "Top customers by invoice total",
+    "How many tracks are in each genre?",
+    "Monthly invoice totals for 2012",
+    "Which employees support the most customers?",
+    "Average invoice total per customer country",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{process.args} exited with code {process.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f} s")
+
+
+async def chat_once(client: httpx.AsyncClient, question: str, thread_id: str) -> Dict[str, Optional[float]]:
+    """Sends one chat request; returns its latency, TTFT and whether it ended cleanly."""
+    start = time.perf_counter()
+    first_token = None
+    ok = False
+    try:
+        async with client.stream("POST", "/api/chat", json={"message": question, "thread_id": thread_id}) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if event["type"] == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+                elif event["type"] == "end":
+                    ok = response.status_code == 200
+                elif event["type"] == "error":
+                    break
+    except httpx.HTTPError:
+        pass
+    return {"latency": time.perf_counter() - start, "ttft": first_token, "ok": ok}
+
+
+async def drive(base_url: str, requests: int, concurrency: int, offset: int = 0) -> List[Dict[str, Optional[float]]]:
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+
+        async def one(i: int):
+            async with slots:
+                return await chat_once(client, QUESTIONS[i % len(QUESTIONS)], f"load-{offset + i}")
+
+        return await asyncio.gather(*(one(i) for i in range(requests)))
+
+
+async def sample_rss(pid: int, peak: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        value = rss_mb(pid)
+        if value is not None:
+            peak[0] = max(peak[0], value)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args) -> Dict[str, object]:
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    llm_port, api_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "fake"),
+        "SQL_AGENT_DB_PATH": os.path.abspath(args.db),
+        "ANSWER_CACHE_ENABLED": "true" if args.answer_cache else "false",
+        "ANSWER_CACHE_PATH": os.path.join(workdir, "answer_cache.sqlite"),
+        "LLM_CACHE_ENABLED": "true" if args.llm_cache else "false",
+        "CHECKPOINT_DB_PATH": os.path.join(workdir, "checkpoints.sqlite"),
+        "LOG_LEVEL": "WARNING",
+    }
+    log = open(os.path.join(workdir, "server.log"), "w")
+    llm = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm_server", "--port", str(llm_port),
+         "--latency", str(args.latency), "--token-delay", str(args.token_delay)],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port), "--log-level", "warning"],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{api_port}"
+    try:
+        await wait_ready(f"http://127.0.0.1:{llm_port}/health", llm)
+        await wait_ready(f"{base_url}/health", api)
+
+        if args.warmup:
+            await drive(base_url, args.warmup, args.concurrency, offset=args.requests)
+        rss_start = rss_mb(api.pid)
+        peak = [rss_start or 0.0]
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_rss(api.pid, peak, stop))
+
+        start = time.perf_counter()
+        results = await drive(base_url, args.requests, args.concurrency)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await sampler
+        rss_end = rss_mb(api.pid)
+    except BaseException:
+        log.flush()
+        with open(log.name) as f:
+            sys.stderr.write(f.read()[-4000:])
+        raise
+    finally:
+        for process in (api, llm):
+            process.terminate()
+        for process in (api, llm):
+            process.wait()
+        log.close()
+
+    latencies = [r["latency"] * 1000 for r in results if r["ok"]]
+    ttfts = [r["ttft"] * 1000 for r in results if r["ok"] and r["ttft"] is not None]
+    summary: Dict[str, object] = {
+        "db": args.db,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": sum(not r["ok"] for r in results),
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(args.requests / elapsed, 2),
+        "rss_start_mb": rss_start and round(rss_start, 1),
+        "rss_end_mb": rss_end and round(rss_end, 1),
+        "rss_peak_mb": round(peak[0], 1),
+        "rss_growth_mb": round(rss_end - rss_start, 1) if rss_start and rss_end else None,
+    }
+    for name, values in (("latency", latencies), ("ttft", ttfts)):
+        for pct in (50, 95, 99):
+            value = percentile(values, pct)
+            summary[f"{name}_p{pct}_ms"] = value and round(value, 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", default=os.getenv("SQL_AGENT_DB_PATH", "app/data/chinook.db"))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=8, help="unmeasured requests sent first")
+    parser.add_argument("--latency", type=float, default=0.1, help="fake LLM latency per call (s)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="fake LLM delay between streamed chunks (s)")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the answer cache on")
+    parser.add_argument("--llm-cache", action="store_true", help="leave the LLM response cache on")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--max-p95-ms", type=float, help="exit non-zero if p95 latency exceeds this")
+    parser.add_argument("--max-errors", type=int, default=0, help="exit non-zero above this many failed requests")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"{summary['requests']} requests x{summary['concurrency']} against {summary['db']}: "
+              f"{summary['rps']} req/s, {summary['errors']} errors")
+        print(f"latency ms  p50 {summary['latency_p50_ms']}  p95 {summary['latency_p95_ms']}  p99 {summary['latency_p99_ms']}")
+        print(f"TTFT ms     p50 {summary['ttft_p50_ms']}  p95 {summary['ttft_p95_ms']}  p99 {summary['ttft_p99_ms']}")
+        print(f"RSS MB      start {summary['rss_start_mb']}  end {summary['rss_end_mb']}  "
+              f"peak {summary['rss_peak_mb']}  growth {summary['rss_growth_mb']}")
+
+    failed = summary["errors"] > args.max_errors
+    p95 = summary["latency_p95_ms"]
+    if args.max_p95_ms is not None and (p95 is None or p95 > args.max_p95_ms):
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Schema tokens sent to the SQL generator: raw DDL versus the compact renderer.
+
+For each Chinook question, renders its tables as CREATE statements, as the
+compact `Table(col:type, ...)` form, and as the compact form pruned to the
+question, and estimates the tokens of each. Also checks that the columns
+each question needs are still spelled out after pruning (a pruned column is
+only listed by name), and times rendering cold versus from the fragment memo.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db python -m benchmarks.bench_schema_prompt
+"""
+import argparse
+import time
+
+from app.tools import schema
+from app.tools.catalog import get_schema_catalog
+from app.tools.digest import estimate_tokens
+
+# (question, tables the generator gets, columns the answer needs)
+QUESTIONS = [
+    ("Show total revenue by billing country", ["Invoice"], {"Invoice.BillingCountry", "Invoice.Total"}),
+    ("How many tracks are in each genre?", ["Track", "Genre"], {"Track.GenreId", "Genre.Name"}),
+    ("Top 10 customers by invoice total", ["Customer", "Invoice"],
+     {"Customer.FirstName", "Customer.LastName", "Invoice.Total"}),
+    ("Which employees support the most customers?", ["Employee", "Customer"],
+     {"Employee.FirstName", "Employee.LastName", "Customer.SupportRepId"}),
+    ("Top artists by number of albums", ["Artist", "Album"], {"Artist.Name", "Album.ArtistId"}),
+    ("Which playlists contain the most tracks?", ["Playlist", "PlaylistTrack"], {"Playlist.Name", "PlaylistTrack.TrackId"}),
+    ("Revenue per media type", ["MediaType", "Track", "InvoiceLine"],
+     {"MediaType.Name", "InvoiceLine.UnitPrice", "InvoiceLine.Quantity"}),
+    ("Best selling tracks by quantity sold", ["Track", "InvoiceLine"], {"Track.Name", "InvoiceLine.Quantity"}),
+    ("Average invoice total per customer country", ["Customer", "Invoice"], {"Customer.Country", "Invoice.Total"}),
+    ("Albums with the longest total track duration", ["Album", "Track"], {"Album.Title", "Track.Milliseconds"}),
+    ("Monthly invoice totals for 2012", ["Invoice"], {"Invoice.InvoiceDate", "Invoice.Total"}),
+    ("Which customers in the USA spent the most?", ["Customer", "Invoice"],
+     {"Customer.Country", "Customer.FirstName", "Invoice.Total"}),
+]
+
+
+def spelled_out(rendered: str, column: str) -> bool:
+    """True if `Table.column` appears with its type in the rendered schema, not just in a `+name` list."""
+    table, name = column.split(".")
+    line = next((l for l in rendered.splitlines() if l.startswith(f"{table}(")), "")
+    return f"{name}:" in line.split(" +")[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true", help="print each pruned schema")
+    args = parser.parse_args()
+
+    catalog = get_schema_catalog()
+    totals = {"ddl": 0, "compact": 0, "pruned": 0}
+    needed = kept = 0
+    for question, tables, columns in QUESTIONS:
+        features = schema.question_features(question)
+        ddl = catalog.schema_string(tables)
+        compact = schema.render_compact_schema(catalog, tables)
+        pruned = schema.render_compact_schema(catalog, tables, features)
+        for name, text in (("ddl", ddl), ("compact", compact), ("pruned", pruned)):
+            totals[name] += estimate_tokens(text)
+        needed += len(columns)
+        missing = sorted(c for c in columns if not spelled_out(pruned, c))
+        kept += len(columns) - len(missing)
+        if missing:
+            print(f"  only named after pruning: {missing} for {question!r}")
+        if args.verbose:
+            print(f"{question}\n{pruned}\n")
+
+    count = len(QUESTIONS)
+    print(f"schema tokens per generation over {count} questions (estimated, ~4 chars/token):")
+    for name in ("ddl", "compact", "pruned"):
+        print(f"  {name:<8} {totals[name] / count:6.0f}  ({totals['ddl'] / totals[name]:.2f}x smaller than DDL)")
+    print(f"columns the answers need that stay spelled out after pruning: {kept}/{needed}")
+
+    full_schema = catalog.schema_string()
+    print(
+        f"whole schema: {estimate_tokens(full_schema)} tokens as DDL vs "
+        f"{estimate_tokens(schema.render_compact_schema(catalog, catalog.table_names))} compact"
+    )
+
+    cold, warm = [], []
+    for _ in range(args.repeats):
+        for question, tables, _ in QUESTIONS:
+            schema._memo.clear()
+            t = time.perf_counter()
+            schema.render_compact_schema(catalog, tables, schema.question_features(question))
+            cold.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            schema.render_compact_schema(catalog, tables, schema.question_features(question))
+            warm.append(time.perf_counter() - t)
+    for label, timings in (("cold", cold), ("memoized", warm)):
+        timings.sort()
+        print(f"render {label:<9} p50 {timings[len(timings) // 2] * 1e6:5.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+LLM calls, SQL executions and latency for a burst of identical questions, with and without single-flight.
+
+Sends `--burst` copies of each of `--distinct` questions at once (separate
+threads, as when a dashboard opens for many users) through the graph on a
+fake LLM, first with every request doing its own work and then with
+identical in-flight LLM calls and SQL queries shared. Every request must
+still receive the whole streamed answer.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db ANSWER_CACHE_ENABLED=false python -m benchmarks.bench_single_flight
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import install_fake_client
+from app.graph.graph import build_workflow
+from app.services import single_flight
+from app.tools import engines
+
+QUESTIONS = [
+    "Show total revenue by billing country",
+    "Top customers by invoice total",
+    "How many tracks are in each genre?",
+    "Monthly invoice totals",
+]
+
+
+async def ask(graph, question: str, thread_id: str):
+    """Returns (seconds, streamed tokens received)."""
+    tokens = 0
+    start = time.perf_counter()
+    config = {"configurable": {"thread_id": thread_id}}
+    async for mode, _ in graph.astream({"user_query": question}, config=config, stream_mode=["updates", "custom"]):
+        tokens += mode == "custom"
+    return time.perf_counter() - start, tokens
+
+
+async def run(args):
+    executions = [0]
+    run_query = engines.run_query
+
+    def counted_run_query(*a, **kw):
+        executions[0] += 1
+        return run_query(*a, **kw)
+
+    engines.run_query = counted_run_query
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.distinct)]
+    for label, enabled in (("independent", False), ("single-flight", True)):
+        single_flight.SINGLE_FLIGHT_ENABLED = enabled
+        client = install_fake_client(latency=args.latency, token_delay=args.token_delay)
+        graph = build_workflow().compile(checkpointer=MemorySaver())
+        executions[0] = 0
+        results = await asyncio.gather(*(
+            ask(graph, question, f"{label}-{q}-{i}")
+            for q, question in enumerate(questions) for i in range(args.burst)
+        ))
+        seconds = sorted(r[0] for r in results)
+        tokens = {r[1] for r in results}
+        print(
+            f"{label:<14} {len(results)} requests  LLM calls {len(client.calls):4d}  SQL executions {executions[0]:3d}  "
+            f"p50 {statistics.median(seconds) * 1000:5.0f} ms  p95 {seconds[int(0.95 * (len(seconds) - 1))] * 1000:5.0f} ms  "
+            f"tokens per request {'/'.join(map(str, sorted(tokens)))}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--burst", type=int, default=32, help="concurrent copies of each question")
+    parser.add_argument("--distinct", type=int, default=2, help="distinct questions in the burst")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM latency per call (s)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="fake LLM delay between streamed chunks (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Time-to-first-SQL with the sequential, speculative (parallel) and fused front-ends.
+
+Runs the workflow against a fake LLM with a fixed per-call latency and
+measures how long it takes until `sql_generator` emits its update, plus the
+LLM calls and prompt characters each front-end spends.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db python -m benchmarks.bench_speculative_frontend --latency 0.4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import install_fake_client
+from app.graph.graph import build_workflow
+
+QUESTIONS = [
+    "Show total revenue by billing country",
+    "Top 10 customers by invoice total",
+    "How many tracks are in each genre?",
+    "hello there",
+]
+
+
+async def time_to_first_sql(graph, question: str, thread_id: str):
+    """Returns (seconds until SQL was generated or None, total seconds)."""
+    config = {"configurable": {"thread_id": thread_id}}
+    start = time.perf_counter()
+    first_sql = None
+    async for update in graph.astream({"user_query": question}, config=config, stream_mode="updates"):
+        if "sql_generator" in update and first_sql is None:
+            first_sql = time.perf_counter() - start
+    return first_sql, time.perf_counter() - start
+
+
+async def run(latency: float, repeats: int):
+    client = install_fake_client(latency=latency, token_delay=0.0)
+    for label, options in (
+        ("sequential", {"speculative": False, "fused": False}),
+        ("speculative", {"speculative": True, "fused": False}),
+        ("fused", {"speculative": False, "fused": True}),
+    ):
+        graph = build_workflow(**options).compile(checkpointer=MemorySaver())
+        client.calls.clear()
+        to_sql, totals = [], []
+        for r in range(repeats):
+            for i, question in enumerate(QUESTIONS):
+                first_sql, total = await time_to_first_sql(graph, question, f"{label}-{r}-{i}")
+                totals.append(total)
+                if first_sql is not None:
+                    to_sql.append(first_sql)
+        prompt_chars = sum(len(m["content"] or "") for call in client.calls for m in call["messages"])
+        print(
+            f"{label:>12}: time-to-first-SQL mean {statistics.mean(to_sql) * 1000:7.1f} ms | "
+            f"end-to-end mean {statistics.mean(totals) * 1000:7.1f} ms | "
+            f"LLM calls {len(client.calls)} | prompt chars {prompt_chars}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.4, help="Seconds per fake LLM call")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.latency, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
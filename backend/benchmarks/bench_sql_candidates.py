@@ -0,0 +1,108 @@
+"""
+Retry rate, LLM calls and latency of one generated query versus K parallel candidates.
+
+Each case scripts the fake LLM's temperature-0 query (correct, a syntax
+error, a cartesian join the cost guard rejects) and the query it returns
+when sampled at a higher temperature or asked to fix an error. "1 query"
+is the default path: generate, validate, execute, repair on failure.
+"K candidates" generates K queries at once, checks and prices them all
+locally, and keeps the cheapest valid one; "+ cross-check" also runs the
+valid ones and keeps the result most of them agree on.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db ANSWER_CACHE_ENABLED=false python -m benchmarks.bench_sql_candidates
+"""
+import argparse
+import asyncio
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import DEFAULT_SQL, install_fake_client
+from app.agents import sql_generator
+from app.graph.graph import build_workflow
+from app.tools import candidates
+
+JOIN_SQL = (
+    "SELECT c.Country, SUM(il.UnitPrice * il.Quantity) AS Revenue FROM Customer c "
+    "JOIN Invoice i ON i.CustomerId = c.CustomerId JOIN InvoiceLine il ON il.InvoiceId = i.InvoiceId GROUP BY c.Country"
+)
+# (label, question, temperature-0 query, query when sampled higher or repaired)
+CASES = [
+    ("correct", "Show total revenue by billing country", DEFAULT_SQL, DEFAULT_SQL),
+    (
+        "syntax error",
+        "Top 5 billing countries by invoice total",
+        "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry ORDER BY Revenue DESC LIMT 5",
+        "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry ORDER BY Revenue DESC LIMIT 5",
+    ),
+    (
+        "too expensive",
+        "Revenue by customer country from invoice lines",
+        "SELECT c.Country, SUM(il.UnitPrice) AS Revenue FROM Customer c, InvoiceLine il, Track t GROUP BY c.Country",
+        JOIN_SQL,
+    ),
+]
+
+
+def sql_calls(client):
+    return [c for c in client.calls if "SQLite" in c["messages"][0]["content"]]
+
+
+async def run_case(graph, question: str, thread_id: str):
+    """Returns seconds from the tables being selected to rows from the executor, or None if it never got rows."""
+    selected = None
+    config = {"configurable": {"thread_id": thread_id}}
+    async for update in graph.astream({"user_query": question}, config=config, stream_mode="updates"):
+        for node, state_update in update.items():
+            if node == "table_selector":
+                selected = time.perf_counter()
+            if node == "sql_executor" and isinstance(state_update, dict) and state_update.get("query_result"):
+                return time.perf_counter() - selected
+    return None
+
+
+async def run(args):
+    modes = [("1 query", 1, False), (f"{args.k} candidates", args.k, False), (f"{args.k} candidates + cross-check", args.k, True)]
+    for mode, k, cross_check in modes:
+        sql_generator.SQL_CANDIDATES = k
+        candidates.SQL_CANDIDATE_CROSS_CHECK = cross_check
+        graph = build_workflow().compile(checkpointer=MemorySaver())
+        print(mode)
+        totals = {"retried": 0, "seconds": 0.0, "calls": 0, "runs": 0}
+        for label, question, first, varied in CASES:
+            client = install_fake_client(latency=args.latency, token_delay=0.0, sql=first, repaired_sql=varied, varied_sql=varied)
+            answered = retried = 0
+            seconds = 0.0
+            for i in range(args.repeats):
+                client.calls.clear()
+                elapsed = await run_case(graph, question, f"{mode}-{label}-{i}")
+                answered += elapsed is not None
+                seconds += elapsed or 0.0
+                calls = sql_calls(client)
+                retried += any("Error:" in m["content"] for c in calls for m in c["messages"])
+                totals["calls"] += len(calls)
+            totals["retried"] += retried
+            totals["seconds"] += seconds
+            totals["runs"] += args.repeats
+            print(
+                f"  {label:<14} answered {answered}/{args.repeats}  needed an LLM retry {retried}/{args.repeats}  "
+                f"selected->rows {seconds / args.repeats * 1000:5.0f} ms"
+            )
+        print(
+            f"  {'average':<14} retry rate {totals['retried'] / totals['runs']:.2f}  SQL LLM calls per question "
+            f"{totals['calls'] / totals['runs']:.1f}  selected->rows {totals['seconds'] / totals['runs'] * 1000:.0f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--k", type=int, default=3, help="candidates per first attempt")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM latency per call (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
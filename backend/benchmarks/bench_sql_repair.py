@@ -0,0 +1,115 @@
+"""
+Retries and retry latency of failed SQL: regenerate from scratch versus repair.
+
+Each case makes the fake LLM's first query fail (a misspelt column, a column
+under the wrong alias, a misspelt table, a syntax error) and answers with
+the fixed query once the request quotes the error. "regenerate" is the
+previous behaviour: the error reaches the executor and the generator is
+rerun with the full prompt. "repair" compiles the query in the validator,
+fixes unknown identifiers against the catalog without an LLM call, and sends
+what is left to the repair node with a short fix-this-query prompt.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db ANSWER_CACHE_ENABLED=false python -m benchmarks.bench_sql_repair
+"""
+import argparse
+import asyncio
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import install_fake_client
+from app.graph.graph import build_workflow
+from app.tools import repair
+from app.tools.digest import estimate_tokens
+
+# (label, question, first query, fixed query)
+CASES = [
+    (
+        "misspelt column",
+        "Show total revenue by billing country from invoice",
+        "SELECT billing_country, SUM(Total) AS Revenue FROM Invoice GROUP BY billing_country ORDER BY Revenue DESC",
+        "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry ORDER BY Revenue DESC",
+    ),
+    (
+        "wrong alias",
+        "Revenue by customer country from each invoice",
+        "SELECT c.Country, SUM(c.Total) AS Revenue FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY c.Country",
+        "SELECT c.Country, SUM(i.Total) AS Revenue FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY c.Country",
+    ),
+    (
+        "misspelt table",
+        "How many track rows per genre?",
+        "SELECT g.Name, COUNT(*) AS Tracks FROM Tracks t JOIN Genre g ON g.GenreId = t.GenreId GROUP BY g.Name",
+        "SELECT g.Name, COUNT(*) AS Tracks FROM Track t JOIN Genre g ON g.GenreId = t.GenreId GROUP BY g.Name",
+    ),
+    (
+        "syntax error",
+        "Top 5 billing countries by invoice total",
+        "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry ORDER BY Revenue DESC LIMT 5",
+        "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice GROUP BY BillingCountry ORDER BY Revenue DESC LIMIT 5",
+    ),
+]
+
+
+def sql_calls(client):
+    return [c for c in client.calls if "SQLite" in c["messages"][0]["content"]]
+
+
+async def run_case(graph, question: str, thread_id: str):
+    """Returns (answered, seconds from the first generated query to a successful execution)."""
+    generated = finished = None
+    config = {"configurable": {"thread_id": thread_id}}
+    async for update in graph.astream({"user_query": question}, config=config, stream_mode="updates"):
+        for node, state_update in update.items():
+            if node == "sql_generator" and generated is None:
+                generated = time.perf_counter()
+            if node == "sql_executor" and isinstance(state_update, dict) and state_update.get("query_result"):
+                finished = time.perf_counter()
+    return finished is not None, (finished - generated) if finished and generated else None
+
+
+async def run(args):
+    for mode, enabled in (("regenerate", False), ("repair", True)):
+        repair.SQL_PRECHECK_ENABLED = enabled
+        graph = build_workflow(repair=enabled).compile(checkpointer=MemorySaver())
+        print(mode)
+        totals = {"retries": 0, "seconds": 0.0, "runs": 0}
+        for label, question, first, fixed in CASES:
+            client = install_fake_client(latency=args.latency, token_delay=0.0, sql=first, repaired_sql=fixed)
+            answered = 0
+            seconds = 0.0
+            for i in range(args.repeats):
+                ok, elapsed = await run_case(graph, question, f"{mode}-{label}-{i}")
+                answered += ok
+                seconds += elapsed or 0.0
+            calls = sql_calls(client)
+            retries = len(calls) / args.repeats - 1
+            retry_prompts = [c for c in calls if any("Error:" in m["content"] for m in c["messages"])]
+            retry_tokens = (
+                sum(estimate_tokens(" ".join(m["content"] for m in c["messages"])) for c in retry_prompts) / len(retry_prompts)
+                if retry_prompts else 0
+            )
+            totals["retries"] += retries
+            totals["seconds"] += seconds
+            totals["runs"] += args.repeats
+            print(
+                f"  {label:<16} answered {answered}/{args.repeats}  LLM retries {retries:.1f}  "
+                f"retry prompt ~{retry_tokens:.0f} tokens  generated->rows {seconds / args.repeats * 1000:5.0f} ms"
+            )
+        print(
+            f"  {'average':<16} LLM retries {totals['retries'] / len(CASES):.2f}  "
+            f"generated->rows {totals['seconds'] / totals['runs'] * 1000:.0f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM latency per call (s)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Frames, bytes, frames/sec and server CPU per chat stream, per SSE encoding.
+
+Serves a replayed chat event stream (node updates, one carrying a query
+result, then `--tokens` answer tokens `--token-delay` apart) from a uvicorn
+subprocess, and reads `--streams` of them concurrently over HTTP for each
+encoding: the previous one frame per token with `json.dumps`, one frame per
+token with the fast serializer, coalesced tokens, and coalesced tokens with
+gzipped result payloads. Server CPU comes from /proc (Linux only).
+
+    cd backend
+    python -m benchmarks.bench_sse --streams 50 --tokens 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.api import sse
+from benchmarks.bench_load import free_port, wait_ready
+
+TOKENS = ["The ", "USA ", "leads ", "total ", "revenue ", "with ", "523.06, ", "followed ", "by ", "Canada."]
+MODES = {
+    # label: (coalesce, gzip)
+    "per token, json": None,
+    "per token, fast json": (False, False),
+    "coalesced": (True, False),
+    "coalesced + gzip": (True, True),
+}
+
+
+def result_rows(count: int):
+    return {
+        "result_id": "bench",
+        "columns": ["BillingCountry", "Revenue", "Invoices"],
+        "rows": [[f"Country {i}", round(1000 / (i + 1), 2), i * 7] for i in range(count)],
+        "row_count": count,
+        "truncated": False,
+    }
+
+
+async def chat_events(tokens: int, token_delay: float, rows: int):
+    yield {"type": "start", "data": "Workflow started"}
+    for node in ("query_router", "query_rewriter", "table_selector"):
+        yield {"type": "node_update", "node": node}
+    yield {"type": "node_update", "node": "sql_generator", "sql": "SELECT BillingCountry, SUM(Total) FROM Invoice GROUP BY 1"}
+    yield {"type": "node_update", "node": "sql_executor", "data": result_rows(rows)}
+    for i in range(tokens):
+        yield {"type": "token", "content": TOKENS[i % len(TOKENS)]}
+        if token_delay:
+            await asyncio.sleep(token_delay)
+    yield {"type": "node_update", "node": "response_synthesizer", "response": "".join(TOKENS)}
+    yield {"type": "end", "data": "Workflow finished"}
+
+
+async def per_token_json(events):
+    """The previous encoding: one f-string frame per event."""
+    async for event in events:
+        yield f"data: {json.dumps(event)}\n\n"
+
+
+def create_app(args):
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stream/{mode}")
+    async def stream(mode: str):
+        events = chat_events(args.tokens, args.token_delay, args.rows)
+        if MODES[mode] is None:
+            return StreamingResponse(per_token_json(events), media_type="text/event-stream")
+        coalesce, gzipped = MODES[mode]
+        sse.SSE_GZIP_MIN_BYTES = args.gzip_min_bytes if gzipped else 0
+        window = args.window_ms if coalesce else 0
+        frames = sse.encode_events(events, window_ms=window, max_bytes=args.max_bytes)
+        return StreamingResponse(frames, media_type="text/event-stream")
+
+    return app
+
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process, from /proc/<pid>/stat."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def read_stream(client: httpx.AsyncClient, mode: str):
+    frames = size = 0
+    async with client.stream("GET", f"/stream/{mode}") as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                frames += 1
+                size += len(line) + 2
+    return frames, size
+
+
+async def drive(args, port: int, pid: int):
+    limits = httpx.Limits(max_connections=args.streams, max_keepalive_connections=args.streams)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+        for mode in MODES:
+            await read_stream(client, mode)  # warm up
+            cpu, wall = cpu_seconds(pid), time.perf_counter()
+            results = await asyncio.gather(*(read_stream(client, mode) for _ in range(args.streams)))
+            cpu, wall = cpu_seconds(pid) - cpu, time.perf_counter() - wall
+            frames = sum(r[0] for r in results) / args.streams
+            size = sum(r[1] for r in results) / args.streams
+            print(
+                f"{mode:<22} {frames:5.0f} frames  {size / 1024:6.1f} KiB  "
+                f"{frames / wall:5.0f} frames/s per stream  server CPU {cpu / args.streams * 1000:6.2f} ms/stream"
+            )
+    print(f"serializer: {'orjson' if sse.orjson is not None else 'json (orjson not installed)'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=50, help="concurrent streams per encoding")
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--token-delay", type=float, default=0.002, help="seconds between tokens")
+    parser.add_argument("--rows", type=int, default=500, help="rows in the query result update")
+    parser.add_argument("--window-ms", type=float, default=sse.SSE_COALESCE_MS)
+    parser.add_argument("--max-bytes", type=int, default=sse.SSE_COALESCE_BYTES)
+    parser.add_argument("--gzip-min-bytes", type=int, default=4096)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+
+        uvicorn.run(create_app(args), host="127.0.0.1", port=args.serve, log_level="warning")
+        return
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_sse", *sys.argv[1:], "--serve", str(port)])
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{port}/health", server))
+        asyncio.run(drive(args, port, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
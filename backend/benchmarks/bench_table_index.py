@@ -0,0 +1,115 @@
+"""
+Recall, candidate count and search latency of the table retrieval index.
+
+Pads the real schema with synthetic warehouse tables (fact/dim tables over
+many business domains, with foreign keys between them) up to `--tables`,
+builds the index, and checks that the tables each benchmark question needs
+are among the candidates sent to the LLM, versus offering the full table list.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db python -m benchmarks.bench_table_index --tables 500
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from app.tools.catalog import ColumnInfo, ForeignKeyInfo, SchemaCatalog, TableInfo, get_schema_catalog
+from app.tools.table_index import TABLE_INDEX_MAX_CANDIDATES, TABLE_INDEX_TOP_K, TableIndex
+
+# (question, tables it needs)
+QUESTIONS = [
+    ("Show total revenue by billing country", {"Invoice"}),
+    ("How many tracks are in each genre?", {"Track", "Genre"}),
+    ("Top 10 customers by invoice total", {"Customer", "Invoice"}),
+    ("Which employees support the most customers?", {"Employee", "Customer"}),
+    ("Top artists by number of albums", {"Artist", "Album"}),
+    ("Which playlists contain the most tracks?", {"Playlist", "PlaylistTrack"}),
+    ("Revenue per media type", {"MediaType", "Track", "InvoiceLine"}),
+    ("Best selling tracks by quantity sold", {"Track", "InvoiceLine"}),
+    ("Average invoice total per customer country", {"Customer", "Invoice"}),
+    ("Albums with the longest total track duration", {"Album", "Track"}),
+]
+
+DOMAINS = [
+    "shipment", "warehouse", "supplier", "purchase_order", "return", "payment", "ledger", "budget", "campaign",
+    "lead", "opportunity", "contract", "subscription", "ticket", "device", "session", "pageview", "coupon",
+    "store", "region", "product", "sku", "inventory", "carrier", "forecast", "vendor", "asset", "payroll",
+    "timesheet", "department", "project", "task", "survey", "review", "refund", "tax", "currency", "exchange_rate",
+]
+MEASURES = ["amount", "quantity", "cost", "weight", "duration_ms", "score", "discount", "margin"]
+ATTRIBUTES = ["name", "code", "status", "category", "description", "city", "created_at", "updated_at"]
+
+
+def synthetic_tables(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    tables = []
+    for i in range(count):
+        domain = DOMAINS[i % len(DOMAINS)]
+        kind = "fact" if i % 3 == 0 else "dim"
+        name = f"{kind}_{domain}_{i}"
+        columns = [ColumnInfo(name=f"{domain}_id", type="INTEGER", primary_key=True)]
+        columns += [ColumnInfo(name=a, type="TEXT") for a in rng.sample(ATTRIBUTES, 3)]
+        columns += [ColumnInfo(name=m, type="NUMERIC") for m in rng.sample(MEASURES, 2 if kind == "fact" else 0)]
+        foreign_keys = []
+        for other in rng.sample(tables, min(2, len(tables))) if kind == "fact" else []:
+            column = f"{other.name}_id"
+            columns.append(ColumnInfo(name=column, type="INTEGER"))
+            foreign_keys.append(ForeignKeyInfo(column=column, ref_table=other.name, ref_column=other.columns[0].name))
+        create_sql = f"CREATE TABLE {name} (" + ", ".join(f"{c.name} {c.type}" for c in columns) + ")"
+        tables.append(TableInfo(name=name, create_sql=create_sql, columns=columns, foreign_keys=foreign_keys))
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tables", type=int, default=500, help="total tables after padding the real schema")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    real = get_schema_catalog()
+    tables = {name: real.tables[name] for name in real.table_names}
+    for table in synthetic_tables(max(0, args.tables - len(tables))):
+        tables[table.name] = table
+    catalog = SchemaCatalog(tables, real.schema_version, real.data_version)
+    samples = {name: real.sample_values(name) for name in real.table_names}
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        index = TableIndex.build(catalog, samples, f"{directory}/index")
+        build = time.perf_counter() - start
+        print(f"{len(tables)} tables, {index.vectors.shape[1]} vectors x {index.vectors.shape[0]} dims, built in {build * 1000:.0f} ms")
+
+        hits = needed = candidates = 0
+        for question, gold in QUESTIONS:
+            found = index.candidates(question)
+            candidates += len(found)
+            needed += len(gold)
+            hits += len(gold & set(found))
+            missing = gold - set(found)
+            if missing:
+                print(f"  missed {sorted(missing)} for {question!r}")
+        print(
+            f"recall {hits}/{needed} with {candidates / len(QUESTIONS):.1f} candidates per question "
+            f"(top-{TABLE_INDEX_TOP_K} + FK neighbours, cap {TABLE_INDEX_MAX_CANDIDATES})"
+        )
+
+        timings = []
+        for _ in range(args.repeats):
+            for question, _ in QUESTIONS:
+                t = time.perf_counter()
+                index.candidates(question)
+                timings.append(time.perf_counter() - t)
+        timings.sort()
+        print(
+            f"retrieval p50 {timings[len(timings) // 2] * 1e6:.0f} us, "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} us"
+        )
+
+        full = len(", ".join(catalog.table_names))
+        offered = sum(len(", ".join(index.candidates(q))) for q, _ in QUESTIONS) / len(QUESTIONS)
+        print(f"table list in the selector prompt: {full} chars in full vs {offered:.0f} chars of candidates")
+
+
+if __name__ == "__main__":
+    main()
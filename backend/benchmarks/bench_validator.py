@@ -0,0 +1,118 @@
+"""
+Correctness and speed of the single-pass SQL validator.
+
+Checks `validate_sql_safety` against a corpus of queries that must pass or be
+rejected (the old per-keyword regex got several of them wrong), then times it
+against that regex implementation, and measures what the sqlite3 authorizer
+adds to query execution. Exits non-zero if any corpus case is misjudged.
+
+    cd backend
+    SQL_AGENT_DB_PATH=app/data/chinook.db python -m benchmarks.bench_validator
+"""
+import argparse
+import re
+import sys
+import time
+
+from app.tools.sql import get_db_connection
+from app.tools.validator import validate_sql_safety
+
+# (query, should_pass)
+CORPUS = [
+    ("SELECT * FROM Track", True),
+    ("SELECT Name FROM Track WHERE Name = 'Update';", True),
+    ("SELECT \"Delete\" AS flag FROM Track", True),
+    ("SELECT replace(Name, 'a', 'b') FROM Artist", True),
+    ("SELECT 1 -- DROP TABLE Track\n", True),
+    ("/* insert the header */ SELECT 1;;", True),
+    ("WITH top AS (SELECT CustomerId, SUM(Total) t FROM Invoice GROUP BY 1) SELECT * FROM top ORDER BY t DESC LIMIT 5", True),
+    ("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 10) SELECT x FROM n", True),
+    ("SELECT strftime('%Y-%m', InvoiceDate) AS month, SUM(Total) FROM Invoice GROUP BY month", True),
+    ("select g.Name, count(*) from Track t join Genre g on g.GenreId = t.GenreId group by g.Name", True),
+    ("SELECT * FROM Invoice WHERE BillingState IS NULL AND Total >= 1.5e1", True),
+    ("VALUES (1, 'a'), (2, 'b')", True),
+    ("SELECT 'x'';DROP TABLE Track;--' AS s", True),
+    ("DROP TABLE Track", False),
+    ("SELECT 1; DROP TABLE Track", False),
+    ("SELECT 1; SELECT 2", False),
+    ("DELETE FROM Track WHERE 1 = 1", False),
+    ("WITH x AS (SELECT 1) DELETE FROM Track", False),
+    ("WITH x AS (SELECT 1) INSERT INTO Genre(Name) SELECT 'x'", False),
+    ("INSERT OR REPLACE INTO Genre VALUES (1, 'x')", False),
+    ("REPLACE INTO Genre VALUES (1, 'x')", False),
+    ("PRAGMA writable_schema = ON", False),
+    ("ATTACH DATABASE '/tmp/evil.db' AS evil", False),
+    ("SELECT load_extension('/tmp/evil.so')", False),
+    ("SELECT writefile('/tmp/x', 'y')", False),
+    ("CREATE TEMP TABLE t AS SELECT * FROM Track", False),
+    ("BEGIN; UPDATE Track SET Name = 'x'; COMMIT", False),
+    ("VACUUM INTO '/tmp/copy.db'", False),
+    ("SELECT 'unterminated FROM Track", False),
+    ("SELECT 1 /* unterminated", False),
+    ("", False),
+]
+
+LEGACY_FORBIDDEN = ["DROP", "DELETE", "TRUNCATE", "UPDATE", "INSERT", "ALTER", "GRANT", "REVOKE"]
+
+
+def legacy_validate(query: str):
+    """The previous implementation: one regex search per keyword over the uppercased query."""
+    normalized = query.upper()
+    for keyword in LEGACY_FORBIDDEN:
+        if re.search(r"\b" + keyword + r"\b", normalized):
+            return False, keyword
+    return True, ""
+
+
+def check_corpus() -> int:
+    failures = 0
+    legacy_wrong = 0
+    for query, should_pass in CORPUS:
+        ok, message = validate_sql_safety(query)
+        legacy_wrong += legacy_validate(query)[0] != should_pass
+        if ok != should_pass:
+            failures += 1
+            print(f"MISJUDGED ({'passed' if ok else 'rejected'}): {query!r} {message}")
+    print(f"corpus: {len(CORPUS) - failures}/{len(CORPUS)} correct (legacy regex validator: {len(CORPUS) - legacy_wrong}/{len(CORPUS)})")
+    return failures
+
+
+def time_per_call(fn, queries, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (repeats * len(queries)) * 1e6
+
+
+def bench_validators(repeats: int):
+    queries = [q for q, _ in CORPUS]
+    print(f"validate_sql_safety: {time_per_call(validate_sql_safety, queries, repeats):6.1f} us/query")
+    print(f"legacy regex:        {time_per_call(legacy_validate, queries, repeats):6.1f} us/query")
+
+
+def bench_authorizer(repeats: int):
+    sql = "SELECT g.Name, COUNT(*) FROM Track t JOIN Genre g ON g.GenreId = t.GenreId GROUP BY g.Name"
+    conn = get_db_connection()
+    for label in ("with authorizer", "without authorizer"):
+        start = time.perf_counter()
+        for i in range(repeats):
+            # Unique text defeats the statement cache, so the authorizer runs at every prepare
+            conn.execute(f"{sql} -- {label} {i}").fetchall()
+        print(f"{label:>18}: {(time.perf_counter() - start) / repeats * 1e6:8.1f} us/query")
+        conn.set_authorizer(None)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+    failures = check_corpus()
+    bench_validators(args.repeats)
+    bench_authorizer(max(1, args.repeats // 10))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Scripted, latency-configurable stand-in for the OpenAI chat completions API.
+
+Responses are chosen from the shape of the request (the forced function name,
+response_format, or the node's system prompt) so the whole agent graph can run
+without network access or API spend. `FakeAsyncOpenAI` is an in-process drop-in
+for `AsyncOpenAI`; `install_fake_client` swaps it in behind `get_openai_client`.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+DEFAULT_SQL = (
+    "SELECT BillingCountry, SUM(Total) AS Revenue FROM Invoice "
+    "GROUP BY BillingCountry ORDER BY Revenue DESC"
+)
+IRRELEVANT_WORDS = ("hello", "hi", "weather", "joke", "thanks")
+ANSWER_TOKENS = ["The ", "USA ", "leads ", "total ", "revenue, ", "followed ", "by ", "Canada ", "and ", "Brazil."]
+
+
+def _system_prompt(request: Dict[str, Any]) -> str:
+    messages = request.get("messages", [])
+    return messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+
+
+def _user_text(request: Dict[str, Any]) -> str:
+    return " ".join(m["content"] for m in request.get("messages", []) if m["role"] == "user")
+
+
+def _function_arguments(name: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    text = _user_text(request).lower()
+    if name == "route_query":
+        words = set(re.findall(r"[a-z]+", text))
+        return {"relevance": "irrelevant" if words & set(IRRELEVANT_WORDS) else "relevant"}
+    if name == "select_tables":
+        available = re.search(r"available tables are: ([^.]+)\.", _system_prompt(request))
+        tables = [t.strip() for t in available.group(1).split(",")] if available else []
+        picked = [t for t in tables if t.lower() in text]
+        return {"selected_tables": picked or ["Invoice"]}
+    if name == "analyze_query":
+        relevance = _function_arguments("route_query", request)["relevance"]
+        if relevance == "irrelevant":
+            return {"relevance": relevance, "refined_query": None, "selected_tables": []}
+        return {"relevance": relevance, "refined_query": _user_text(request), **_function_arguments("select_tables", request)}
+    if name == "plan_visualization":
+        return {"needs_visualization": True, "visualization_type": "bar", "reasoning": "Grouped totals."}
+    if name == "choose_encoding":
+        columns = re.findall(r"^\s*- (.+?): (numeric|temporal|text|empty)", _system_prompt(request), re.M)
+        numeric = [c for c, kind in columns if kind == "numeric"] or [columns[-1][0]]
+        labels = [c for c, kind in columns if kind != "numeric"] or [columns[0][0]]
+        return {"mark": "bar", "x": labels[0], "y": numeric[-1], "title": "Chart"}
+    return {}
+
+
+def _message_content(
+    request: Dict[str, Any], sql: str, repaired_sql: Optional[str] = None, varied_sql: Optional[str] = None
+) -> str:
+    system = _system_prompt(request)
+    if request.get("response_format", {}).get("type") == "json_object":
+        return json.dumps({
+            "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+            "mark": "bar",
+            "encoding": {"x": {"field": "BillingCountry", "type": "nominal"}, "y": {"field": "Revenue", "type": "quantitative"}},
+        })
+    if "SQLite" in system:
+        # A retry (the request quotes the error) gets the repaired query
+        if repaired_sql and "Error:" in _user_text(request):
+            return repaired_sql
+        # Sampled above temperature 0 (parallel candidates)
+        return varied_sql if varied_sql and request.get("temperature", 0) > 0 else sql
+    if "rewrite" in system.lower():
+        return _user_text(request)
+    return "".join(ANSWER_TOKENS)
+
+
+def scripted_completion(
+    request: Dict[str, Any], sql: str = DEFAULT_SQL, repaired_sql: Optional[str] = None, varied_sql: Optional[str] = None
+) -> Dict[str, Any]:
+    """Returns a non-streamed chat.completion payload for the request."""
+    function_call = request.get("function_call")
+    if isinstance(function_call, dict):
+        name = function_call["name"]
+        message = {
+            "role": "assistant",
+            "content": None,
+            "function_call": {"name": name, "arguments": json.dumps(_function_arguments(name, request))},
+        }
+        finish_reason = "function_call"
+    else:
+        message = {"role": "assistant", "content": _message_content(request, sql, repaired_sql, varied_sql)}
+        finish_reason = "stop"
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": len(json.dumps(request.get("messages", []))) // 4, "completion_tokens": 20, "total_tokens": 0},
+    }
+
+
+def scripted_chunks(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Returns the chat.completion.chunk payloads for a streamed request."""
+    chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    base = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": request.get("model", "gpt-4o")}
+    chunks = [
+        {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}]}
+        for token in ANSWER_TOKENS
+    ]
+    chunks.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    if request.get("stream_options", {}).get("include_usage"):
+        usage = {"prompt_tokens": len(json.dumps(request.get("messages", []))) // 4, "completion_tokens": len(ANSWER_TOKENS)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        chunks.append({**base, "choices": [], "usage": usage})
+    return chunks
+
+
+class _FakeStream:
+    def __init__(self, chunks: List[Dict[str, Any]], ttft: float, token_delay: float):
+        self._chunks = chunks
+        self._ttft = ttft
+        self._token_delay = token_delay
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self._ttft)
+        for i, chunk in enumerate(self._chunks):
+            if i:
+                await asyncio.sleep(self._token_delay)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeCompletions:
+    def __init__(self, client: "FakeAsyncOpenAI"):
+        self._client = client
+
+    async def create(self, **request):
+        if self._client.record_calls:
+            self._client.calls.append(request)
+        latency = self._client.latency_for(request.get("model", ""))
+        if request.get("stream"):
+            return _FakeStream(scripted_chunks(request), latency, self._client.token_delay)
+        await asyncio.sleep(latency)
+        client = self._client
+        return ChatCompletion.model_validate(scripted_completion(request, client.sql, client.repaired_sql, client.varied_sql))
+
+
+class _FakeChat:
+    def __init__(self, client: "FakeAsyncOpenAI"):
+        self.completions = _FakeCompletions(client)
+
+
+class FakeAsyncOpenAI:
+    """
+    In-process fake of `AsyncOpenAI` with a fixed per-call latency, optionally
+    per model, and an optional slow tail: `tail_probability` of calls take
+    `tail_factor` times longer. SQL requests return `sql`, `repaired_sql`
+    when they quote an error (retries and repairs), or `varied_sql` when
+    sampled above temperature 0 (parallel candidates).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        token_delay: float = 0.02,
+        sql: str = DEFAULT_SQL,
+        repaired_sql: Optional[str] = None,
+        varied_sql: Optional[str] = None,
+        record_calls: bool = True,
+        model_latency: Optional[Dict[str, float]] = None,
+        tail_probability: float = 0.0,
+        tail_factor: float = 5.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.sql = sql
+        self.repaired_sql = repaired_sql
+        self.varied_sql = varied_sql
+        self.record_calls = record_calls
+        self.model_latency = model_latency or {}
+        self.tail_probability = tail_probability
+        self.tail_factor = tail_factor
+        self._random = random.Random(seed)
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = _FakeChat(self)
+
+    def latency_for(self, model: str) -> float:
+        latency = self.model_latency.get(model, self.latency)
+        if self.tail_probability and self._random.random() < self.tail_probability:
+            latency *= self.tail_factor
+        return latency
+
+
+def install_fake_client(
+    latency: float = 0.5,
+    token_delay: float = 0.02,
+    sql: Optional[str] = None,
+    record_calls: bool = True,
+    response_cache: bool = False,
+    **options,
+) -> FakeAsyncOpenAI:
+    """
+    Routes every `get_openai_client()` caller to a fake client (options as for `FakeAsyncOpenAI`).
+    The LLM response cache starts empty, and is off unless `response_cache`, so
+    calls reach the fake and scripted answers never leak from an earlier client.
+    """
+    import app.services.llm as llm
+    import app.services.llm_cache as llm_cache
+
+    client = FakeAsyncOpenAI(latency=latency, token_delay=token_delay, sql=sql or DEFAULT_SQL, record_calls=record_calls, **options)
+    llm._client = client
+    llm_cache.LLM_CACHE_ENABLED = response_cache
+    llm_cache._llm_cache = None
+    return client
@@ -0,0 +1,99 @@
+"""
+OpenAI-compatible HTTP server that answers with the scripted fake LLM.
+
+Serves POST /v1/chat/completions (plain and streamed, including function
+calls) and POST /v1/embeddings with a configurable latency, so the agent
+can be run end to end, through the real OpenAI SDK and HTTP stack, without
+network access or API spend. Point the backend at it with OPENAI_BASE_URL.
+
+    cd backend
+    python -m benchmarks.fake_llm_server --port 8100 --latency 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=x ./run_api.sh
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fake_llm import DEFAULT_SQL, scripted_chunks, scripted_completion
+
+EMBEDDING_DIMENSIONS = 256
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS):
+    """Deterministic unit vector from hashed word counts, so equal texts embed equally."""
+    vector = [0.0] * dimensions
+    for word in text.lower().split():
+        digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % dimensions] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def create_app(latency: float = 0.5, token_delay: float = 0.02, sql: str = DEFAULT_SQL) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI API")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body: Dict[str, Any] = await request.json()
+        app.state.requests += 1
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return JSONResponse(scripted_completion(body, sql))
+
+        async def events():
+            await asyncio.sleep(latency)
+            for i, chunk in enumerate(scripted_chunks(body)):
+                if i:
+                    await asyncio.sleep(token_delay)
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body: Dict[str, Any] = await request.json()
+        app.state.requests += 1
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(latency)
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before a response / the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--sql", default=DEFAULT_SQL, help="SQL returned to the SQL generator")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(latency=args.latency, token_delay=args.token_delay, sql=args.sql)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
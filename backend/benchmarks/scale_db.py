@@ -0,0 +1,88 @@
+"""
+Writes a synthetically scaled copy of the sample database.
+
+Every row of the scaled tables is repeated `--factor` times with shifted
+integer keys; foreign keys between scaled tables are shifted with them, so
+joins stay consistent and per-key aggregates keep their shape while the
+row counts grow. Other tables are copied unchanged.
+
+    cd backend
+    python -m benchmarks.scale_db --source app/data/chinook.db --dest app/data/chinook_x100.db --factor 100
+"""
+import argparse
+import os
+import sqlite3
+import time
+from typing import Dict, List
+
+DEFAULT_TABLES = ["Customer", "Invoice", "InvoiceLine"]
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def scale_tables(conn: sqlite3.Connection, tables: List[str], factor: int):
+    """Appends factor-1 shifted copies of each table's rows, in place."""
+    offsets: Dict[str, int] = {}
+    key_columns: Dict[str, str] = {}
+    for table in tables:
+        keys = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})") if row[5]]
+        if len(keys) == 1:
+            key_columns[table] = keys[0]
+            offsets[table] = conn.execute(f"SELECT COALESCE(MAX({_quote(keys[0])}), 0) FROM {_quote(table)}").fetchone()[0]
+
+    for table in tables:
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+        # column -> table whose key it holds, for every key that gets shifted
+        shifted = {key_columns[table]: table} if table in key_columns else {}
+        for fk in conn.execute(f"PRAGMA foreign_key_list({_quote(table)})"):
+            if fk[2] in offsets:
+                shifted[fk[3]] = fk[2]
+        if not shifted:
+            raise ValueError(f"{table} has no integer key to shift; its copies would collide")
+
+        original = conn.execute(f"SELECT MAX(rowid) FROM {_quote(table)}").fetchone()[0] or 0
+        for copy in range(1, factor):
+            select = ", ".join(
+                f"{_quote(c)} + {copy * offsets[shifted[c]]}" if c in shifted else _quote(c) for c in columns
+            )
+            conn.execute(
+                f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, columns))}) "
+                f"SELECT {select} FROM {_quote(table)} WHERE rowid <= ?",
+                (original,),
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--source", default=os.getenv("SQL_AGENT_DB_PATH", "app/data/chinook.db"))
+    parser.add_argument("--dest", required=True)
+    parser.add_argument("--factor", type=int, default=10)
+    parser.add_argument("--tables", nargs="+", default=DEFAULT_TABLES, help="tables to scale")
+    args = parser.parse_args()
+
+    if os.path.abspath(args.source) == os.path.abspath(args.dest):
+        parser.error("--dest must differ from --source")
+    if os.path.exists(args.dest):
+        os.remove(args.dest)
+
+    start = time.perf_counter()
+    source = sqlite3.connect(f"file:{args.source}?mode=ro", uri=True)
+    dest = sqlite3.connect(args.dest)
+    source.backup(dest)
+    source.close()
+
+    with dest:
+        scale_tables(dest, args.tables, args.factor)
+    dest.execute("ANALYZE")
+    dest.execute("VACUUM")
+    for table in args.tables:
+        count = dest.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()[0]
+        print(f"{table:>16}: {count:>10,} rows")
+    dest.close()
+    print(f"wrote {args.dest} ({os.path.getsize(args.dest) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
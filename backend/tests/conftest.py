@@ -0,0 +1,47 @@
+"""
+Points the app at a small throwaway database before any `app` module is
+imported (they read their configuration at import time).
+"""
+import os
+import sqlite3
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="sql-agent-tests-")
+_DB_PATH = os.path.join(_TMP_DIR, "test.db")
+os.environ["SQL_AGENT_DB_PATH"] = _DB_PATH
+# Runtime stores go next to the test database, not into app/data
+os.environ["CHECKPOINT_DB_PATH"] = os.path.join(_TMP_DIR, "checkpoints.sqlite")
+os.environ["ANSWER_CACHE_PATH"] = os.path.join(_TMP_DIR, "answer_cache.sqlite")
+os.environ["TABLE_INDEX_PATH"] = os.path.join(_TMP_DIR, "table_index")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+
+def _create_db(path: str):
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE Customer (CustomerId INTEGER PRIMARY KEY, Country TEXT NOT NULL, Company TEXT);
+        CREATE TABLE Invoice (
+            InvoiceId INTEGER PRIMARY KEY,
+            CustomerId INTEGER NOT NULL REFERENCES Customer (CustomerId),
+            InvoiceDate TEXT NOT NULL,
+            Total NUMERIC(10, 2) NOT NULL
+        );
+        """
+    )
+    countries = ["Brazil", "Canada", "France", "Germany", "USA"]
+    conn.executemany(
+        "INSERT INTO Customer VALUES (?, ?, ?)",
+        [(i, countries[i % len(countries)], None if i % 3 else f"Company {i % 4}") for i in range(1, 61)],
+    )
+    conn.executemany(
+        "INSERT INTO Invoice VALUES (?, ?, ?, ?)",
+        [(i, i % 60 + 1, f"20{21 + i % 4}-0{i % 9 + 1}-15", round(0.99 * (i % 13 + 1), 2)) for i in range(1, 501)],
+    )
+    conn.commit()
+    conn.close()
+
+
+_create_db(_DB_PATH)
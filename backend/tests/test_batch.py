@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.graph.graph import build_workflow
+from app.services import batch
+from app.services.batch import run_batch
+from benchmarks.fake_llm import install_fake_client
+
+
+@pytest.fixture(autouse=True)
+def slots(monkeypatch):
+    """A fresh concurrency limit per test: each test runs its own event loop."""
+    monkeypatch.setattr(batch, "_slots", None)
+    monkeypatch.setattr(batch, "BATCH_MAX_CONCURRENCY", 2)
+
+
+class Checkpointer:
+    def __init__(self):
+        self.deleted = []
+
+    async def adelete_thread(self, thread_id):
+        self.deleted.append(thread_id)
+
+
+class FakeGraph:
+    """Answers each question after a short delay, tracking how many run at once."""
+
+    def __init__(self, delay=0.01, fail=()):
+        self.delay = delay
+        self.fail = fail
+        self.checkpointer = Checkpointer()
+        self.started, self.cancelled = [], []
+        self.running = self.peak = 0
+
+    async def astream(self, inputs, config, stream_mode):
+        question = inputs["user_query"]
+        self.started.append(question)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if question in self.fail:
+                raise RuntimeError("LLM unavailable")
+            yield {"sql_generator": {"generated_sql": "SELECT 1"}}
+            yield {"response_synthesizer": {"natural_response": f"answer to {question}"}}
+        except asyncio.CancelledError:
+            self.cancelled.append(question)
+            raise
+        finally:
+            self.running -= 1
+
+
+async def collect(graph, questions):
+    return [item async for item in run_batch(graph, questions)]
+
+
+def test_every_question_is_answered_and_its_thread_deleted():
+    graph = FakeGraph()
+    questions = [f"question {i}" for i in range(5)]
+    results = asyncio.run(collect(graph, questions))
+
+    assert sorted(r["index"] for r in results) == list(range(5))
+    for r in results:
+        assert r["question"] == questions[r["index"]]
+        assert (r["response"], r["sql"], r["error"]) == (f"answer to {r['question']}", "SELECT 1", None)
+    assert len(set(graph.checkpointer.deleted)) == 5
+    assert all(thread_id.startswith("batch-") for thread_id in graph.checkpointer.deleted)
+
+
+def test_identical_questions_run_once():
+    graph = FakeGraph()
+    results = asyncio.run(collect(graph, ["Revenue by country?", "revenue  by COUNTRY", "Top customers"]))
+
+    assert sorted(graph.started) == ["Revenue by country?", "Top customers"]
+    duplicates = [r for r in results if r["index"] in (0, 1)]
+    assert [r["question"] for r in sorted(duplicates, key=lambda r: r["index"])] == ["Revenue by country?", "revenue  by COUNTRY"]
+    assert duplicates[0]["response"] == duplicates[1]["response"] == "answer to Revenue by country?"
+
+
+def test_concurrency_is_bounded_and_results_arrive_as_they_finish():
+    graph = FakeGraph()
+    results = asyncio.run(collect(graph, [f"question {i}" for i in range(6)]))
+    assert graph.peak == 2
+    assert len(results) == 6
+
+
+def test_a_failing_question_does_not_stop_the_batch():
+    graph = FakeGraph(fail=("question 1",))
+    results = {r["index"]: r for r in asyncio.run(collect(graph, ["question 0", "question 1", "question 2"]))}
+
+    assert results[1]["error"] == "LLM unavailable"
+    assert results[1]["response"] is None
+    assert results[0]["error"] is None and results[2]["error"] is None
+    assert len(graph.checkpointer.deleted) == 3
+
+
+def test_closing_the_stream_cancels_the_remaining_questions():
+    graph = FakeGraph(delay=10)
+
+    async def run():
+        stream = run_batch(graph, [f"question {i}" for i in range(4)])
+        reader = asyncio.ensure_future(stream.__anext__())
+        while len(graph.started) < 2:
+            await asyncio.sleep(0)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await stream.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert sorted(graph.cancelled) == ["question 0", "question 1"]
+    assert len(graph.started) == 2  # queued questions never started
+    assert len(graph.checkpointer.deleted) == 2
+
+
+def test_batch_through_the_agent_workflow():
+    client = install_fake_client(latency=0, token_delay=0, sql="SELECT Country, COUNT(*) AS n FROM Customer GROUP BY Country")
+    saver = MemorySaver()
+    graph = build_workflow().compile(checkpointer=saver)
+    questions = ["Customers per country", "customers per country!", "Hello there"]
+
+    results = {r["index"]: r for r in asyncio.run(collect(graph, questions))}
+    assert results[0]["data"]["row_count"] == 5
+    assert results[1]["response"] == results[0]["response"]
+    assert results[0]["sql"].startswith("SELECT Country")
+    assert results[2]["sql"] is None and results[2]["response"]
+    assert all(r["error"] is None for r in results.values())
+    assert client.calls
+    assert not saver.storage  # no conversation state left behind
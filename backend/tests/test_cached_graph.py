@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.graph import cached_graph
+from app.graph.cached_graph import AnswerCachingGraph
+from app.graph.graph import build_workflow
+from app.services.answer_cache import AnswerCache
+from app.tools.catalog import get_schema_catalog
+from benchmarks.fake_llm import install_fake_client
+
+SQL = "SELECT Country, COUNT(*) AS Customers FROM Customer GROUP BY Country ORDER BY Customers DESC"
+QUESTION = "How many customers are there per country?"
+
+
+@pytest.fixture
+def fake_client():
+    return install_fake_client(latency=0, token_delay=0, sql=SQL)
+
+
+@pytest.fixture
+def graph():
+    return AnswerCachingGraph(build_workflow().compile(checkpointer=MemorySaver()), AnswerCache(path=None))
+
+
+def ask(graph, question, thread_id):
+    """Runs one question and returns the node names that produced updates, and the run's config."""
+    config = {"configurable": {"thread_id": thread_id}}
+
+    async def run():
+        return [node async for update in graph.astream({"user_query": question}, config) for node in update]
+
+    return asyncio.run(run()), config
+
+
+def cached(graph, question):
+    return asyncio.run(graph._cache.lookup(question, get_schema_catalog().schema_version))
+
+
+def function_calls(client):
+    return [call["function_call"]["name"] for call in client.calls if isinstance(call.get("function_call"), dict)]
+
+
+def test_miss_runs_the_workflow_and_stores_the_answer(fake_client, graph):
+    nodes, config = ask(graph, QUESTION, "t1")
+    assert nodes[0] == "query_router"
+    assert "sql_executor" in nodes and "response_synthesizer" in nodes
+    assert "route_query" in function_calls(fake_client)
+
+    entry = cached(graph, "how many customers are there per COUNTRY")
+    assert entry is not None
+    assert entry.generated_sql == SQL
+    assert entry.query_result["rows"][0][1] == 12
+    assert entry.natural_response == asyncio.run(graph.aget_state(config)).values["natural_response"]
+
+
+def test_fresh_hit_replays_without_llm_calls(fake_client, graph):
+    ask(graph, QUESTION, "t1")
+    first = cached(graph, QUESTION)
+    fake_client.calls.clear()
+
+    config = {"configurable": {"thread_id": "t2"}}
+
+    async def run():
+        return [update async for update in graph.astream({"user_query": QUESTION}, config)]
+
+    updates = asyncio.run(run())
+    assert fake_client.calls == []
+    assert [list(update) for update in updates] == [["answer_cache"]]
+    replay = updates[0]["answer_cache"]
+    assert replay["generated_sql"] == SQL
+    assert replay["natural_response"] == first.natural_response
+    assert replay["query_result"]["rows"] == first.query_result["rows"]
+    # The result handle is re-issued so paging works after the original one was evicted
+    assert replay["query_result"]["result_id"] != first.query_result["result_id"]
+
+
+def test_stale_hit_reruns_the_cached_sql_from_the_validator(fake_client, graph, monkeypatch):
+    ask(graph, QUESTION, "t1")
+    fake_client.calls.clear()
+    monkeypatch.setattr(cached_graph, "get_data_stamp", lambda: "changed")
+
+    nodes, config = ask(graph, QUESTION, "t2")
+    assert nodes[0] == "sql_validator"
+    assert "query_router" not in nodes and "table_selector" not in nodes and "sql_generator" not in nodes
+    assert "sql_executor" in nodes and "response_synthesizer" in nodes
+    assert not {"route_query", "select_tables"} & set(function_calls(fake_client))
+    assert not any("SQLite" in call["messages"][0]["content"] for call in fake_client.calls)
+
+    state = asyncio.run(graph.aget_state(config)).values
+    assert state["generated_sql"] == SQL
+    assert state["user_query"] == QUESTION
+    assert state["query_result"]["row_count"] == 5
+    # The refreshed answer replaces the old entry under the new data stamp
+    assert cached(graph, QUESTION).data_stamp == "changed"
+
+
+def test_irrelevant_questions_are_not_cached(fake_client, graph):
+    nodes, _ = ask(graph, "hello there", "t1")
+    assert "general_agent" in nodes
+    assert cached(graph, "hello there") is None
+
+
+def test_disabled_cache_passes_through(fake_client):
+    graph = AnswerCachingGraph(build_workflow().compile(checkpointer=MemorySaver()), None)
+    ask(graph, QUESTION, "t1")
+    calls = len(fake_client.calls)
+    nodes, _ = ask(graph, QUESTION, "t2")
+    assert nodes[0] == "query_router"
+    assert len(fake_client.calls) == 2 * calls
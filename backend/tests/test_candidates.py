@@ -0,0 +1,76 @@
+import asyncio
+
+from app.tools import candidates, cost
+from app.tools.candidates import candidate_temperatures, pick_candidate
+
+
+def pick(*sqls):
+    return asyncio.run(pick_candidate(list(sqls)))
+
+
+def test_cheapest_usable_candidate_wins():
+    picked = pick("SELECT COUNT(*) FROM Customer a, Customer b", "SELECT COUNT(*) FROM Customer")
+    assert picked.sql == "SELECT COUNT(*) FROM Customer"
+    assert picked.cost.estimated_rows == 60
+
+
+def test_ties_keep_generation_order():
+    picked = pick("SELECT Country FROM Customer", "SELECT Company FROM Customer")
+    assert picked.sql == "SELECT Country FROM Customer"
+
+
+def test_unsafe_and_invalid_candidates_are_skipped():
+    picked = pick("DELETE FROM Invoice", "SELECT Revenue FROM Invoice", "SELECT SUM(Total) FROM Invoice")
+    assert picked.sql == "SELECT SUM(Total) FROM Invoice"
+    assert picked.usable
+
+
+def test_identifier_fixes_are_kept_on_the_candidate():
+    picked = pick("SELECT COUNT(*) FROM Invoices")
+    assert picked.sql == "SELECT COUNT(*) FROM Invoice"
+    assert picked.fixes == ["Invoices -> Invoice"]
+
+
+def test_first_candidate_is_returned_when_none_is_usable():
+    picked = pick("SELECT Revenue FROM Invoice", "DELETE FROM Invoice")
+    assert picked.sql == "SELECT Revenue FROM Invoice"
+    assert picked.error == "SQLite rejected the query: no such column: Revenue"
+    assert not picked.usable
+
+
+def test_too_expensive_candidates_are_not_usable(monkeypatch):
+    monkeypatch.setattr(cost, "QUERY_MAX_ESTIMATED_ROWS", 1000)
+    picked = pick("SELECT COUNT(*) FROM Customer c, Invoice i")
+    assert picked.error is None and picked.cost.too_expensive
+    assert not picked.usable
+
+
+def test_reformatted_duplicates_are_checked_once(monkeypatch):
+    checked = []
+    check_candidate = candidates.check_candidate
+
+    async def counted(sql):
+        checked.append(sql)
+        return await check_candidate(sql)
+
+    monkeypatch.setattr(candidates, "check_candidate", counted)
+    pick("SELECT COUNT(*) FROM Customer", "SELECT  COUNT(*)\nFROM Customer", "SELECT COUNT(*) FROM Invoice")
+    assert checked == ["SELECT COUNT(*) FROM Customer", "SELECT COUNT(*) FROM Invoice"]
+
+
+def test_cross_check_prefers_the_result_most_candidates_agree_on(monkeypatch):
+    sqls = (
+        "SELECT COUNT(*) FROM Customer WHERE Country = 'USA'",
+        "SELECT COUNT(*) FROM Customer",
+        "SELECT COUNT(CustomerId) FROM Customer",
+    )
+    assert pick(*sqls).sql == sqls[0]  # cheapest, in generation order
+
+    monkeypatch.setattr(candidates, "SQL_CANDIDATE_CROSS_CHECK", True)
+    assert pick(*sqls).sql == sqls[1]
+
+
+def test_candidate_temperatures(monkeypatch):
+    monkeypatch.setattr(candidates, "SQL_CANDIDATE_MAX_TEMPERATURE", 0.8)
+    assert candidate_temperatures(1) == [0]
+    assert candidate_temperatures(3) == [0, 0.4, 0.8]
@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.tools import catalog as catalog_module
+from app.tools.catalog import ColumnInfo, SchemaCatalog, TableInfo
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A scratch database with a small and a large table, which the catalog counts on."""
+    path = str(tmp_path / "counts.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE Small (id INTEGER PRIMARY KEY);
+        CREATE TABLE Large (id INTEGER, padding TEXT);
+        INSERT INTO Small VALUES (1), (2), (3);
+        WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < 2000000)
+        INSERT INTO Large SELECT i, 'xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx' FROM r;
+        """
+    )
+    conn.commit()
+    monkeypatch.setattr(catalog_module, "get_db_connection", lambda: sqlite3.connect(path, check_same_thread=False))
+    yield conn
+    conn.close()
+
+
+def make_catalog(data_version=1):
+    tables = {
+        name: TableInfo(name=name, create_sql=f"CREATE TABLE {name} (id)", columns=[ColumnInfo(name="id", type="INTEGER")])
+        for name in ("Small", "Large")
+    }
+    return SchemaCatalog(tables, schema_version=1, data_version=data_version)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_refresh_counts_rows(db):
+    catalog = make_catalog()
+    catalog.refresh_row_counts()
+    assert (catalog.tables["Small"].row_count, catalog.tables["Large"].row_count) == (3, 2000000)
+
+
+def test_slow_count_keeps_the_previous_count(db, monkeypatch):
+    catalog = make_catalog()
+    catalog.tables["Large"].row_count = 1234
+    monkeypatch.setattr(catalog_module, "CATALOG_COUNT_TIMEOUT_SECONDS", 0.001)
+    catalog.refresh_row_counts()
+    assert catalog.tables["Large"].row_count == 1234
+
+
+def test_slow_first_count_falls_back_to_sqlite_stat1(db, monkeypatch):
+    catalog = make_catalog()
+    monkeypatch.setattr(catalog_module, "CATALOG_COUNT_TIMEOUT_SECONDS", 0.001)
+    catalog.refresh_row_counts()
+    assert catalog.tables["Large"].row_count is None  # never analyzed
+
+    db.execute("ANALYZE")
+    db.commit()
+    catalog.refresh_row_counts()
+    assert catalog.tables["Large"].row_count == 2000000
+
+
+def test_data_change_recounts_in_the_background(db):
+    catalog = make_catalog()
+    catalog.refresh_row_counts()
+    catalog._samples["Small"] = {"id": ["1"]}
+    db.execute("INSERT INTO Small VALUES (4)")
+    db.commit()
+
+    catalog.data_changed(2)
+    assert catalog.data_version == 2
+    assert catalog._samples == {}
+    wait_for(lambda: not catalog._recounting)
+    assert catalog.tables["Small"].row_count == 4
+
+
+def test_one_recount_at_a_time_and_repeated_after_new_changes(monkeypatch):
+    catalog = make_catalog()
+    counted, release = [], threading.Event()
+
+    def slow_recount():
+        counted.append(catalog.data_version)
+        release.wait(5)
+
+    monkeypatch.setattr(catalog, "refresh_row_counts", slow_recount)
+    catalog.data_changed(2)
+    wait_for(lambda: counted == [2])
+    catalog.data_changed(3)
+    catalog.data_changed(4)
+    assert counted == [2]
+
+    release.set()
+    wait_for(lambda: not catalog._recounting)
+    # The data changed during the first recount, so it ran once more for the latest version
+    assert counted == [2, 4]
+
+
+def test_failed_recount_allows_the_next_one(monkeypatch):
+    catalog = make_catalog()
+    attempts = []
+
+    def failing_recount():
+        attempts.append(catalog.data_version)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(catalog, "refresh_row_counts", failing_recount)
+    catalog.data_changed(2)
+    wait_for(lambda: not catalog._recounting)
+    catalog.data_changed(3)
+    wait_for(lambda: attempts == [2, 3])
+
+
+def test_catalog_lookup_does_not_wait_for_the_recount(monkeypatch):
+    catalog = make_catalog(data_version=1)
+    release = threading.Event()
+    monkeypatch.setattr(catalog, "refresh_row_counts", lambda: release.wait(5))
+    monkeypatch.setattr(catalog_module, "_catalog", catalog)
+    monkeypatch.setattr(catalog_module, "get_db_versions", lambda: (1, 2))
+
+    started = time.perf_counter()
+    assert catalog_module.get_schema_catalog() is catalog
+    assert time.perf_counter() - started < 1
+    assert catalog.data_version == 2
+    release.set()
+    wait_for(lambda: not catalog._recounting)
@@ -0,0 +1,107 @@
+import pytest
+
+from app.tools.charts import CHART_MAX_CATEGORIES, build_vega_lite_spec, choose_encoding, plan_chart
+from app.tools.digest import profile_result
+
+COUNTRIES = ["Brazil", "Canada", "France", "Germany", "USA"]
+
+
+def profiles(columns, rows):
+    return profile_result({"result_id": "r", "columns": columns, "rows": rows, "row_count": len(rows), "truncated": False})
+
+
+BY_COUNTRY = (["Country", "Revenue"], [[c, 10.0 * i] for i, c in enumerate(COUNTRIES)])
+BY_YEAR = (["Year", "Revenue"], [[2021 + i, 100.5 + i] for i in range(4)])
+BY_DATE = (["InvoiceDate", "Total"], [[f"2024-0{i + 1}-15", 1.98 * i] for i in range(6)])
+BY_CUSTOMER = (["CustomerId", "Total"], [[i, 3.5 * i] for i in range(1, 11)])
+TWO_MEASURES = (["Milliseconds", "Bytes"], [[1000 * i, 33000 * i + 7] for i in range(12)])
+
+
+@pytest.mark.parametrize(
+    "query, result, chart_type",
+    [
+        ("Revenue by country", BY_COUNTRY, "bar"),
+        ("Show the share of revenue per country", BY_COUNTRY, "pie"),
+        ("Revenue per year", BY_YEAR, "line"),
+        ("Invoice totals this year", BY_DATE, "line"),
+        ("Total spent by each customer", BY_CUSTOMER, "bar"),
+        ("Is there a correlation between length and size?", TWO_MEASURES, "scatter"),
+        ("Track lengths and sizes", TWO_MEASURES, "scatter"),
+    ],
+)
+def test_clear_shapes_get_a_chart(query, result, chart_type):
+    plan = plan_chart(query, profiles(*result), len(result[1]))
+    assert plan.needs_visualization
+    assert plan.visualization_type == chart_type
+
+
+@pytest.mark.parametrize(
+    "query, result",
+    [
+        ("How many customers are there?", (["Count"], [[60]])),
+        ("Which country has the most revenue?", (["Country", "Revenue"], [["USA", 523.06]])),
+        ("List the customer countries", (["Country"], [[c] for c in COUNTRIES])),
+    ],
+)
+def test_text_answers_get_no_chart(query, result):
+    plan = plan_chart(query, profiles(*result), len(result[1]))
+    assert plan.needs_visualization is False
+    assert plan.visualization_type is None
+
+
+@pytest.mark.parametrize(
+    "query, result",
+    [
+        # Explicit request, but nothing numeric to plot
+        ("Plot the customer countries", (["Country"], [[c] for c in COUNTRIES])),
+        # Too many categories for a readable bar chart
+        ("Revenue per city", (["City", "Revenue"], [[f"City {i}", float(i)] for i in range(CHART_MAX_CATEGORIES + 5)])),
+    ],
+)
+def test_ambiguous_shapes_are_left_to_the_llm(query, result):
+    assert plan_chart(query, profiles(*result), len(result[1])) is None
+
+
+def test_bar_encoding_uses_the_category_and_measure():
+    columns, rows = BY_COUNTRY
+    encoding = choose_encoding("bar", profiles(columns, rows), len(rows), "Revenue by country")
+    assert (encoding.mark, encoding.x, encoding.y, encoding.color, encoding.aggregate) == ("bar", "Country", "Revenue", None, None)
+
+
+def test_pie_encoding_is_an_arc():
+    columns, rows = BY_COUNTRY
+    encoding = choose_encoding("pie", profiles(columns, rows), len(rows), "Share")
+    assert (encoding.mark, encoding.x, encoding.y) == ("arc", "Country", "Revenue")
+    spec = build_vega_lite_spec(encoding, profiles(columns, rows), {"values": []})
+    assert spec["encoding"]["theta"]["field"] == "Revenue"
+    assert spec["encoding"]["color"] == {"field": "Country", "type": "nominal"}
+
+
+def test_repeated_x_values_are_summed():
+    rows = [[2021 + i % 4, float(i)] for i in range(8)]
+    encoding = choose_encoding("line", profiles(["Year", "Revenue"], rows), len(rows), "Revenue")
+    assert (encoding.x, encoding.aggregate, encoding.color) == ("Year", "sum", None)
+
+
+def test_small_second_category_becomes_the_color():
+    rows = [[2021 + i % 4, COUNTRIES[i % 3], float(i)] for i in range(12)]
+    result_profiles = profiles(["Year", "Country", "Revenue"], rows)
+    encoding = choose_encoding("line", result_profiles, len(rows), "Revenue")
+    assert (encoding.x, encoding.y, encoding.color, encoding.aggregate) == ("Year", "Revenue", "Country", None)
+    spec = build_vega_lite_spec(encoding, result_profiles, {"values": []})
+    assert spec["encoding"]["x"]["type"] == "ordinal"
+    assert spec["encoding"]["color"]["field"] == "Country"
+
+
+@pytest.mark.parametrize(
+    "chart_type, result",
+    [
+        (None, BY_COUNTRY),
+        ("heatmap", BY_COUNTRY),
+        ("scatter", BY_COUNTRY),
+        ("bar", (["Country"], [[c] for c in COUNTRIES])),
+        ("bar", (["Country", "City", "Company", "Total"], [[c, c, c, 1.0] for c in COUNTRIES])),
+    ],
+)
+def test_no_encoding_without_an_unambiguous_mapping(chart_type, result):
+    assert choose_encoding(chart_type, profiles(*result), len(result[1]), "t") is None
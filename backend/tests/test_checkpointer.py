@@ -0,0 +1,189 @@
+import asyncio
+import operator
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, START, StateGraph
+
+from app.graph.checkpointer import SqliteCheckpointSaver
+from app.graph.graph import build_workflow
+from benchmarks.fake_llm import install_fake_client
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints.sqlite")
+
+
+def config(thread_id, checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def put(saver, thread_id, parent=None, **values):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = values
+    return saver.put(parent or config(thread_id), checkpoint, {"source": "loop", "step": len(values)}, {})
+
+
+def test_put_get_and_list_round_trip(path):
+    saver = SqliteCheckpointSaver(path)
+    first = put(saver, "t1", user_query="q1")
+    second = put(saver, "t1", parent=first, user_query="q2", natural_response="a2")
+    put(saver, "t2", user_query="other thread")
+
+    latest = saver.get_tuple(config("t1"))
+    assert latest.config == second
+    assert latest.parent_config == first
+    assert latest.checkpoint["channel_values"] == {"user_query": "q2", "natural_response": "a2"}
+    assert latest.metadata["step"] == 2
+    assert saver.get_tuple(first).checkpoint["channel_values"] == {"user_query": "q1"}
+    assert saver.get_tuple(config("t3")) is None
+
+    assert [t.config for t in saver.list(config("t1"))] == [second, first]
+    assert [t.config for t in saver.list(config("t1"), before=second)] == [first]
+    assert [t.config for t in saver.list(config("t1"), limit=1)] == [second]
+    assert [t.config for t in saver.list(config("t1"), filter={"step": 1})] == [first]
+    assert len(list(saver.list(None))) == 3
+
+
+def test_put_writes_round_trip(path):
+    saver = SqliteCheckpointSaver(path)
+    saved = put(saver, "t1", user_query="q")
+    saver.put_writes(saved, [("generated_sql", "SELECT 1"), ("is_valid_sql", True)], task_id="task-a")
+    saver.put_writes(saved, [("generated_sql", "SELECT 2")], task_id="task-a")  # a replayed write is ignored
+    saver.put_writes(saved, [("__error__", "first")], task_id="task-b")
+    saver.put_writes(saved, [("__error__", "second")], task_id="task-b")  # special writes are upserted
+
+    assert saver.get_tuple(saved).pending_writes == [
+        ("task-a", "generated_sql", "SELECT 1"),
+        ("task-a", "is_valid_sql", True),
+        ("task-b", "__error__", "second"),
+    ]
+
+
+def test_async_api_matches_sync(path):
+    saver = SqliteCheckpointSaver(path)
+
+    async def run():
+        saved = await saver.aput(config("t1"), empty_checkpoint(), {"step": 0}, {})
+        await saver.aput_writes(saved, [("user_query", "q")], task_id="task")
+        listed = [t async for t in saver.alist(config("t1"))]
+        return saved, await saver.aget_tuple(config("t1")), listed
+
+    saved, latest, listed = asyncio.run(run())
+    assert latest.config == saved
+    assert latest.pending_writes == [("task", "user_query", "q")]
+    assert [t.config for t in listed] == [saved]
+
+
+def test_retention_keeps_the_newest_checkpoints(path):
+    saver = SqliteCheckpointSaver(path, max_per_thread=3)
+    saved = [put(saver, "t1", step=i) for i in range(5)]
+    saver.put_writes(saved[-1], [("user_query", "q")], task_id="task")
+    put(saver, "t2", step=0)
+
+    assert [t.config for t in saver.list(config("t1"))] == saved[:1:-1]
+    assert saver.get_tuple(saved[0]) is None
+    assert len(list(saver.list(config("t2")))) == 1
+    stale_writes = saver.conn.execute(
+        "SELECT COUNT(*) FROM writes WHERE checkpoint_id IN (?, ?)",
+        (saved[0]["configurable"]["checkpoint_id"], saved[1]["configurable"]["checkpoint_id"]),
+    ).fetchone()[0]
+    assert stale_writes == 0
+
+
+def test_compaction_drops_large_channels_from_older_checkpoints(path):
+    saver = SqliteCheckpointSaver(path, full_payload_latest=1)
+    rows = {"columns": ["n"], "rows": [[i] for i in range(1000)]}
+    older = put(saver, "t1", user_query="q1", query_result=rows, visualization_spec={"mark": "bar"})
+    saver.put_writes(older, [("query_result", rows), ("natural_response", "a1")], task_id="task")
+    newest = put(saver, "t1", parent=older, user_query="q2", query_result=rows)
+
+    compacted = saver.get_tuple(older)
+    assert compacted.checkpoint["channel_values"] == {"user_query": "q1"}
+    assert compacted.pending_writes == [("task", "natural_response", "a1")]
+    assert saver.get_tuple(newest).checkpoint["channel_values"] == {"user_query": "q2", "query_result": rows}
+
+
+def test_ttl_sweep_deletes_idle_threads(path):
+    saver = SqliteCheckpointSaver(path, thread_ttl_seconds=60, sweep_interval_seconds=0)
+    idle = put(saver, "idle", user_query="q")
+    saver.put_writes(idle, [("user_query", "q")], task_id="task")
+    saver.conn.execute("UPDATE threads SET last_access = last_access - 3600 WHERE thread_id = 'idle'")
+    saver.conn.commit()
+
+    put(saver, "active", user_query="q")
+    assert saver.get_tuple(config("idle")) is None
+    assert saver.get_tuple(config("active")) is not None
+    for table in ("checkpoints", "writes", "threads"):
+        assert saver.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = 'idle'").fetchone()[0] == 0
+
+
+def test_delete_thread(path):
+    saver = SqliteCheckpointSaver(path)
+    put(saver, "t1", user_query="q")
+    put(saver, "t2", user_query="q")
+    saver.delete_thread("t1")
+    assert saver.get_tuple(config("t1")) is None
+    assert saver.get_tuple(config("t2")) is not None
+
+
+class Counter(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+
+def counter_graph(saver, **compile_options):
+    workflow = StateGraph(Counter)
+    workflow.add_node("first", lambda state: {"steps": ["first"]})
+    workflow.add_node("second", lambda state: {"steps": ["second"]})
+    workflow.add_edge(START, "first")
+    workflow.add_edge("first", "second")
+    workflow.add_edge("second", END)
+    return workflow.compile(checkpointer=saver, **compile_options)
+
+
+def test_thread_resumes_after_a_restart(path):
+    graph = counter_graph(SqliteCheckpointSaver(path))
+    graph.invoke({"steps": ["start"]}, config("t1"))
+
+    # A new saver on the same file, as after a process restart
+    graph = counter_graph(SqliteCheckpointSaver(path))
+    assert graph.get_state(config("t1")).values["steps"] == ["start", "first", "second"]
+    result = graph.invoke({"steps": ["again"]}, config("t1"))
+    assert result["steps"] == ["start", "first", "second", "again", "first", "second"]
+
+
+def test_interrupted_run_continues_from_its_checkpoint(path):
+    graph = counter_graph(SqliteCheckpointSaver(path), interrupt_before=["second"])
+    graph.invoke({"steps": ["start"]}, config("t1"))
+    assert graph.get_state(config("t1")).next == ("second",)
+
+    graph = counter_graph(SqliteCheckpointSaver(path), interrupt_before=["second"])
+    assert graph.invoke(None, config("t1"))["steps"] == ["start", "first", "second"]
+    assert graph.get_state(config("t1")).next == ()
+
+
+def test_agent_workflow_history_is_bounded(path):
+    install_fake_client(latency=0, token_delay=0, sql="SELECT Country, COUNT(*) AS n FROM Customer GROUP BY Country")
+    saver = SqliteCheckpointSaver(path, max_per_thread=5)
+    graph = build_workflow().compile(checkpointer=saver)
+
+    async def ask(question):
+        async for _ in graph.astream({"user_query": question}, config("t1")):
+            pass
+
+    asyncio.run(ask("Customers per country"))
+    asyncio.run(ask("Customers per country again"))
+
+    history = list(graph.get_state_history(config("t1")))
+    assert len(history) == 5
+    assert history[0].values["user_query"] == "Customers per country again"
+    assert history[0].values["query_result"]["row_count"] == 5
+    assert all("query_result" not in snapshot.values for snapshot in history[1:])
+
+    restarted = build_workflow().compile(checkpointer=SqliteCheckpointSaver(path, max_per_thread=5))
+    assert restarted.get_state(config("t1")).values["natural_response"] == history[0].values["natural_response"]
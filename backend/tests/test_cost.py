@@ -0,0 +1,114 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.tools import cost as cost_module
+from app.tools.catalog import ColumnInfo, IndexInfo, SchemaCatalog, TableInfo
+from app.tools.cost import estimate_plan_cost, estimate_query_cost, table_aliases
+
+ROW_COUNTS = {"Artist": 1000, "Album": 10000, "Track": 200000}
+
+
+@pytest.fixture(scope="module")
+def db():
+    """An empty music schema: plans only need the tables and indexes, the counts come from the catalog."""
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT);
+        CREATE TABLE Album (AlbumId INTEGER PRIMARY KEY, ArtistId INTEGER, Title TEXT);
+        CREATE TABLE Track (TrackId INTEGER PRIMARY KEY, AlbumId INTEGER, Name TEXT, Composer TEXT);
+        CREATE INDEX IFK_TrackAlbumId ON Track (AlbumId);
+        CREATE UNIQUE INDEX UX_ArtistName ON Artist (Name);
+        """
+    )
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="module")
+def catalog(db):
+    tables = {}
+    for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'"):
+        tables[name] = TableInfo(
+            name=name,
+            create_sql="",
+            columns=[ColumnInfo(name=c[1], type=c[2]) for c in db.execute("SELECT * FROM pragma_table_info(?)", (name,))],
+            indexes=[IndexInfo(name=i[1], unique=bool(i[2]), columns=[]) for i in db.execute("SELECT * FROM pragma_index_list(?)", (name,))],
+            row_count=ROW_COUNTS[name],
+        )
+    return SchemaCatalog(tables, schema_version=1, data_version=1)
+
+
+@pytest.fixture
+def price(db, catalog):
+    def price(sql):
+        plan = [(row[0], row[1], row[3]) for row in db.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        return estimate_plan_cost(plan, sql, catalog)
+    return price
+
+
+def test_full_scan_of_a_large_table(price):
+    cost = price("SELECT * FROM Track")
+    assert cost.estimated_rows == 200000
+    assert cost.full_scans == ["Track (200,000 rows)"]
+    assert cost.plan == ["SCAN Track"]
+
+
+def test_lookups_by_key_and_unique_index_cost_one_row(price):
+    assert price("SELECT * FROM Artist WHERE Name = 'AC/DC'").estimated_rows == 1
+    assert price("SELECT * FROM Album WHERE AlbumId = 5").estimated_rows == 1
+    # A non-unique index is assumed to match INDEX_FANOUT rows
+    assert price("SELECT * FROM Track WHERE AlbumId = 5").estimated_rows == cost_module.INDEX_FANOUT
+
+
+def test_join_loops_multiply(price):
+    cost = price("SELECT * FROM Track t JOIN Album a ON a.AlbumId = t.AlbumId")
+    assert cost.estimated_rows == 200000  # one primary-key lookup per track
+    assert cost.unindexed_joins == []
+
+
+def test_join_without_an_index_is_called_out(price):
+    automatic = price("SELECT * FROM Album a JOIN Track t ON t.Composer = a.Title")
+    assert automatic.estimated_rows == 10000 * cost_module.INDEX_FANOUT
+    assert automatic.unindexed_joins == ["Track"]
+
+    cross = price("SELECT * FROM Album, Artist")
+    assert cross.estimated_rows == 10000 * 1000
+    assert cross.unindexed_joins == ["Artist"]
+    assert cross.too_expensive
+    feedback = cross.feedback()
+    assert "~10,000,000 rows" in feedback
+    assert "Joins without an index (each row of the outer table scans these): Artist." in feedback
+
+
+def test_correlated_subquery_repeats_per_outer_row(price):
+    cost = price("SELECT Name FROM Track t WHERE (SELECT COUNT(*) FROM Album a WHERE a.ArtistId = t.TrackId) > 1")
+    assert cost.estimated_rows == 200000 + 200000 * 10000
+
+
+def test_compound_parts_and_materialized_ctes_add_up(price):
+    assert price("SELECT Name FROM Track UNION SELECT Title FROM Album").estimated_rows == 200000 + 10000
+    cte = price(
+        "WITH counts AS (SELECT AlbumId, COUNT(*) AS n FROM Track GROUP BY AlbumId) "
+        "SELECT * FROM counts JOIN Album USING (AlbumId)"
+    )
+    # The CTE is priced by its own scan; scanning its result loops once per Album lookup
+    assert cte.estimated_rows == 200000 + 1
+    assert price("SELECT 1").estimated_rows == 0
+
+
+def test_table_aliases(catalog):
+    aliases = table_aliases('SELECT * FROM Track AS t JOIN "Album" al ON al.AlbumId = t.AlbumId JOIN Artist WHERE 1', catalog)
+    assert aliases == {"t": "Track", "al": "Album"}
+
+
+def test_estimate_query_cost_on_the_app_database(monkeypatch):
+    cost = asyncio.run(estimate_query_cost("SELECT * FROM Customer c, Invoice i"))
+    assert cost.estimated_rows == 60 * 500
+    assert cost.unindexed_joins in (["Customer"], ["Invoice"])
+
+    assert asyncio.run(estimate_query_cost("SELECT * FROM Invoices")) is None  # can't be planned
+    monkeypatch.setattr(cost_module, "QUERY_COST_GUARD_ENABLED", False)
+    assert asyncio.run(estimate_query_cost("SELECT * FROM Customer")) is None
@@ -0,0 +1,73 @@
+from app.tools import digest
+from app.tools.digest import build_result_digest, estimate_tokens, profile_result
+
+
+def result(columns, rows, truncated=False):
+    return {"result_id": "r", "columns": columns, "rows": rows, "row_count": len(rows), "truncated": truncated}
+
+
+def invoices(n):
+    return result(["InvoiceId", "BillingCountry", "InvoiceDate", "Total"], [
+        [i, f"Country {i % 7}", f"2021-{i % 12 + 1:02d}-01", round(i * 0.99, 2)] for i in range(1, n + 1)
+    ])
+
+
+def test_profile_types_and_stats():
+    profiles = {p["name"]: p for p in profile_result(result(
+        ["id", "total", "day", "name", "missing"],
+        [[1, 2.5, "2021-01-01", "a", None], [3, None, "2021-03-01", "b", None], [2, 0.5, "2021-02-01", "a", None]],
+    ))}
+    assert profiles["id"] == {"name": "id", "kind": "numeric", "distinct": 3, "nulls": 0, "min": 1, "max": 3, "mean": 2.0}
+    assert type(profiles["id"]["min"]) is int
+    assert (profiles["total"]["min"], profiles["total"]["max"], profiles["total"]["mean"], profiles["total"]["nulls"]) == (0.5, 2.5, 1.5, 1)
+    assert (profiles["day"]["kind"], profiles["day"]["min"], profiles["day"]["max"]) == ("temporal", "2021-01-01", "2021-03-01")
+    assert (profiles["name"]["kind"], profiles["name"]["distinct"], profiles["name"]["min"]) == ("text", 2, None)
+    assert (profiles["missing"]["kind"], profiles["missing"]["nulls"]) == ("empty", 3)
+
+
+def test_profile_handles_integers_beyond_int64():
+    (profile,) = profile_result(result(["n"], [[2**70], [1]]))
+    assert (profile["min"], profile["max"]) == (1, 2**70)
+
+
+def test_small_result_is_rendered_in_full():
+    text = build_result_digest(invoices(5))
+    assert "Row count: 5 rows\n" in text
+    assert "Rows:\n(InvoiceId, BillingCountry, InvoiceDate, Total)\n(1, 'Country 1', '2021-02-01', 0.99)" in text
+    assert "(5, 'Country 5', '2021-06-01', 4.95)" in text
+    assert "omitted" not in text
+
+
+def test_large_result_keeps_the_edge_rows_within_the_budget():
+    text = build_result_digest(invoices(5000), token_budget=800)
+    assert estimate_tokens(text) <= 800
+    lines = text.splitlines()
+    marker = next(i for i, line in enumerate(lines) if "rows omitted" in line)
+    edge = digest.RESULT_DIGEST_EDGE_ROWS
+    assert f"Rows (first {edge} and last {edge}):" in text
+    assert lines[marker] == f"... {5000 - 2 * edge} rows omitted ..."
+    assert lines[marker - edge].startswith("(1, ") and lines[marker - 1].startswith(f"({edge}, ")
+    assert lines[marker + 1].startswith(f"({5000 - edge + 1}, ") and lines[-1].startswith("(5000, ")
+    # Column stats still describe the whole result
+    assert "- Total: numeric, 5000 distinct, 0 nulls, min 0.99, max 4950" in text
+
+
+def test_edge_rows_shrink_to_fit_a_tight_budget():
+    text = build_result_digest(invoices(5000), token_budget=250)
+    edge = int(text.split("Rows (first ")[1].split(" ")[0])
+    assert 1 <= edge < digest.RESULT_DIGEST_EDGE_ROWS
+    assert estimate_tokens(text) <= 250
+    assert text.rstrip().endswith("(5000, 'Country 2', '2021-09-01', 4950)")
+
+
+def test_long_cells_are_clipped():
+    text = build_result_digest(result(["note"], [["x" * 500]]))
+    cell = text.splitlines()[-1]
+    assert len(cell) == digest.RESULT_DIGEST_MAX_CELL_CHARS + 2
+    assert cell.endswith("...)")
+
+
+def test_empty_and_truncated_results():
+    assert build_result_digest(None) == "The query returned no rows."
+    assert build_result_digest(result(["n"], [])) == "The query returned no rows."
+    assert "Row count: 1 rows (result truncated; more rows exist)" in build_result_digest(result(["n"], [[1]], truncated=True))
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from app.api import disconnect
+from app.api.disconnect import until_disconnected
+from app.observability.cancellation import cancelled_work
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(disconnect, "DISCONNECT_POLL_SECONDS", 0.01)
+
+
+class FakeRequest:
+    """Starlette's Request.is_disconnected, driven by the test."""
+
+    def __init__(self):
+        self.disconnected = False
+        self.checks = 0
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnected
+
+
+class Source:
+    """An async generator source that records whether it was cancelled or ran its cleanup."""
+
+    def __init__(self, items, delay=0.0, hang=False, error=None):
+        self.items = items
+        self.delay = delay
+        self.hang = hang
+        self.error = error
+        self.produced = 0
+        self.cancelled = False
+        self.cleaned_up = False
+
+    async def __call__(self):
+        try:
+            for item in self.items:
+                await asyncio.sleep(self.delay)
+                self.produced += 1
+                yield item
+            if self.error is not None:
+                raise self.error
+            if self.hang:
+                await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            self.cleaned_up = True
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def test_items_pass_through_and_the_source_finishes():
+    source = Source(["start", "token", "end"])
+    items = asyncio.run(collect(until_disconnected(FakeRequest(), source())))
+    assert items == ["start", "token", "end"]
+    assert source.cleaned_up and not source.cancelled
+
+
+def test_source_errors_reach_the_reader():
+    source = Source(["start"], error=ValueError("graph failed"))
+
+    async def run():
+        received = []
+        with pytest.raises(ValueError, match="graph failed"):
+            async for item in until_disconnected(FakeRequest(), source()):
+                received.append(item)
+        return received
+
+    assert asyncio.run(run()) == ["start"]
+    assert not source.cancelled
+
+
+def test_disconnect_while_idle_cancels_the_source():
+    source = Source(["start"], hang=True)
+    request = FakeRequest()
+    before = cancelled_work.value(kind="run")
+
+    async def run():
+        received = []
+        async for item in until_disconnected(request, source()):
+            received.append(item)
+            request.disconnected = True
+        return received
+
+    assert asyncio.run(asyncio.wait_for(run(), 5)) == ["start"]
+    assert source.cancelled and source.cleaned_up
+    assert cancelled_work.value(kind="run") == before + 1
+
+
+def test_busy_stream_still_notices_a_disconnect():
+    source = Source(range(10000), delay=0.001)
+    request = FakeRequest()
+
+    async def run():
+        async for item in until_disconnected(request, source()):
+            if item == 20:
+                request.disconnected = True
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert source.cancelled
+    assert source.produced < 10000
+    # Checked at most once per poll interval, not once per item
+    assert request.checks < source.produced
+
+
+def test_closing_the_reader_cancels_the_source():
+    source = Source(["start"], hang=True)
+
+    async def run():
+        stream = until_disconnected(FakeRequest(), source())
+        assert await stream.__anext__() == "start"
+        await stream.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert source.cancelled and source.cleaned_up
+
+
+def test_cancelled_reader_waits_for_the_source_cleanup():
+    cleanup_done = []
+
+    async def source():
+        try:
+            yield "start"
+            await asyncio.sleep(60)
+        finally:
+            await asyncio.sleep(0.02)  # e.g. the graph interrupting its running query
+            cleanup_done.append(True)
+
+    async def run():
+        async def read():
+            async for _ in until_disconnected(FakeRequest(), source()):
+                pass
+
+        reader = asyncio.ensure_future(read())
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        return list(cleanup_done)
+
+    assert asyncio.run(asyncio.wait_for(run(), 5)) == [True]
@@ -0,0 +1,97 @@
+import pytest
+
+pytest.importorskip("duckdb")
+
+from app.tools import duckdb_engine, engines
+from app.tools.duckdb_engine import portable_analytic_query
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    """A freshly built DuckDB mirror that accepts queries on the (small) test tables."""
+    monkeypatch.setattr(engines, "SQL_ANALYTIC_ENGINE", "duckdb")
+    monkeypatch.setattr(engines, "_analytic", None)
+    monkeypatch.setattr(duckdb_engine, "DUCKDB_MIN_ROWS", 0)
+    engine = engines.get_analytic_engine()
+    engine.refresh()
+    return engine
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT Country, COUNT(*) FROM Customer GROUP BY Country",
+        "SELECT substr(InvoiceDate, 1, 4) AS Year, SUM(Total) FROM Invoice GROUP BY Year ORDER BY Year",
+        "SELECT c.Country, SUM(CASE WHEN i.Total > 5 THEN coalesce(i.Total, 0) END) FROM Customer c "
+        "JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY c.Country ORDER BY 2 DESC LIMIT 3",
+    ],
+)
+def test_portable_aggregates_are_routed(query):
+    assert portable_analytic_query(query)[0]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # DuckDB table functions, file paths in FROM and statements must never reach the mirror
+        "SELECT COUNT(*) AS n, (SELECT content FROM read_text('/etc/hostname')) AS secret FROM Invoice GROUP BY 2",
+        "SELECT COUNT(*) FROM read_csv('/etc/passwd')",
+        "SELECT COUNT(*) FROM '/etc/passwd'",
+        "SELECT COUNT(*), \"read_text\"('/etc/hostname') FROM Invoice",
+        "SELECT COUNT(*), getenv('HOME') FROM Invoice",
+        "SELECT COUNT(*) FROM glob('/etc/*')",
+        "SELECT COUNT(*) FROM sqlite_scan('/tmp/x.db', 't')",
+        # SQLite semantics DuckDB doesn't share
+        "SELECT strftime('%Y', InvoiceDate), SUM(Total) FROM Invoice GROUP BY 1",
+        "SELECT Country, COUNT(*) FROM Customer WHERE Country LIKE 'b%' GROUP BY Country",
+        "SELECT SUM(Total) / COUNT(*) FROM Invoice",
+        "SELECT CustomerId % 2, COUNT(*) FROM Invoice GROUP BY 1",
+        "SELECT MAX(Total, 3) FROM Invoice GROUP BY CustomerId",
+        "SELECT Country, COUNT(*) FROM Customer GROUP BY Country LIMIT 1, 2",
+        # Not an aggregate: SQLite answers these faster
+        "SELECT * FROM Customer",
+    ],
+)
+def test_other_queries_stay_on_sqlite(query):
+    assert not portable_analytic_query(query)[0]
+
+
+def test_routed_queries_cannot_read_files(mirror):
+    query = "SELECT COUNT(*) AS n, (SELECT content FROM read_text('/etc/hostname')) AS secret FROM Invoice GROUP BY 2"
+    assert engines.engine_for(query) is engines._sqlite
+    with pytest.raises(Exception):
+        engines.run_query(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT content FROM read_text('/etc/hostname')",
+        "SELECT COUNT(*) FROM '/etc/hostname'",
+        "ATTACH '/tmp/other.duckdb'",
+        "SET enable_external_access = true",
+        "COPY Customer TO '/tmp/customers.csv'",
+    ],
+)
+def test_mirror_refuses_files_and_settings(mirror, query):
+    with pytest.raises(Exception):
+        mirror.fetch_rows(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT Company, COUNT(*) AS n FROM Customer GROUP BY Company ORDER BY Company",
+        "SELECT Company, COUNT(*) AS n FROM Customer GROUP BY Company ORDER BY Company DESC",
+        "SELECT c.Country, SUM(i.Total) AS Revenue, COUNT(DISTINCT i.InvoiceId) AS Invoices FROM Customer c "
+        "JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY c.Country ORDER BY Revenue DESC",
+        "SELECT substr(InvoiceDate, 1, 4) AS Year, MIN(Total), MAX(Total), AVG(Total) FROM Invoice GROUP BY Year ORDER BY Year",
+        "SELECT Country, Country, count(*) FROM Customer GROUP BY Country ORDER BY Country; -- repeated names",
+    ],
+)
+def test_mirror_returns_sqlite_rows_in_sqlite_order(mirror, query):
+    assert engines.engine_for(query) is mirror
+    columns, rows, more = mirror.fetch_rows(query)
+    expected_columns, expected_rows, expected_more = engines._sqlite.fetch_rows(query)
+    assert (columns, more) == (expected_columns, expected_more)
+    assert [[pytest.approx(v) if isinstance(v, float) else v for v in row] for row in expected_rows] == rows
@@ -0,0 +1,148 @@
+import asyncio
+
+from app.services import llm
+from app.services.llm_cache import LLMResponseCache, cacheable, response_key
+from benchmarks.fake_llm import ANSWER_TOKENS, FakeAsyncOpenAI, install_fake_client
+
+MODEL = "gpt-4o"
+REQUEST = {"messages": [{"role": "user", "content": "Summarize the result"}], "temperature": 0}
+
+
+class Sender:
+    """`send` callback for LLMResponseCache.complete that counts the calls reaching the fake API."""
+
+    def __init__(self, request):
+        self.request = {**request, "model": MODEL}
+        self.client = FakeAsyncOpenAI(latency=0, token_delay=0)
+
+    async def __call__(self):
+        return await self.client.chat.completions.create(**self.request)
+
+    @property
+    def calls(self):
+        return len(self.client.calls)
+
+
+async def read(stream, limit=None):
+    text = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            text.append(chunk.choices[0].delta.content)
+            if limit is not None and len(text) == limit:
+                break
+    return "".join(text)
+
+
+def test_repeat_call_is_a_hit():
+    cache = LLMResponseCache(path=None)
+    send = Sender(REQUEST)
+
+    async def run():
+        first = await cache.complete(MODEL, REQUEST, send)
+        second = await cache.complete(MODEL, REQUEST, send)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert send.calls == 1
+    assert second.choices[0].message.content == first.choices[0].message.content
+    assert second is not first
+
+
+def test_streamed_response_is_replayed_chunk_by_chunk():
+    cache = LLMResponseCache(path=None)
+    request = {**REQUEST, "stream": True}
+    send = Sender(request)
+
+    async def run():
+        live = await read(await cache.complete(MODEL, request, send))
+        replay = await cache.complete(MODEL, request, send)
+        return live, replay, await read(replay)
+
+    live, replay, replayed = asyncio.run(run())
+    assert send.calls == 1
+    assert live == replayed == "".join(ANSWER_TOKENS)
+    assert type(replay).__name__ == "_ReplayedStream"
+
+
+def test_abandoned_stream_is_not_cached():
+    cache = LLMResponseCache(path=None)
+    request = {**REQUEST, "stream": True}
+    send = Sender(request)
+
+    async def run():
+        stream = await cache.complete(MODEL, request, send)
+        partial = await read(stream, limit=2)
+        await stream.close()
+        return partial, await read(await cache.complete(MODEL, request, send))
+
+    partial, full = asyncio.run(run())
+    assert partial == "".join(ANSWER_TOKENS[:2])
+    assert full == "".join(ANSWER_TOKENS)
+    assert send.calls == 2
+
+
+def test_expired_entries_are_misses(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    cache = LLMResponseCache(path=path, ttl_seconds=60)
+    send = Sender(REQUEST)
+    key = response_key(MODEL, REQUEST)
+
+    asyncio.run(cache.complete(MODEL, REQUEST, send))
+    created_at, payload = cache._entries[key]
+    cache._entries[key] = (created_at - 120, payload)
+    cache._db.execute("UPDATE responses SET created_at = created_at - 120")
+    cache._db.commit()
+
+    assert asyncio.run(cache.get(key)) is None
+    assert key not in cache._entries
+    asyncio.run(cache.complete(MODEL, REQUEST, send))
+    assert send.calls == 2
+
+
+def test_disk_tier_survives_a_restart_and_drops_expired_rows(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite")
+    send = Sender(REQUEST)
+    asyncio.run(LLMResponseCache(path=path).complete(MODEL, REQUEST, send))
+
+    restarted = LLMResponseCache(path=path)
+    response = asyncio.run(restarted.complete(MODEL, REQUEST, send))
+    assert send.calls == 1
+    assert response.choices[0].message.content == "".join(ANSWER_TOKENS)
+    assert response_key(MODEL, REQUEST) in restarted._entries  # promoted to memory
+
+    restarted._db.execute("UPDATE responses SET created_at = created_at - 7200")
+    restarted._db.commit()
+    assert LLMResponseCache(path=path, ttl_seconds=3600)._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+
+
+def test_keys_separate_models_and_requests():
+    base = response_key(MODEL, REQUEST)
+    assert response_key("gpt-4o-mini", REQUEST) != base
+    assert response_key(MODEL, {**REQUEST, "messages": [{"role": "user", "content": "Summarize the results"}]}) != base
+    assert response_key(MODEL, {**REQUEST, "functions": [{"name": "route_query"}]}) != base
+    assert response_key(MODEL, {**REQUEST, "stream": True}) != base
+    # The model the call is routed to is the key's model; stream_options don't change the answer
+    assert response_key(MODEL, {**REQUEST, "model": "ignored", "stream_options": {"include_usage": True}}) == base
+
+
+def test_only_single_deterministic_answers_are_cacheable():
+    assert cacheable(REQUEST)
+    assert not cacheable({**REQUEST, "temperature": 0.3})
+    assert not cacheable({**REQUEST, "n": 3})
+    assert not cacheable({"messages": REQUEST["messages"]})
+
+
+def test_gateway_answers_repeats_from_the_cache():
+    client = install_fake_client(latency=0, token_delay=0, response_cache=True)
+
+    async def run():
+        gateway = llm.get_openai_client().chat.completions
+        for _ in range(2):
+            await gateway.create(**REQUEST)
+            await gateway.create(**{**REQUEST, "temperature": 0.3})
+
+    try:
+        asyncio.run(run())
+    finally:
+        install_fake_client()
+    assert [call["temperature"] for call in client.calls] == [0, 0.3, 0.3]
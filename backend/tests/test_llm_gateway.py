@@ -0,0 +1,149 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.observability.tracing import traced_node
+from app.services import llm
+from app.services.llm import LLM_MODEL_TIERS, _LatencyWindow, _routed_model, _TracedCompletions, gateway_events
+from benchmarks.fake_llm import install_fake_client
+
+FAST, STRONG = LLM_MODEL_TIERS["fast"], LLM_MODEL_TIERS["strong"]
+
+
+class ScriptedCompletions:
+    """chat.completions stand-in: each call to a model waits for that model's next delay, then answers or raises."""
+
+    def __init__(self, **outcomes):
+        self.outcomes = {model: list(steps) for model, steps in outcomes.items()}
+        self.calls = []
+        self.cancelled = 0
+
+    async def create(self, **request):
+        model = request["model"]
+        self.calls.append(model)
+        delay, error = self.outcomes[model].pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if error is not None:
+            raise error
+        return f"{model} answer {len(self.calls)}"
+
+
+def warmed(completions, task, model, seconds, samples=20):
+    """Fills the task/model latency window so the hedge threshold is `seconds`."""
+    window = completions._latency.setdefault((task, model), _LatencyWindow())
+    for _ in range(samples):
+        window.add(seconds)
+
+
+REQUEST = {"messages": [{"role": "user", "content": "hi"}]}
+
+
+@pytest.mark.parametrize(
+    "task, request_model, expected",
+    [
+        ("classify", None, FAST),
+        ("rewrite", "gpt-4o", FAST),
+        ("select_tables", None, STRONG),
+        ("generate_sql", None, STRONG),
+        ("chart", None, FAST),
+        (None, None, STRONG),
+        (None, "some-model", "some-model"),
+        ("unknown", None, STRONG),
+    ],
+)
+def test_task_tiers(task, request_model, expected):
+    request = {**REQUEST, "model": request_model} if request_model else REQUEST
+    assert _routed_model(task, request) == expected
+
+
+def test_tier_can_name_a_model(monkeypatch):
+    monkeypatch.setitem(llm.TASK_TIERS, "classify", "gpt-4.1-nano")
+    monkeypatch.setitem(llm.TASK_TIERS, "select_tables", "fast")
+    assert _routed_model("classify", REQUEST) == "gpt-4.1-nano"
+    assert _routed_model("select_tables", REQUEST) == FAST
+
+
+@pytest.mark.parametrize("gateway, task, expected", [(True, "classify", FAST), (True, "summarize", STRONG), (False, "classify", STRONG)])
+def test_nodes_only_name_their_task(monkeypatch, gateway, task, expected):
+    monkeypatch.setattr(llm, "LLM_GATEWAY_ENABLED", gateway)
+    client = install_fake_client(latency=0, token_delay=0)
+
+    async def node(state):
+        await llm.get_openai_client().chat.completions.create(**REQUEST)
+        return {}
+
+    asyncio.run(traced_node("node", node, task)({}))
+    assert [call["model"] for call in client.calls] == [expected]
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    completions = ScriptedCompletions(**{FAST: [(1.0, None), (0.0, None)]})
+    gateway = _TracedCompletions(completions)
+    warmed(gateway, "classify", FAST, 0.02)
+    won = gateway_events.value(task="classify", event="hedge_won")
+
+    result = asyncio.run(gateway._hedged("classify", {**REQUEST, "model": FAST}, timeout=5))
+    assert result == f"{FAST} answer 2"
+    assert completions.calls == [FAST, FAST]
+    assert completions.cancelled == 1
+    assert gateway_events.value(task="classify", event="hedge_won") == won + 1
+
+
+def test_fast_call_is_not_hedged():
+    completions = ScriptedCompletions(**{FAST: [(0.0, None)]})
+    gateway = _TracedCompletions(completions)
+    warmed(gateway, "classify", FAST, 0.5)
+    assert asyncio.run(gateway._hedged("classify", {**REQUEST, "model": FAST}, timeout=5)) == f"{FAST} answer 1"
+    assert completions.calls == [FAST]
+
+
+def test_no_hedging_until_enough_samples():
+    completions = ScriptedCompletions(**{FAST: [(0.05, None)]})
+    gateway = _TracedCompletions(completions)
+    warmed(gateway, "classify", FAST, 0.001, samples=llm.LLM_HEDGE_MIN_SAMPLES - 1)
+    asyncio.run(gateway._hedged("classify", {**REQUEST, "model": FAST}, timeout=5))
+    assert completions.calls == [FAST]
+
+
+def test_hedge_survives_a_failed_first_attempt():
+    error = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    completions = ScriptedCompletions(**{FAST: [(0.1, error), (0.2, None)]})
+    gateway = _TracedCompletions(completions)
+    warmed(gateway, "classify", FAST, 0.02)
+    assert asyncio.run(gateway._hedged("classify", {**REQUEST, "model": FAST}, timeout=5)) == f"{FAST} answer 2"
+
+
+def test_timeout_falls_back_to_the_other_tier(monkeypatch):
+    monkeypatch.setitem(llm.TASK_TIMEOUTS, "classify", 0.05)
+    completions = ScriptedCompletions(**{FAST: [(1.0, None)], STRONG: [(0.0, None)]})
+    result = asyncio.run(_TracedCompletions(completions)._route("classify", {**REQUEST, "model": FAST}))
+    assert result == f"{STRONG} answer 2"
+    assert completions.calls == [FAST, STRONG]
+
+
+def test_server_error_falls_back_to_the_other_tier():
+    error = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    completions = ScriptedCompletions(**{STRONG: [(0.0, error)], FAST: [(0.0, None)]})
+    result = asyncio.run(_TracedCompletions(completions)._route("generate_sql", {**REQUEST, "model": STRONG}))
+    assert result == f"{FAST} answer 2"
+
+
+def test_no_fallback_when_disabled_or_for_request_errors(monkeypatch):
+    monkeypatch.setitem(llm.TASK_TIMEOUTS, "classify", 0.05)
+    monkeypatch.setattr(llm, "LLM_FALLBACK_ENABLED", False)
+    completions = ScriptedCompletions(**{FAST: [(1.0, None)]})
+    with pytest.raises(TimeoutError):
+        asyncio.run(_TracedCompletions(completions)._route("classify", {**REQUEST, "model": FAST}))
+    assert completions.calls == [FAST]
+
+    monkeypatch.setattr(llm, "LLM_FALLBACK_ENABLED", True)
+    completions = ScriptedCompletions(**{FAST: [(0.0, ValueError("bad request"))]})
+    with pytest.raises(ValueError):
+        asyncio.run(_TracedCompletions(completions)._route("classify", {**REQUEST, "model": FAST}))
+    assert completions.calls == [FAST]
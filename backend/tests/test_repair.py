@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.tools import repair
+from app.tools.catalog import get_schema_catalog
+from app.tools.repair import autofix_identifier, compile_error, precheck_query
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return get_schema_catalog()
+
+
+def fix(sql, catalog):
+    """Compiles `sql` against the test database and autofixes the error SQLite reports."""
+    error = asyncio.run(compile_error(sql))
+    assert error is not None
+    return autofix_identifier(sql, error, catalog)
+
+
+def test_misspelled_table(catalog):
+    assert fix("SELECT COUNT(*) FROM Customers", catalog) == ("SELECT COUNT(*) FROM Customer", "Customers -> Customer")
+    assert fix('SELECT COUNT(*) FROM "invoices"', catalog) == ("SELECT COUNT(*) FROM Invoice", "invoices -> Invoice")
+
+
+def test_misspelled_column(catalog):
+    assert fix("SELECT invoice_date FROM Invoice", catalog) == ("SELECT InvoiceDate FROM Invoice", "invoice_date -> InvoiceDate")
+    assert fix("SELECT SUM(Totl) FROM Invoice", catalog) == ("SELECT SUM(Total) FROM Invoice", "Totl -> Total")
+
+
+def test_column_under_the_wrong_alias_is_requalified(catalog):
+    sql = "SELECT c.Country, SUM(c.Total) FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY c.Country"
+    fixed, description = fix(sql, catalog)
+    assert fixed == "SELECT c.Country, SUM(i.Total) FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY c.Country"
+    assert description == "c.Total -> i.Total"
+
+
+def test_strings_and_comments_are_left_alone(catalog):
+    fixed, _ = fix("SELECT Totl FROM Invoice WHERE 'Totl' <> '' -- Totl", catalog)
+    assert fixed == "SELECT Total FROM Invoice WHERE 'Totl' <> '' -- Totl"
+
+
+def test_no_fix_without_exactly_one_match(catalog):
+    # Both joined tables have a CustomerId, so the unknown qualifier can't be resolved
+    assert fix("SELECT x.CustomerId FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId", catalog) is None
+    assert fix("SELECT Revenue FROM Invoice", catalog) is None
+    assert fix("SELECT * FROM Playlist", catalog) is None
+
+
+def test_no_fix_for_names_the_query_defines(catalog):
+    sql = "WITH totals AS (SELECT CustomerId, SUM(Total) AS revenue FROM Invoice GROUP BY CustomerId) SELECT revenue FROM Customer"
+    assert fix(sql, catalog) is None
+
+
+def test_other_errors_are_not_fixed(catalog):
+    assert autofix_identifier("SELECT * FROM", 'incomplete input', catalog) is None
+    assert autofix_identifier("SELECT COUNT(*) FROM Invoice GROUP BY COUNT(*)", "aggregate functions are not allowed in the GROUP BY clause", catalog) is None
+
+
+def test_precheck_applies_fixes_until_the_query_compiles():
+    result = asyncio.run(precheck_query("SELECT country, SUM(i.Totl) FROM Customers c JOIN Invoices i ON i.CustomerId = c.CustomerId GROUP BY country"))
+    assert result.error is None
+    assert result.sql == "SELECT country, SUM(i.Total) FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId GROUP BY country"
+    assert sorted(result.fixes) == ["Customers -> Customer", "Invoices -> Invoice", "i.Totl -> i.Total"]
+
+
+def test_precheck_stops_after_the_edit_limit(monkeypatch):
+    monkeypatch.setattr(repair, "SQL_AUTOFIX_MAX_EDITS", 1)
+    result = asyncio.run(precheck_query("SELECT SUM(Totl) FROM Invoices"))
+    assert result.fixes == ["Invoices -> Invoice"]
+    assert result.error == "no such column: Totl"
+
+    monkeypatch.setattr(repair, "SQL_PRECHECK_ENABLED", False)
+    assert asyncio.run(precheck_query("SELECT * FROM Invoices")).error is None
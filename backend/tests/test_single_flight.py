@@ -0,0 +1,261 @@
+import asyncio
+
+import pytest
+
+from app.services import single_flight
+from app.services.single_flight import SingleFlight, fingerprint
+from app.tools import sql
+
+
+class Upstream:
+    """A stream that yields each chunk once the test releases it."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = list(chunks)
+        self.error = error
+        self.released = asyncio.Semaphore(0)
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            await self.released.acquire()
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+    async def close(self):
+        self.closed = True
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_followers_share_the_leaders_result():
+    flights = SingleFlight("test")
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"rows": [1, 2]}
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert runs == [1]
+    assert all(result is results[0] for result in results)
+    assert flights._flights == {}
+
+
+def test_followers_get_the_leaders_exception():
+    flights = SingleFlight("test")
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("no such table: Invoices")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert runs == [1]
+    assert all(isinstance(r, ValueError) and "Invoices" in str(r) for r in results)
+
+
+def test_nothing_is_kept_after_a_flight_lands():
+    flights = SingleFlight("test")
+    runs = []
+
+    async def work():
+        runs.append(1)
+        return len(runs)
+
+    async def run():
+        return await flights.do("key", work), await flights.do("key", work)
+
+    assert asyncio.run(run()) == (1, 2)
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight("test")
+
+    async def run():
+        return await asyncio.gather(flights.do("a", lambda: asyncio.sleep(0, "a")), flights.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+
+
+def test_cancelling_one_waiter_keeps_the_shared_task_running():
+    flights = SingleFlight("test")
+
+    async def run():
+        done = asyncio.Event()
+
+        async def work():
+            await done.wait()
+            return "result"
+
+        first = asyncio.ensure_future(flights.do("key", work))
+        second = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        done.set()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == ("result", True)
+
+
+def test_cancelling_the_last_waiter_cancels_the_shared_task():
+    flights = SingleFlight("test")
+    state = {}
+
+    async def run():
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["work_cancelled"] = True
+                raise
+
+        waiters = [asyncio.ensure_future(flights.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        flight = flights._flights["key"]
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flight.task.cancelled()
+
+    assert asyncio.run(run()) is True
+    assert state == {"work_cancelled": True}
+    assert flights._flights == {}
+
+
+def test_late_stream_subscriber_gets_the_chunks_already_produced():
+    flights = SingleFlight("test")
+
+    async def run():
+        upstream = Upstream(["a", "b", "c"])
+        opens = []
+
+        async def open_stream():
+            opens.append(1)
+            return upstream
+
+        early = await flights.stream("key", open_stream)
+        early_read = asyncio.ensure_future(collect(early))
+        upstream.released.release()
+        upstream.released.release()
+        while len(flights._flights["key"].chunks) < 2:
+            await asyncio.sleep(0)
+
+        late = await flights.stream("key", open_stream)
+        late_read = asyncio.ensure_future(collect(late))
+        upstream.released.release()
+        results = await asyncio.gather(early_read, late_read)
+        await early.close()
+        await late.close()
+        return opens, results, upstream.closed
+
+    opens, (early, late), closed = asyncio.run(run())
+    assert opens == [1]
+    assert early == late == ["a", "b", "c"]
+    assert closed
+
+
+def test_stream_errors_reach_every_subscriber():
+    flights = SingleFlight("test")
+
+    async def run():
+        upstream = Upstream(["a"], error=ConnectionError("reset"))
+
+        async def open_stream():
+            return upstream
+
+        views = [await flights.stream("key", open_stream) for _ in range(2)]
+        upstream.released.release()
+        return await asyncio.gather(*(collect(view) for view in views), return_exceptions=True)
+
+    assert [type(r) for r in asyncio.run(run())] == [ConnectionError, ConnectionError]
+
+
+def test_failure_to_open_a_stream_is_raised_to_each_caller():
+    flights = SingleFlight("test")
+
+    async def run():
+        async def open_stream():
+            await asyncio.sleep(0.01)
+            raise TimeoutError("no response")
+
+        return await asyncio.gather(*(flights.stream("key", open_stream) for _ in range(2)), return_exceptions=True)
+
+    assert [type(r) for r in asyncio.run(run())] == [TimeoutError, TimeoutError]
+
+
+def test_closing_every_stream_view_cancels_the_pump():
+    flights = SingleFlight("test")
+
+    async def run():
+        upstream = Upstream(["a", "b"])
+
+        async def open_stream():
+            return upstream
+
+        views = [await flights.stream("key", open_stream) for _ in range(2)]
+        shared = flights._flights["key"]
+        await views[0].close()
+        assert not shared.task.done()
+        await views[1].close()
+        await asyncio.gather(shared.task, return_exceptions=True)
+        return shared.task.cancelled(), upstream.closed
+
+    assert asyncio.run(run()) == (True, True)
+
+
+def test_disabled_single_flight_runs_every_call(monkeypatch):
+    monkeypatch.setattr(single_flight, "SINGLE_FLIGHT_ENABLED", False)
+    flights = SingleFlight("test")
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0)
+
+    async def run():
+        await asyncio.gather(*(flights.do("key", work) for _ in range(3)))
+
+    asyncio.run(run())
+    assert runs == [1, 1, 1]
+
+
+def test_fingerprint_is_order_independent():
+    assert fingerprint("m", {"a": 1, "b": [1, 2]}) == fingerprint("m", {"b": [1, 2], "a": 1})
+    assert fingerprint("m", {"a": 1}) != fingerprint("n", {"a": 1})
+
+
+@pytest.mark.parametrize("second", ["SELECT  COUNT(*)\nFROM Invoice -- again", "select count(*) from Invoice"])
+def test_identical_concurrent_queries_run_once(monkeypatch, second):
+    runs = []
+    run_fetch_rows = sql._run_fetch_rows
+
+    async def counted(*args):
+        runs.append(args[0])
+        return await run_fetch_rows(*args)
+
+    monkeypatch.setattr(sql, "_run_fetch_rows", counted)
+
+    async def run():
+        return await asyncio.gather(sql.fetch_rows_async("SELECT COUNT(*) FROM Invoice"), sql.fetch_rows_async(second))
+
+    first, other = asyncio.run(run())
+    assert first[1] == other[1] == [[500]]
+    # Formatting and comments don't matter; keyword case does (canonical_sql keeps the text)
+    assert len(runs) == (1 if second.startswith("SELECT") else 2)
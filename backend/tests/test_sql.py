@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from app.tools import sql
+from app.tools.sql import execute_read_query, execute_read_query_async
+
+
+def test_read_query_returns_dicts():
+    rows = execute_read_query("SELECT Country, COUNT(*) AS n FROM Customer WHERE Country = ? GROUP BY Country", ("Canada",))
+    assert rows == [{"Country": "Canada", "n": 12}]
+
+
+def test_read_query_is_capped_at_the_row_limit():
+    rows = execute_read_query("WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < 5000) SELECT i FROM r")
+    assert len(rows) == sql.SQL_MAX_RESULT_ROWS
+
+
+def test_read_query_runs_under_the_budget(monkeypatch):
+    monkeypatch.setattr(sql, "SQL_MAX_VM_STEPS", 50000)
+    with pytest.raises(Exception, match="Query execution failed: .*VM steps"):
+        execute_read_query("SELECT COUNT(*) FROM Invoice a, Invoice b, Invoice c")
+
+
+def test_async_read_query_matches_sync():
+    query = "SELECT InvoiceId, Total FROM Invoice ORDER BY InvoiceId LIMIT 3"
+    assert asyncio.run(execute_read_query_async(query)) == execute_read_query(query)
+    with pytest.raises(Exception, match="Query execution failed: .*no such table"):
+        asyncio.run(execute_read_query_async("SELECT * FROM Invoices"))
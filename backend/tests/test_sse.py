@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import gzip
+import json
+from datetime import date
+
+import pytest
+
+from app.api import sse
+from app.api.sse import dumps, encode_events, sse_frame
+
+
+def parse(frame):
+    assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+    return json.loads(frame[len(b"data: "):-2])
+
+
+async def script(*steps):
+    """Yields the events in `steps`; a number instead of an event sleeps that many seconds."""
+    for step in steps:
+        if isinstance(step, (int, float)):
+            await asyncio.sleep(step)
+        elif isinstance(step, BaseException):
+            raise step
+        else:
+            yield step
+
+
+def token(text):
+    return {"type": "token", "content": text}
+
+
+def encode(events, **options):
+    async def run():
+        return [parse(frame) async for frame in encode_events(events, **options)]
+    return asyncio.run(run())
+
+
+def test_tokens_within_the_window_share_a_frame():
+    frames = encode(script(token("The "), token("USA "), 0.1, token("leads.")), window_ms=20, max_bytes=1000)
+    assert frames == [token("The USA "), token("leads.")]
+
+
+def test_other_events_send_pending_tokens_first():
+    update = {"type": "node_update", "node": "sql_generator", "sql": "SELECT 1"}
+    frames = encode(script(token("a"), token("b"), update, token("c"), {"type": "end"}), window_ms=1000, max_bytes=1000)
+    assert frames == [token("ab"), update, token("c"), {"type": "end"}]
+
+
+def test_pending_bytes_flush_before_the_window():
+    frames = encode(script(token("ab"), token("cd"), token("ef"), 0.05, {"type": "end"}), window_ms=10000, max_bytes=4)
+    assert frames == [token("abcd"), token("ef"), {"type": "end"}]
+
+
+def test_zero_window_sends_every_token():
+    frames = encode(script(token("a"), token("b"), token("c")), window_ms=0)
+    assert frames == [token("a"), token("b"), token("c")]
+
+
+def test_large_node_updates_are_gzipped(monkeypatch):
+    monkeypatch.setattr(sse, "SSE_GZIP_MIN_BYTES", 200)
+    data = {"columns": ["Country", "n"], "rows": [["Country %d" % i, i] for i in range(50)]}
+    visualization = {"mark": "bar"}
+    event = {"type": "node_update", "node": "sql_executor", "data": data, "visualization": visualization}
+
+    packed = parse(sse_frame(event))
+    assert set(packed) == {"type", "node", "gzip"}
+    assert json.loads(gzip.decompress(base64.b64decode(packed["gzip"]))) == {"data": data, "visualization": visualization}
+
+    small = {"type": "node_update", "node": "sql_executor", "data": {"columns": ["n"], "rows": [[1]]}}
+    assert parse(sse_frame(small)) == small
+    other = {"type": "final", "data": data}
+    assert parse(sse_frame(other)) == other
+
+
+def test_gzip_is_off_by_default():
+    event = {"type": "node_update", "data": {"rows": [[i] for i in range(1000)]}}
+    assert parse(sse_frame(event)) == event
+
+
+def test_source_errors_reach_the_reader_after_earlier_frames():
+    async def run():
+        received = []
+        with pytest.raises(RuntimeError, match="graph failed"):
+            async for frame in encode_events(script({"type": "start"}, RuntimeError("graph failed")), window_ms=20):
+                received.append(parse(frame))
+        return received
+
+    assert asyncio.run(run()) == [{"type": "start"}]
+
+
+def test_closing_the_reader_stops_the_source():
+    state = {}
+
+    async def events():
+        try:
+            yield {"type": "start"}
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        frames = encode_events(events())
+        assert parse(await frames.__anext__()) == {"type": "start"}
+        await frames.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert state == {"cancelled": True}
+
+
+def test_dumps_is_compact_and_stringifies_unknown_types():
+    assert dumps({"a": [1, 2], "day": date(2024, 1, 31)}) == b'{"a":[1,2],"day":"2024-01-31"}'
@@ -0,0 +1,127 @@
+import pytest
+
+from app.tools import table_index
+from app.tools.catalog import ColumnInfo, ForeignKeyInfo, SchemaCatalog, TableInfo
+from app.tools.table_index import TableIndex, embed_text, schema_fingerprint
+
+
+def table(name, columns, foreign_keys=()):
+    return TableInfo(
+        name=name,
+        create_sql=f"CREATE TABLE {name} ({', '.join(columns)})",
+        columns=[ColumnInfo(name=c, type="TEXT") for c in columns],
+        foreign_keys=[ForeignKeyInfo(column=c, ref_table=t) for c, t in foreign_keys],
+    )
+
+
+def make_catalog(data_version=1, samples=None):
+    tables = [
+        table("Customer", ["CustomerId", "FirstName", "Country"]),
+        table("Invoice", ["InvoiceId", "CustomerId", "BillingCountry", "Total"], [("CustomerId", "Customer")]),
+        table("InvoiceLine", ["InvoiceLineId", "InvoiceId", "TrackId", "UnitPrice"], [("InvoiceId", "Invoice"), ("TrackId", "Track")]),
+        table("Track", ["TrackId", "Name", "GenreId"], [("GenreId", "Genre")]),
+        table("Genre", ["GenreId", "Name"]),
+        table("Employee", ["EmployeeId", "LastName", "Title"]),
+    ]
+    catalog = SchemaCatalog({t.name: t for t in tables}, schema_version=1, data_version=data_version)
+    catalog._samples = {name: {} for name in catalog.table_names}
+    catalog._samples.update(samples or {})
+    return catalog
+
+
+@pytest.fixture
+def index_state(tmp_path, monkeypatch):
+    """Module-level index state reset, with indexes saved under a scratch directory."""
+    monkeypatch.setattr(table_index, "TABLE_INDEX_PATH", str(tmp_path / "table_index"))
+    monkeypatch.setattr(table_index, "_index", None)
+    monkeypatch.setattr(table_index, "_index_fingerprint", None)
+    monkeypatch.setattr(table_index, "_index_versions", None)
+    return tmp_path / "table_index"
+
+
+def test_embeddings_are_deterministic_unit_vectors():
+    a, b = embed_text("invoice totals", 64), embed_text("invoice totals", 64)
+    assert (a == b).all()
+    assert abs(float(a @ a) - 1.0) < 1e-6
+    assert float(embed_text("invoices", 64) @ embed_text("InvoiceLine", 64)) > 0.3
+
+
+def test_search_ranks_by_names_and_samples():
+    catalog = make_catalog(samples={"Genre": {"Name": ["Rock", "Jazz", "Metal"]}})
+    index = TableIndex.build(catalog, catalog._samples)
+    assert index.search("invoice totals by billing country", k=1)[0][0] == "Invoice"
+    assert index.search("employee titles", k=1)[0][0] == "Employee"
+    assert index.search("how many jazz tracks", k=2)[0][0] in ("Genre", "Track")
+    assert "Genre" in [name for name, _ in index.search("rock", k=1)]
+
+
+def test_candidates_add_foreign_key_neighbours_up_to_the_limit():
+    index = TableIndex.build(make_catalog())
+    assert index.candidates("invoice line unit price", k=1, limit=10) == ["InvoiceLine", "Invoice", "Track"]
+    assert index.candidates("invoice line unit price", k=1, limit=2) == ["InvoiceLine", "Invoice"]
+
+
+def test_saved_index_maps_back_identically(tmp_path):
+    catalog = make_catalog()
+    built = TableIndex.build(catalog, path=str(tmp_path / "index"))
+    loaded = TableIndex.load(str(tmp_path / "index"))
+    assert loaded.tables == built.tables
+    assert loaded.search("customer country") == built.search("customer country")
+
+
+def test_fingerprint_covers_schema_and_samples():
+    base = schema_fingerprint(make_catalog(), 64, {})
+    assert schema_fingerprint(make_catalog(), 64, {}) == base
+    assert schema_fingerprint(make_catalog(), 128, {}) != base
+    assert schema_fingerprint(make_catalog(), 64, {"Genre": {"Name": ["Rock"]}}) != base
+    changed = make_catalog()
+    changed.tables["Genre"].create_sql += " -- music genres"
+    assert schema_fingerprint(changed, 64, {}) != base
+
+
+def test_index_is_rebuilt_only_when_samples_change(index_state, monkeypatch):
+    catalogs = iter([
+        make_catalog(1, {"Genre": {"Name": ["Rock"]}}),
+        make_catalog(2, {"Genre": {"Name": ["Rock"]}}),  # data changed, samples didn't
+        make_catalog(3, {"Genre": {"Name": ["Rock", "Bossa Nova"]}}),
+    ])
+    current = {}
+    monkeypatch.setattr(table_index, "get_schema_catalog", lambda: current["catalog"])
+    builds = []
+    build = TableIndex.build.__func__
+    monkeypatch.setattr(TableIndex, "build", classmethod(lambda cls, *a, **kw: builds.append(1) or build(cls, *a, **kw)))
+
+    current["catalog"] = next(catalogs)
+    first = table_index.get_table_index()
+    current["catalog"] = next(catalogs)
+    assert table_index.get_table_index() is first
+    assert len(builds) == 1
+
+    current["catalog"] = next(catalogs)
+    rebuilt = table_index.get_table_index()
+    assert rebuilt is not first
+    assert len(builds) == 2
+    assert rebuilt.search("bossa nova", k=1)[0][0] == "Genre"
+    # Only the current index is kept on disk
+    assert [p.name for p in index_state.iterdir()] == [table_index._index_fingerprint]
+
+
+def test_restart_maps_the_saved_index(index_state, monkeypatch):
+    catalog = make_catalog()
+    monkeypatch.setattr(table_index, "get_schema_catalog", lambda: catalog)
+    table_index.get_table_index()
+
+    monkeypatch.setattr(table_index, "_index", None)
+    monkeypatch.setattr(table_index, "_index_versions", None)
+    monkeypatch.setattr(TableIndex, "build", classmethod(lambda cls, *a, **kw: pytest.fail("rebuilt")))
+    assert table_index.get_table_index().tables == catalog.table_names
+
+
+def test_small_schemas_skip_retrieval(monkeypatch):
+    catalog = make_catalog()
+    monkeypatch.setattr(table_index, "get_schema_catalog", lambda: catalog)
+    monkeypatch.setattr(table_index, "TABLE_INDEX_MIN_TABLES", 10)
+    assert table_index.candidate_tables("anything") == catalog.table_names
+    monkeypatch.setattr(table_index, "TABLE_INDEX_MIN_TABLES", 3)
+    monkeypatch.setattr(table_index, "get_table_index", lambda: TableIndex.build(catalog))
+    assert table_index.candidate_tables("genre names")[0] == "Genre"
@@ -0,0 +1,114 @@
+import sqlite3
+
+import pytest
+
+from app.tools.sql import get_db_connection
+from app.tools.validator import canonical_sql, validate_sql_safety
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT Country, COUNT(*) FROM Customer GROUP BY Country",
+        "WITH c AS (SELECT * FROM Customer) SELECT * FROM c",
+        "VALUES (1), (2)",
+        "SELECT 'DROP TABLE Customer; DELETE FROM Invoice' AS note",
+        'SELECT "delete", [update], `insert` FROM t',
+        "SELECT 1 -- ; DROP TABLE Customer",
+        "SELECT 1 /* ; DELETE FROM Invoice */",
+        "SELECT REPLACE(Country, 'USA', 'US') FROM Customer",
+        "SELECT 1;;",
+        "select count(*)\nfrom Invoice\n;",
+        # Keywords are names outside statement position
+        "SELECT Name AS release FROM Customer",
+        "SELECT begin FROM t",
+        "SELECT 1 AS analyze",
+        "SELECT * FROM Customer UNION SELECT 1 ATTACH",
+        "SELECT replace, [delete] FROM t WHERE release > 1",
+        "WITH x(a) AS (SELECT 1), y AS MATERIALIZED (SELECT a FROM x) SELECT a AS rollback FROM y",
+        "SELECT 1 UNION ALL SELECT 2 ORDER BY 1",
+        "SELECT readfile FROM t",
+    ],
+)
+def test_read_only_queries_pass(query):
+    assert validate_sql_safety(query) == (True, "")
+
+
+@pytest.mark.parametrize(
+    "query, error",
+    [
+        ("DELETE FROM Customer", "Only SELECT"),
+        ("SELECT 1; DROP TABLE Customer", "multiple statements"),
+        ("SELECT 1; -- comment\nDELETE FROM Invoice", "multiple statements"),
+        ("SELECT 1 /* ; */ ; SELECT 2", "multiple statements"),
+        ("SELECT * FROM Customer WHERE Country = 'x'; DELETE FROM Customer", "multiple statements"),
+        ("PRAGMA writable_schema = 1", "Only SELECT"),
+        ("SELECT 1 FROM Customer; PRAGMA query_only = 0", "multiple statements"),
+        ("WITH x AS (SELECT 1) INSERT INTO Customer SELECT * FROM x", "forbidden keyword: INSERT"),
+        ("WITH x AS (SELECT 1), y AS (SELECT 2) DELETE FROM Customer", "forbidden keyword: DELETE"),
+        ("WITH x(a) AS (SELECT 1) REPLACE INTO Customer SELECT * FROM x", "forbidden keyword: REPLACE"),
+        ("WITH x AS (SELECT 1) EXPLAIN SELECT 1", "not EXPLAIN statements"),
+        ("SELECT load_extension('/tmp/evil.so')", "forbidden function: LOAD_EXTENSION"),
+        ("SELECT readfile('/etc/passwd')", "forbidden function: READFILE"),
+        ("SELECT writefile('/tmp/x', 'y')", "forbidden function: WRITEFILE"),
+        ("SELECT * FROM sqlite_dbpage('main')", "forbidden function: SQLITE_DBPAGE"),
+        ("SELECT 'unterminated", "unterminated"),
+        ("SELECT 1 /* DELETE FROM Customer", "unterminated"),
+        ("", "empty"),
+        ("(SELECT 1)", "must start with SELECT"),
+        # SQLite can't parse parenthesized compound members
+        ("(SELECT 1) UNION ALL (SELECT 2)", "must start with SELECT"),
+    ],
+)
+def test_unsafe_queries_are_rejected(query, error):
+    is_safe, message = validate_sql_safety(query)
+    assert not is_safe
+    assert error in message
+
+
+def test_accepted_queries_parse_in_sqlite():
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE t (begin, replace, [delete], release, readfile)")
+        for query in ("SELECT begin FROM t", "SELECT replace, [delete] FROM t WHERE release > 1", "SELECT readfile FROM t",
+                      "SELECT 1 AS analyze", "SELECT 1 UNION ALL SELECT 2 ORDER BY 1"):
+            assert validate_sql_safety(query) == (True, "")
+            conn.execute(query)
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("(SELECT 1) UNION ALL (SELECT 2)")
+    finally:
+        conn.close()
+
+
+def test_canonical_sql_ignores_layout_and_comments():
+    assert canonical_sql("SELECT  *\nFROM t -- all\n;") == "SELECT * FROM t"
+    assert canonical_sql("SELECT 'a  b'") == "SELECT 'a  b'"
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "ATTACH DATABASE ':memory:' AS other",
+        "PRAGMA writable_schema = 1",
+        "SELECT load_extension('/tmp/evil.so')",
+        "CREATE TEMP TABLE t (x)",
+        "DELETE FROM Customer",
+    ],
+)
+def test_authorizer_denies_what_the_validator_might_miss(query):
+    conn = get_db_connection()
+    try:
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute(query)
+    finally:
+        conn.close()
+
+
+def test_authorizer_allows_reads_and_catalog_pragmas():
+    conn = get_db_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM Customer").fetchone()[0] == 60
+        assert [row["name"] for row in conn.execute("SELECT * FROM pragma_table_info('Customer')")][0] == "CustomerId"
+        assert conn.execute("PRAGMA data_version").fetchone()[0] >= 1
+    finally:
+        conn.close()
@@ -1,6 +1,6 @@
 import React from 'react';
 import type { AgentEvent } from '../types';
-import { CheckCircle2, Loader2, Database, Brain, Terminal, FileText, PieChart, Bot, Sparkles } from 'lucide-react';
+import { CheckCircle2, Loader2, Database, Brain, Terminal, FileText, PieChart, Bot, Sparkles, Zap } from 'lucide-react';
 import { cn } from '../lib/utils';
 import { VisualizationRenderer } from './VisualizationRenderer';
 
@@ -15,13 +15,16 @@ export const ThinkingProcess: React.FC<ThinkingProcessProps> = ({ events, isComp
         switch (nodeName) {
             case 'query_router': return { label: 'Analyzing Intent', icon: Brain, color: 'text-purple-500', bg: 'bg-purple-100' };
             case 'query_rewriter': return { label: 'Refining Query', icon: Sparkles, color: 'text-amber-500', bg: 'bg-amber-100' };
+            case 'speculation_join': return { label: 'Merging Parallel Steps', icon: Brain, color: 'text-purple-400', bg: 'bg-purple-50' };
             case 'table_selector': return { label: 'Selecting Tables', icon: Database, color: 'text-blue-500', bg: 'bg-blue-100' };
             case 'sql_generator': return { label: 'Generating SQL', icon: Terminal, color: 'text-slate-600', bg: 'bg-slate-100' };
+            case 'sql_repair': return { label: 'Repairing SQL', icon: Terminal, color: 'text-orange-500', bg: 'bg-orange-100' };
             case 'sql_validator': return { label: 'Validating SQL', icon: CheckCircle2, color: 'text-green-500', bg: 'bg-green-100' };
             case 'sql_executor': return { label: 'Executing Query', icon: Database, color: 'text-emerald-600', bg: 'bg-emerald-100' };
             case 'response_synthesizer': return { label: 'Synthesizing Answer', icon: FileText, color: 'text-indigo-500', bg: 'bg-indigo-100' };
             case 'visualization_planner': return { label: 'Planning Visuals', icon: PieChart, color: 'text-pink-500', bg: 'bg-pink-100' };
             case 'visualization_generator': return { label: 'Creating Chart', icon: PieChart, color: 'text-pink-600', bg: 'bg-pink-100' };
+            case 'answer_cache': return { label: 'Answered From Cache', icon: Zap, color: 'text-yellow-500', bg: 'bg-yellow-100' };
             case 'general_agent': return { label: 'Answering', icon: Bot, color: 'text-blue-600', bg: 'bg-blue-100' };
             default: return { label: 'Processing', icon: Loader2, color: 'text-gray-500', bg: 'bg-gray-100' };
         }
@@ -10,7 +10,11 @@ export const VisualizationRenderer: React.FC<VisualizationRendererProps> = ({ sp
 
     useEffect(() => {
         if (containerRef.current && spec) {
-            embed(containerRef.current, spec, { actions: false }).catch(console.error);
+            // Large results are referenced by a relative /api/results URL instead of inline values
+            embed(containerRef.current, spec, {
+                actions: false,
+                loader: { baseURL: 'http://localhost:8000' },
+            }).catch(console.error);
         }
     }, [spec]);
 
@@ -15,6 +15,16 @@ const getSessionId = (): string => {
     return sessionId;
 };
 
+// Large node_update fields arrive gzipped when the server sets SSE_GZIP_MIN_BYTES
+const unpackEvent = async (event: AgentEvent): Promise<AgentEvent> => {
+    if (!event.gzip) return event;
+    const bytes = Uint8Array.from(atob(event.gzip), c => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    const unpacked: AgentEvent = { ...event, ...JSON.parse(await new Response(stream).text()) };
+    delete unpacked.gzip;
+    return unpacked;
+};
+
 export const useChat = () => {
     const [messages, setMessages] = useState<Message[]>([]);
     const [isLoading, setIsLoading] = useState(false);
@@ -54,55 +64,57 @@ export const useChat = () => {
             // We'll update this reference to update the UI progressively
             setMessages(prev => [...prev, assistantMessage]);
 
+            let buffer = '';
             while (true) {
                 const { done, value } = await reader.read();
                 if (done) break;
 
-                const chunk = decoder.decode(value, { stream: true });
-                const lines = chunk.split('\n\n');
+                // A read can end mid-frame: keep the incomplete tail for the next one
+                buffer += decoder.decode(value, { stream: true });
+                const frames = buffer.split('\n\n');
+                buffer = frames.pop() ?? '';
 
-                for (const line of lines) {
-                    if (line.startsWith('data: ')) {
+                const events: AgentEvent[] = [];
+                for (const frame of frames) {
+                    if (frame.startsWith('data: ')) {
                         try {
-                            const jsonStr = line.replace('data: ', '');
-                            const event: AgentEvent = JSON.parse(jsonStr);
-
-                            // Update trace
-                            setCurrentTrace(prev => [...prev, event]);
-
-                            // Handle specific event types for message content
-                            if (event.type === 'token' && event.content) {
-                                assistantMessage.content += event.content;
-                            }
-
-                            if (event.response) {
-                                // Optional: Ensure content matches final response
-                                assistantMessage.content = event.response;
-                            }
-
-                            if (event.visualization) {
-                                assistantMessage.visualization = event.visualization;
-                            }
-
-                            if (event.sql) {
-                                assistantMessage.sql = event.sql;
-                            }
-
-                            // Update the last message in state
-                            setMessages(prev => {
-                                const newMessages = [...prev];
-                                newMessages[newMessages.length - 1] = {
-                                    ...assistantMessage,
-                                    trace: [...(assistantMessage.trace || []), event] // Keep trace in message too if needed
-                                };
-                                return newMessages;
-                            });
-
+                            events.push(await unpackEvent(JSON.parse(frame.slice('data: '.length))));
                         } catch (e) {
                             console.error('Error parsing SSE:', e);
                         }
                     }
                 }
+                if (events.length === 0) continue;
+
+                for (const event of events) {
+                    // Handle specific event types for message content
+                    if (event.type === 'token' && event.content) {
+                        assistantMessage.content += event.content;
+                    }
+
+                    if (event.response) {
+                        // Optional: Ensure content matches final response
+                        assistantMessage.content = event.response;
+                    }
+
+                    if (event.visualization) {
+                        assistantMessage.visualization = event.visualization;
+                    }
+
+                    if (event.sql) {
+                        assistantMessage.sql = event.sql;
+                    }
+                }
+                assistantMessage.trace = [...(assistantMessage.trace || []), ...events];
+
+                // One state update per read, however many events it carried
+                setCurrentTrace(prev => [...prev, ...events]);
+                const latest = { ...assistantMessage };
+                setMessages(prev => {
+                    const newMessages = [...prev];
+                    newMessages[newMessages.length - 1] = latest;
+                    return newMessages;
+                });
             }
 
         } catch (error) {
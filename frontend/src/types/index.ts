@@ -10,6 +10,7 @@ export interface AgentEvent {
     sql?: string;
     error?: string;
     content?: string;
+    gzip?: string; // base64 gzip of large fields (data, visualization), unpacked by useChat
 }
 
 export interface Message {